@@ -16,7 +16,7 @@ from app.models import (
     User, Shop,
     OperationLog, Worksheet,
     SystemSetting, MenuItem, Platform,
-    DataTable, TableData
+    DataTable, TableData, CacheVersion
 )
 
 # Alembic Config对象
@@ -0,0 +1,32 @@
+"""add data_version to data_tables
+
+Revision ID: 005_add_data_table_version
+Revises: 004_update_shop_platform_relationship
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "005_add_data_table_version"
+down_revision = "004_update_shop_platform_relationship"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "data_tables",
+        sa.Column(
+            "data_version",
+            sa.BigInteger(),
+            nullable=False,
+            server_default="0",
+            comment="数据版本号（导入或数据写入时递增，用于缓存失效）",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("data_tables", "data_version")
@@ -0,0 +1,35 @@
+"""add cache_versions table
+
+Revision ID: 006_add_cache_versions
+Revises: 005_add_data_table_version
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "006_add_cache_versions"
+down_revision = "005_add_data_table_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "cache_versions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("scope", sa.String(length=100), nullable=False, comment="作用域（如 menus、settings:basic、data_table_tree）"),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0", comment="版本号"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), comment="创建时间"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), comment="更新时间"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_cache_versions_id"), "cache_versions", ["id"], unique=False)
+    op.create_index(op.f("ix_cache_versions_scope"), "cache_versions", ["scope"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_cache_versions_scope"), table_name="cache_versions")
+    op.drop_index(op.f("ix_cache_versions_id"), table_name="cache_versions")
+    op.drop_table("cache_versions")
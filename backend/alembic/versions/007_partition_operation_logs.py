@@ -0,0 +1,105 @@
+"""partition operation_logs by month
+
+Revision ID: 007_partition_operation_logs
+Revises: 006_add_cache_versions
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+
+revision = "007_partition_operation_logs"
+down_revision = "006_add_cache_versions"
+branch_labels = None
+depends_on = None
+
+
+_COLUMNS = "id, user_id, action_type, table_name, record_id, old_value, new_value, created_at"
+
+
+def _drop_legacy_indexes() -> None:
+    for name in ("ix_operation_logs_id", "ix_operation_logs_action_type", "ix_operation_logs_created_at"):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def _create_indexes() -> None:
+    op.execute("CREATE INDEX ix_operation_logs_id ON operation_logs (id)")
+    op.execute("CREATE INDEX ix_operation_logs_action_type ON operation_logs (action_type)")
+    op.execute("CREATE INDEX ix_operation_logs_created_at ON operation_logs (created_at)")
+
+
+def upgrade() -> None:
+    _drop_legacy_indexes()
+    op.execute("ALTER TABLE operation_logs RENAME TO operation_logs_legacy")
+    op.execute("ALTER TABLE operation_logs_legacy RENAME CONSTRAINT operation_logs_pkey TO operation_logs_legacy_pkey")
+
+    op.execute("""
+        CREATE TABLE operation_logs (
+            id INTEGER NOT NULL DEFAULT nextval('operation_logs_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            action_type VARCHAR(50) NOT NULL,
+            table_name VARCHAR(50) NOT NULL,
+            record_id INTEGER,
+            old_value JSON,
+            new_value JSON,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT operation_logs_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE operation_logs_id_seq OWNED BY operation_logs.id")
+    _create_indexes()
+
+    # 覆盖已有数据的月份，并预建之后3个月的分区；其余时间落入默认分区
+    op.execute("""
+        DO $$
+        DECLARE
+            m DATE;
+        BEGIN
+            FOR m IN
+                SELECT generate_series(
+                    date_trunc('month', COALESCE((SELECT min(created_at) FROM operation_logs_legacy), now())),
+                    date_trunc('month', now()) + interval '3 months',
+                    interval '1 month'
+                )::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF operation_logs FOR VALUES FROM (%L) TO (%L)',
+                    'operation_logs_p' || to_char(m, 'YYYY_MM'), m, (m + interval '1 month')::date
+                );
+            END LOOP;
+        END $$
+    """)
+    op.execute("CREATE TABLE operation_logs_default PARTITION OF operation_logs DEFAULT")
+
+    op.execute(
+        f"INSERT INTO operation_logs ({_COLUMNS}) "
+        f"SELECT id, user_id, action_type, table_name, record_id, old_value, new_value, COALESCE(created_at, now()) "
+        f"FROM operation_logs_legacy"
+    )
+    op.execute("DROP TABLE operation_logs_legacy")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE operation_logs RENAME TO operation_logs_partitioned")
+    op.execute(
+        "ALTER TABLE operation_logs_partitioned RENAME CONSTRAINT operation_logs_pkey TO operation_logs_partitioned_pkey"
+    )
+    _drop_legacy_indexes()
+
+    op.execute("""
+        CREATE TABLE operation_logs (
+            id INTEGER NOT NULL DEFAULT nextval('operation_logs_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            action_type VARCHAR(50) NOT NULL,
+            table_name VARCHAR(50) NOT NULL,
+            record_id INTEGER,
+            old_value JSON,
+            new_value JSON,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            CONSTRAINT operation_logs_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE operation_logs_id_seq OWNED BY operation_logs.id")
+    _create_indexes()
+    op.execute(f"INSERT INTO operation_logs ({_COLUMNS}) SELECT {_COLUMNS} FROM operation_logs_partitioned")
+    op.execute("DROP TABLE operation_logs_partitioned CASCADE")
@@ -0,0 +1,30 @@
+"""add composite indexes to operation_logs
+
+Revision ID: 008_add_operation_log_indexes
+Revises: 007_partition_operation_logs
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+
+revision = "008_add_operation_log_indexes"
+down_revision = "007_partition_operation_logs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 在分区表上创建的索引会自动创建到每个分区
+    op.create_index(
+        "ix_operation_logs_table_record_created",
+        "operation_logs",
+        ["table_name", "record_id", "created_at"],
+        unique=False,
+    )
+    op.create_index("ix_operation_logs_user_created", "operation_logs", ["user_id", "created_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_operation_logs_user_created", table_name="operation_logs")
+    op.drop_index("ix_operation_logs_table_record_created", table_name="operation_logs")
@@ -1,8 +1,10 @@
 """认证相关API"""
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.password_pool import password_hasher
+from app.core.security import create_access_token
 from app.models.users import User
 from app.schemas.users import LoginRequest, Token, UserResponse, UserCreate
 from app.api.deps import get_current_user, get_current_admin
@@ -10,17 +12,33 @@ from app.api.deps import get_current_user, get_current_admin
 router = APIRouter()
 
 
+def _find_user(db: Session, username: str):
+    return db.query(User).filter(User.username == username).first()
+
+
 @router.post("/login", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
-    """用户登录"""
-    user = db.query(User).filter(User.username == login_data.username).first()
+async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+    """
+    用户登录
     
-    if not user or not verify_password(login_data.password, user.password_hash):
+    密码验证在独立的进程池中执行；哈希轮数与当前配置不一致时顺带升级哈希。
+    """
+    user = await run_in_threadpool(_find_user, db, login_data.username)
+    
+    valid = False
+    if user:
+        valid, new_hash = await password_hasher.verify_and_update(login_data.password, user.password_hash)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误",
         )
     
+    if new_hash:
+        user.password_hash = new_hash
+        await run_in_threadpool(db.commit)
+        await run_in_threadpool(db.refresh, user)
+    
     # 生成token
     access_token = create_access_token(data={"sub": str(user.id)})
     
@@ -56,7 +74,7 @@ def create_user(
         username=user_data.username,
         name=user_data.name,
         role=user_data.role,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=password_hasher.hash_sync(user_data.password),
         email=user_data.email,
         phone=user_data.phone,
     )
@@ -1,31 +1,53 @@
 """数据表数据查询API"""
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
-from app.core.database import get_db
-from app.api.deps import get_current_user
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.core.cache import get_cache, make_key
+from app.core.etag import is_not_modified, make_etag, not_modified_response, set_etag
+from app.core.responses import FastJSONResponse, dumps, json_fragment
+from app.api.deps import get_async_read_db, get_current_user_async
 from app.models import User, DataTable, TableData
 from app.schemas.data_tables import (
     TableDataCreate,
     TableDataResponse,
+    TableDataBatch,
+    TableDataBatchResult,
+    TableDataBulkUpdate,
     DataTableDataQuery,
+    DataTableAggregateQuery,
 )
+from app.services.table_data import (
+    aggregate_rows,
+    batch_write,
+    bump_data_version,
+    coerce_record,
+    count_rows,
+    data_table_brief,
+    fetch_rows_json,
+    filter_conditions,
+    update_by_filter,
+)
+from app.utils.log_decorator import create_operation_log
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
 @router.post("/{data_table_id}/data", response_model=TableDataResponse)
-def create_table_data(
+async def create_table_data(
     data_table_id: int,
     data: TableDataCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     创建数据（添加一条记录）
     """
     # 验证数据表存在
-    data_table = db.query(DataTable).filter(DataTable.id == data_table_id).first()
+    data_table = await db.get(DataTable, data_table_id)
     if not data_table:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -46,27 +68,165 @@ def create_table_data(
         data=data.data
     )
     db.add(table_data)
-    db.commit()
-    db.refresh(table_data)
+    await db.run_sync(bump_data_version, data_table_id)
+    await db.commit()
+    await db.refresh(table_data)
     
     return table_data
 
 
+@router.post("/{data_table_id}/data/batch", response_model=TableDataBatchResult)
+async def batch_table_data(
+    data_table_id: int,
+    batch: TableDataBatch,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    批量新增/局部更新/删除数据（单个事务）
+    
+    - create: 新增的数据内容列表
+    - update: [{id, data}]，data 按键合并到已有数据（JSONB ||）
+    - delete: 需要删除的数据ID列表
+    """
+    data_table = await db.get(DataTable, data_table_id)
+    if not data_table:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="数据表不存在"
+        )
+    
+    # 按字段配置统一校验
+    fields = data_table.fields or []
+    errors = []
+    creates = []
+    for index, record in enumerate(batch.create):
+        try:
+            creates.append(coerce_record(fields, record))
+        except ValueError as e:
+            errors.append(f"create[{index}]: {e}")
+    patches = []
+    for index, patch in enumerate(batch.update):
+        try:
+            patches.append({"id": patch.id, "data": coerce_record(fields, patch.data, partial=True)})
+        except ValueError as e:
+            errors.append(f"update[{index}]: {e}")
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="; ".join(errors[:50])
+        )
+    
+    try:
+        result = await db.run_sync(batch_write, data_table_id, creates, patches, batch.delete)
+        await db.run_sync(bump_data_version, data_table_id)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        logger.exception("数据表 %s 批量操作失败", data_table_id)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="批量操作失败，请稍后重试"
+        )
+    
+    # 记录汇总日志
+    create_operation_log(
+        db=db,
+        user_id=current_user.id,
+        action_type="update",
+        table_name="table_data",
+        record_id=data_table_id,
+        new_value={
+            "created": result["created"],
+            "updated": result["updated"],
+            "deleted": result["deleted"],
+        }
+    )
+    
+    return result
+
+
+@router.post("/{data_table_id}/data/bulk-update")
+async def bulk_update_table_data(
+    data_table_id: int,
+    bulk: TableDataBulkUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    按筛选条件批量更新数据（一条 UPDATE ... SET data = data || ...）
+    """
+    data_table = await db.get(DataTable, data_table_id)
+    if not data_table:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="数据表不存在"
+        )
+    
+    # 以实际生成的SQL条件判断，避免 {"stock": {}} 之类的空条件更新整张表
+    try:
+        conditions = filter_conditions(bulk.filters)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if not conditions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="请至少指定一个筛选条件"
+        )
+    if not bulk.assignments:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="请至少指定一个字段赋值"
+        )
+    
+    try:
+        assignments = coerce_record(data_table.fields or [], bulk.assignments, partial=True)
+        affected = await db.run_sync(update_by_filter, data_table_id, bulk.filters, assignments)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    await db.run_sync(bump_data_version, data_table_id)
+    await db.commit()
+    
+    # 记录一条汇总日志
+    create_operation_log(
+        db=db,
+        user_id=current_user.id,
+        action_type="update",
+        table_name="table_data",
+        record_id=data_table_id,
+        new_value={
+            "filters": bulk.filters,
+            "assignments": assignments,
+            "affected": affected,
+        }
+    )
+    
+    return {"affected": affected}
+
+
 @router.delete("/{data_table_id}/data/{data_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_table_data(
+async def delete_table_data(
     data_table_id: int,
     data_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     删除数据
     """
     # 查询数据
-    table_data = db.query(TableData).filter(
-        TableData.id == data_id,
-        TableData.data_table_id == data_table_id
-    ).first()
+    table_data = (await db.execute(
+        select(TableData).where(
+            TableData.id == data_id,
+            TableData.data_table_id == data_table_id
+        )
+    )).scalars().first()
     
     if not table_data:
         raise HTTPException(
@@ -74,73 +234,80 @@ def delete_table_data(
             detail="数据不存在"
         )
     
-    db.delete(table_data)
-    db.commit()
+    await db.delete(table_data)
+    await db.run_sync(bump_data_version, data_table_id)
+    await db.commit()
     
     return None
 
 
 @router.get("/{data_table_id}/data")
-def get_data_by_table_id(
+async def get_data_by_table_id(
     data_table_id: int,
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     通过数据表ID获取数据（从table_data表查询）
     """
     # 查询数据表配置
-    data_table = db.query(DataTable).filter(DataTable.id == data_table_id).first()
+    data_table = await db.get(DataTable, data_table_id)
     if not data_table:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="数据表不存在"
         )
     
-    # 查询该数据表的所有数据
-    query = db.query(TableData).filter(TableData.data_table_id == data_table_id)
-    
-    # 获取总数
-    total = query.count()
+    # 数据表版本号未变化时直接返回304
+    etag = make_etag("table-data", data_table.id, data_table.data_version, skip, limit)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
     
-    # 分页查询
-    items = query.order_by(TableData.id.desc()).offset(skip).limit(limit).all()
-    
-    # 转换为字典列表
-    items_dict = []
-    for item in items:
-        # 添加ID到数据中
-        data_with_id = {"id": item.id, "_id": item.id, **item.data}
-        items_dict.append(data_with_id)
+    async def build() -> bytes:
+        # 分页数据由数据库直接生成JSON（数据中的同名键优先，与旧行为一致）
+        items_json = await db.run_sync(
+            fetch_rows_json, data_table_id, skip=skip, limit=limit, id_overrides_data=False
+        )
+        return dumps({
+            "total": await db.run_sync(count_rows, data_table_id),
+            "items": json_fragment(items_json),
+            "skip": skip,
+            "limit": limit,
+            "fields": data_table.fields  # 返回字段配置
+        })
     
-    return {
-        "total": total,
-        "items": items_dict,
-        "skip": skip,
-        "limit": limit,
-        "fields": data_table.fields  # 返回字段配置
-    }
+    # 缓存键包含数据表版本号，数据写入后自动失效
+    cache_key = make_key(
+        "table-data", data_table.id, data_table.data_version,
+        payload={"skip": skip, "limit": limit},
+    )
+    response = FastJSONResponse(await get_cache().get_or_set_async(cache_key, build))
+    set_etag(response, etag)
+    return response
 
 
 @router.post("/query")
-def query_table_data(
+async def query_table_data(
     query: DataTableDataQuery,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     通用数据表查询接口
     """
-    table_query = db.query(DataTable).filter(DataTable.table_type == query.table_type)
+    table_query = select(DataTable).where(DataTable.table_type == query.table_type)
 
     if query.shop_id is not None:
-        table_query = table_query.filter(DataTable.shop_id == query.shop_id)
+        table_query = table_query.where(DataTable.shop_id == query.shop_id)
     if query.data_table_id is not None:
-        table_query = table_query.filter(DataTable.id == query.data_table_id)
+        table_query = table_query.where(DataTable.id == query.data_table_id)
 
-    data_table = table_query.order_by(DataTable.sort_order, DataTable.id).first()
+    data_table = (
+        await db.execute(table_query.order_by(DataTable.sort_order, DataTable.id).limit(1))
+    ).scalars().first()
 
     if not data_table:
         raise HTTPException(
@@ -148,45 +315,85 @@ def query_table_data(
             detail="未找到匹配的数据表"
         )
 
-    data_query = db.query(TableData).filter(TableData.data_table_id == data_table.id)
-
-    if query.filters:
-        for field, value in query.filters.items():
-            if value is None:
-                continue
-            data_query = data_query.filter(TableData.data[field].astext == str(value))
-
-    total = data_query.count()
-
-    if query.sort_by:
-        sort_expression = TableData.data[query.sort_by].astext
-        if (query.sort_order or "").lower() == "asc":
-            data_query = data_query.order_by(asc(sort_expression))
-        else:
-            data_query = data_query.order_by(desc(sort_expression))
-    else:
-        data_query = data_query.order_by(TableData.id.desc())
-
-    items = data_query.offset(query.skip).limit(query.limit).all()
-
-    items_dict = []
-    for item in items:
-        payload = dict(item.data)
-        payload["id"] = item.id
-        payload["_id"] = item.id  # 兼容旧字段
-        items_dict.append(payload)
-
-    return {
-        "total": total,
-        "items": items_dict,
-        "skip": query.skip,
-        "limit": query.limit,
-        "fields": data_table.fields,
-        "data_table": {
-            "id": data_table.id,
-            "name": data_table.name,
-            "table_type": data_table.table_type,
-            "shop_id": data_table.shop_id,
-        }
-    }
+    async def build() -> bytes:
+        items_json = await db.run_sync(
+            fetch_rows_json,
+            data_table.id,
+            filters=query.filters,
+            sort_by=query.sort_by,
+            sort_order=query.sort_order,
+            skip=query.skip,
+            limit=query.limit,
+        )
+        return dumps({
+            "total": await db.run_sync(count_rows, data_table.id, query.filters),
+            "items": json_fragment(items_json),
+            "skip": query.skip,
+            "limit": query.limit,
+            "fields": data_table.fields,
+            "data_table": data_table_brief(data_table),
+        })
+
+    cache_key = make_key(
+        "table-query", data_table.id, data_table.data_version,
+        payload={
+            "filters": {k: v for k, v in (query.filters or {}).items() if v is not None},
+            "sort_by": query.sort_by,
+            "sort_order": (query.sort_order or "desc").lower() if query.sort_by else None,
+            "skip": query.skip,
+            "limit": query.limit,
+        },
+    )
+    try:
+        return FastJSONResponse(await get_cache().get_or_set_async(cache_key, build))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
+
+@router.post("/aggregate")
+async def aggregate_table_data(
+    query: DataTableAggregateQuery,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    数据表分组聚合（看板统计）
+    """
+    data_table = await db.get(DataTable, query.data_table_id)
+    if not data_table:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="数据表不存在"
+        )
+
+    metrics = [metric.model_dump() for metric in query.metrics]
+
+    async def build() -> bytes:
+        rows = await db.run_sync(
+            aggregate_rows, data_table.id, query.filters, query.group_by, metrics, query.limit
+        )
+        return dumps({
+            "items": rows,
+            "group_by": query.group_by,
+            "data_table": data_table_brief(data_table),
+        })
+
+    cache_key = make_key(
+        "table-aggregate", data_table.id, data_table.data_version,
+        payload={
+            "filters": {k: v for k, v in (query.filters or {}).items() if v is not None},
+            "group_by": query.group_by,
+            "metrics": metrics,
+            "limit": query.limit,
+        },
+    )
+    try:
+        return FastJSONResponse(await get_cache().get_or_set_async(cache_key, build))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
@@ -1,127 +1,98 @@
 """数据表管理API"""
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
-import pandas as pd
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 import io
-from app.core.database import get_db
-from app.api.deps import get_current_user
-from app.models import User, DataTable, Shop, Platform, TableData
+import time
+from app.core.audit import disable_audit
+from app.core.database import get_async_db
+from app.core.monitoring import request_metrics
+from app.core.etag import is_not_modified, make_etag, not_modified_response, set_etag
+from app.core.cache import get_cache, make_key
+from app.core.responses import FastJSONResponse, dumps
+from app.api.deps import get_async_read_db, get_current_user_async
+from app.models import User, DataTable, Shop, TableData
 from app.schemas.data_tables import (
     DataTableCreate, DataTableUpdate, DataTableResponse,
     DataTableTreeNode, FieldConfig
 )
+from app.services.data_table_tree import build_tree
+from app.services.table_data import bump_data_version, coerce_record
+from app.services.versions import TREE_SCOPE, bump_version, get_version
+from app.utils.log_decorator import create_operation_log
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 router = APIRouter()
 
 
 @router.get("/tree", response_model=List[DataTableTreeNode])
-def get_data_table_tree(
+async def get_data_table_tree(
+    request: Request,
     platform_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    lite: bool = Query(False, description="精简模式：不返回数据表字段配置"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     获取数据表树形结构（平台-店铺-数据表）
     """
-    # 查询平台
-    platform_query = db.query(Platform).filter(Platform.is_active == 1)
-    if platform_id:
-        platform_query = platform_query.filter(Platform.id == platform_id)
-    platforms = platform_query.order_by(Platform.sort_order).all()
+    # 树未变化时直接返回304
+    version = await db.run_sync(get_version, TREE_SCOPE)
+    etag = make_etag("tree", version, platform_id, lite)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
     
-    tree = []
-    for platform in platforms:
-        platform_node = DataTableTreeNode(
-            id=platform.id,
-            name=platform.name,
-            type="platform",
-            platform_id=platform.id,
-            platform_name=platform.name,
-            children=[]
-        )
-        
-        # 查询该平台下的店铺
-        shops = db.query(Shop).filter(
-            Shop.platform_id == platform.id,
-            Shop.status == "active"
-        ).all()
-        
-        for shop in shops:
-            shop_node = DataTableTreeNode(
-                id=shop.id,
-                name=shop.name,
-                type="shop",
-                platform_id=platform.id,
-                platform_name=platform.name,
-                status=shop.status,
-                children=[]
-            )
-            
-            # 查询该店铺下的数据表
-            data_tables = db.query(DataTable).filter(
-                DataTable.shop_id == shop.id,
-                DataTable.is_active == 1
-            ).order_by(DataTable.sort_order).all()
-            
-            for data_table in data_tables:
-                table_node = DataTableTreeNode(
-                    id=data_table.id,
-                    name=data_table.name,
-                    type="data_table",
-                    table_type=data_table.table_type,
-                    platform_id=platform.id,
-                    platform_name=platform.name,
-                    shop_id=data_table.shop_id,
-                    is_active=data_table.is_active,
-                    fields=data_table.fields,  # 包含字段配置
-                    description=data_table.description,
-                    sort_order=data_table.sort_order
-                )
-                shop_node.children.append(table_node)
-            
-            platform_node.children.append(shop_node)
-        
-        tree.append(platform_node)
+    # 树缓存随版本号失效（平台、店铺、数据表变更时递增）
+    cache_key = make_key("tree", version, platform_id or 0, int(lite))
+    async def build() -> bytes:
+        return dumps(await db.run_sync(build_tree, platform_id, lite))
     
-    return tree
+    body = await get_cache().get_or_set_async(cache_key, build)
+    
+    response = FastJSONResponse(body)
+    set_etag(response, etag)
+    return response
 
 
 @router.get("", response_model=List[DataTableResponse])
-def get_data_tables(
+async def get_data_tables(
     shop_id: Optional[int] = None,
     table_type: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     获取数据表列表
     """
-    query = db.query(DataTable)
+    query = select(DataTable)
     
     if shop_id:
-        query = query.filter(DataTable.shop_id == shop_id)
+        query = query.where(DataTable.shop_id == shop_id)
     if table_type:
-        query = query.filter(DataTable.table_type == table_type)
+        query = query.where(DataTable.table_type == table_type)
     
     query = query.order_by(DataTable.sort_order, DataTable.id)
-    data_tables = query.offset(skip).limit(limit).all()
+    data_tables = (await db.execute(query.offset(skip).limit(limit))).scalars().all()
     
     return data_tables
 
 
 @router.get("/{data_table_id}", response_model=DataTableResponse)
-def get_data_table(
+async def get_data_table(
     data_table_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     获取数据表详情
     """
-    data_table = db.query(DataTable).filter(DataTable.id == data_table_id).first()
+    data_table = await db.get(DataTable, data_table_id)
     if not data_table:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -131,10 +102,10 @@ def get_data_table(
 
 
 @router.post("", response_model=DataTableResponse)
-def create_data_table(
+async def create_data_table(
     data_table_data: DataTableCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     创建数据表（仅管理员）- 支持自定义字段
@@ -146,7 +117,7 @@ def create_data_table(
         )
     
     # 验证店铺存在
-    shop = db.query(Shop).filter(Shop.id == data_table_data.shop_id).first()
+    shop = await db.get(Shop, data_table_data.shop_id)
     if not shop:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -183,18 +154,19 @@ def create_data_table(
         is_active=data_table_data.is_active
     )
     db.add(data_table)
-    db.commit()
-    db.refresh(data_table)
+    await db.run_sync(bump_version, TREE_SCOPE)
+    await db.commit()
+    await db.refresh(data_table)
     
     return data_table
 
 
 @router.put("/{data_table_id}", response_model=DataTableResponse)
-def update_data_table(
+async def update_data_table(
     data_table_id: int,
     data_table_data: DataTableUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     更新数据表（仅管理员）
@@ -206,7 +178,7 @@ def update_data_table(
         )
     
     # 查询数据表
-    data_table = db.query(DataTable).filter(DataTable.id == data_table_id).first()
+    data_table = await db.get(DataTable, data_table_id)
     if not data_table:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -217,18 +189,21 @@ def update_data_table(
     update_data = data_table_data.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(data_table, key, value)
+    # 字段配置等会出现在数据查询结果中，一并使缓存失效
+    data_table.data_version = DataTable.data_version + 1
+    await db.run_sync(bump_version, TREE_SCOPE)
     
-    db.commit()
-    db.refresh(data_table)
+    await db.commit()
+    await db.refresh(data_table)
     
     return data_table
 
 
 @router.delete("/{data_table_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_data_table(
+async def delete_data_table(
     data_table_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     删除数据表（仅管理员）
@@ -240,49 +215,127 @@ def delete_data_table(
         )
     
     # 查询数据表
-    data_table = db.query(DataTable).filter(DataTable.id == data_table_id).first()
+    data_table = await db.get(DataTable, data_table_id)
     if not data_table:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="数据表不存在"
         )
     
+    # 数据行用一条 DELETE 删除，不逐行加载与记录变更日志，删除后记录一条汇总日志
+    disable_audit(db)
+    deleted_rows = (await db.execute(
+        delete(TableData).where(TableData.data_table_id == data_table_id)
+    )).rowcount
+    summary = {
+        "name": data_table.name,
+        "shop_id": data_table.shop_id,
+        "table_type": data_table.table_type,
+        "fields": data_table.fields,
+        "deleted_rows": deleted_rows,
+    }
+    
     # 删除数据表
-    db.delete(data_table)
-    db.commit()
+    await db.delete(data_table)
+    await db.run_sync(bump_version, TREE_SCOPE)
+    await db.commit()
+    
+    create_operation_log(
+        db=db,
+        user_id=current_user.id,
+        action_type="delete",
+        table_name="data_tables",
+        record_id=data_table_id,
+        old_value=summary,
+    )
     
     return None
 
 
+def _load_pandas():
+    """
+    加载 pandas（连同 numpy、Excel 读取引擎）
+
+    只有解析/导入文件时才需要，不在模块导入时加载，以缩短进程启动时间；
+    首次加载耗时数百毫秒，应在线程池中调用。
+    """
+    import pandas
+
+    return pandas
+
+
+def _read_frame(contents: bytes, filename: str, nrows: Optional[int] = None) -> Optional["pd.DataFrame"]:
+    """
+    解析Excel/CSV文件内容（CPU密集，在线程池中调用），CSV自动尝试不同编码
+
+    文件格式不支持时返回 None
+    """
+    pd = _load_pandas()
+    if filename.endswith('.csv'):
+        for encoding in ['utf-8', 'gbk', 'gb2312', 'gb18030']:
+            try:
+                return pd.read_csv(io.BytesIO(contents), encoding=encoding, nrows=nrows)
+            except:
+                continue
+        raise ValueError("无法识别CSV文件编码")
+    if filename.endswith(('.xlsx', '.xls')):
+        return pd.read_excel(io.BytesIO(contents), nrows=nrows)
+    return None
+
+
+def _convert_import_rows(
+    df: "pd.DataFrame", fields: List[dict], error_strategy: str
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """按字段配置逐行转换导入数据（CPU密集，在线程池中调用），返回 (数据列表, 错误信息)"""
+    pd = _load_pandas()
+    records = []
+    errors = []
+    
+    columns = [field for field in fields if field['name'] in df.columns]
+    for index, row in df.iterrows():
+        try:
+            # 空单元格（NaN/NaT）视为空值，类型转换与写接口共用 coerce_record
+            data_record = {
+                field['name']: None if pd.isna(row[field['name']]) else row[field['name']]
+                for field in columns
+            }
+            data_record = coerce_record(fields, data_record)
+            
+            records.append(data_record)
+            
+        except Exception as e:
+            error_msg = f"第 {index + 2} 行: {str(e)}"
+            errors.append(error_msg)
+            
+            # 如果是遇错中止策略，立即停止
+            if error_strategy == 'abort':
+                print(f"遇错中止：{error_msg}")
+                break
+            
+            # 如果错误太多，提前终止
+            if len(errors) > 100:
+                errors.append("错误过多，已停止导入...")
+                break
+    
+    return records, errors
+
+
 @router.post("/parse-excel")
 async def parse_excel_file(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     解析Excel/CSV文件，自动识别字段和类型
     """
+    pd = await run_in_threadpool(_load_pandas)
     try:
         # 读取文件内容
         contents = await file.read()
         
-        # 根据文件扩展名判断文件类型
-        filename = file.filename.lower()
-        
-        if filename.endswith('.csv'):
-            # 解析CSV文件，自动尝试不同编码
-            for encoding in ['utf-8', 'gbk', 'gb2312', 'gb18030']:
-                try:
-                    df = pd.read_csv(io.BytesIO(contents), encoding=encoding, nrows=100)
-                    break
-                except:
-                    continue
-            else:
-                raise ValueError("无法识别CSV文件编码")
-        elif filename.endswith(('.xlsx', '.xls')):
-            # 解析Excel文件
-            df = pd.read_excel(io.BytesIO(contents), nrows=100)
-        else:
+        # 根据文件扩展名判断文件类型，在线程池中解析
+        df = await run_in_threadpool(_read_frame, contents, file.filename.lower(), 100)
+        if df is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="不支持的文件格式，请上传 .xlsx、.xls 或 .csv 文件"
@@ -350,8 +403,8 @@ async def import_table_data(
     file: UploadFile = File(...),
     import_mode: str = Form("append"),  # append: 追加, overwrite: 覆盖
     error_strategy: str = Form("skip"),  # skip: 跳过错误, abort: 遇错中止
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     将Excel/CSV文件数据导入到指定数据表
@@ -364,7 +417,7 @@ async def import_table_data(
     """
     try:
         # 查询数据表
-        data_table = db.query(DataTable).filter(DataTable.id == data_table_id).first()
+        data_table = await db.get(DataTable, data_table_id)
         if not data_table:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -373,22 +426,10 @@ async def import_table_data(
         
         # 读取文件内容
         contents = await file.read()
-        filename = file.filename.lower()
         
-        # 解析文件
-        if filename.endswith('.csv'):
-            # 自动尝试不同编码
-            for encoding in ['utf-8', 'gbk', 'gb2312', 'gb18030']:
-                try:
-                    df = pd.read_csv(io.BytesIO(contents), encoding=encoding)
-                    break
-                except:
-                    continue
-            else:
-                raise ValueError("无法识别CSV文件编码")
-        elif filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(io.BytesIO(contents))
-        else:
+        # 解析文件（在线程池中执行，不阻塞事件循环）
+        df = await run_in_threadpool(_read_frame, contents, file.filename.lower())
+        if df is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="不支持的文件格式"
@@ -424,83 +465,45 @@ async def import_table_data(
                 detail=f"文件缺少必填列: {', '.join(missing_required_fields)}"
             )
         
+        # 逐行导入不逐条记录变更日志，导入完成后记录一条汇总日志
+        disable_audit(db)
+        
         # 如果是覆盖模式，先删除所有数据
         if import_mode == 'overwrite':
-            deleted_count = db.query(TableData).filter(
-                TableData.data_table_id == data_table_id
-            ).delete()
-            db.commit()
+            deleted_count = (await db.execute(
+                delete(TableData).where(TableData.data_table_id == data_table_id)
+            )).rowcount
+            await db.run_sync(bump_data_version, data_table_id)
+            await db.commit()
             print(f"覆盖模式：已删除 {deleted_count} 条旧数据")
         
-        # 导入数据
-        imported_count = 0
-        errors = []
+        # 逐行转换在线程池中执行，转换结果一次多行插入
+        started = time.perf_counter()
+        records, errors = await run_in_threadpool(_convert_import_rows, df, fields, error_strategy)
+        imported_count = len(records)
+        if records:
+            await db.execute(
+                insert(TableData),
+                [{"data_table_id": data_table_id, "data": record} for record in records]
+            )
         
-        for index, row in df.iterrows():
-            try:
-                # 构建数据记录
-                data_record = {}
-                for field in fields:
-                    field_name = field['name']
-                    field_type = field.get('type', 'text')
-                    is_required = field.get('required', False)
-                    
-                    if field_name in df.columns:
-                        value = row[field_name]
-                        
-                        # 处理NaN值
-                        if pd.isna(value):
-                            if is_required:
-                                raise ValueError(f"必填字段 '{field_name}' 不能为空")
-                            value = None
-                        else:
-                            # 根据字段类型转换值
-                            if field_type == 'number':
-                                try:
-                                    value = float(value) if value is not None else None
-                                except (ValueError, TypeError):
-                                    raise ValueError(f"字段 '{field_name}' 应为数字类型")
-                            elif field_type == 'boolean':
-                                if isinstance(value, (bool, int)):
-                                    value = bool(value)
-                                elif isinstance(value, str):
-                                    value = value.lower() in ['true', '1', 'yes', '是']
-                            elif field_type == 'date':
-                                try:
-                                    if value is not None:
-                                        value = pd.to_datetime(value).isoformat()
-                                except:
-                                    raise ValueError(f"字段 '{field_name}' 日期格式错误")
-                            else:  # text
-                                value = str(value) if value is not None else None
-                        
-                        data_record[field_name] = value
-                    elif is_required:
-                        raise ValueError(f"文件中缺少必填字段: {field_name}")
-                
-                # 创建数据记录
-                table_data = TableData(
-                    data_table_id=data_table_id,
-                    data=data_record
-                )
-                db.add(table_data)
-                imported_count += 1
-                
-            except Exception as e:
-                error_msg = f"第 {index + 2} 行: {str(e)}"
-                errors.append(error_msg)
-                
-                # 如果是遇错中止策略，立即停止
-                if error_strategy == 'abort':
-                    print(f"遇错中止：{error_msg}")
-                    break
-                
-                # 如果错误太多，提前终止
-                if len(errors) > 100:
-                    errors.append("错误过多，已停止导入...")
-                    break
+        await db.run_sync(bump_data_version, data_table_id)
+        await db.commit()
+        request_metrics.observe_import(imported_count, time.perf_counter() - started)
         
-        db.commit()
+        create_operation_log(
+            db=db,
+            user_id=current_user.id,
+            action_type="create",
+            table_name="table_data",
+            record_id=data_table_id,
+            new_value={
+                "import_mode": import_mode,
+                "imported_rows": imported_count,
+                "error_count": len(errors),
+                "filename": file.filename,
+            }
+        )
         
         return {
             "success": True,
@@ -516,7 +519,7 @@ async def import_table_data(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"数据导入失败: {str(e)}"
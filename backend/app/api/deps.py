@@ -1,19 +1,22 @@
 """API依赖项"""
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.audit import set_audit_user
+from app.core.database import get_async_db, get_db, read_session
+from app.core.read_routing import has_recent_write
 from app.core.security import decode_access_token
 from app.models.users import User
+from app.services import user_cache
+from app.utils.batch_loader import BatchLoader
 
 security = HTTPBearer()
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """获取当前登录用户"""
+def _token_user_id(credentials: HTTPAuthorizationCredentials) -> int:
+    """解析JWT中的用户ID"""
     token = credentials.credentials
     payload = decode_access_token(token)
     
@@ -32,20 +35,46 @@ def get_current_user(
         )
     
     try:
-        user_id = int(user_id_str)
+        return int(user_id_str)
     except (ValueError, TypeError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="无效的认证凭证",
         )
-    
-    user = db.query(User).filter(User.id == user_id).first()
+
+
+def _check_user(user: Optional[User]) -> User:
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户不存在",
         )
+    return user
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """获取当前登录用户"""
+    user_id = _token_user_id(credentials)
+    
+    # 优先从缓存获取，命中时无需查询数据库
+    user = _check_user(user_cache.get_user(db, user_id))
     
+    # 本次请求中的数据变更日志记在该用户名下
+    set_audit_user(db, user.id)
+    return user
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """获取当前登录用户（异步路由使用，与路由共用异步会话）"""
+    user_id = _token_user_id(credentials)
+    user = _check_user(await user_cache.get_user_async(db, user_id))
+    set_audit_user(db, user.id)
     return user
 
 
@@ -58,3 +87,26 @@ def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
         )
     return current_user
 
+
+
+def get_loader(db: Session = Depends(get_db)) -> BatchLoader:
+    """获取请求级批量加载器（与请求共用数据库会话）"""
+    return BatchLoader(db)
+
+
+async def get_async_read_db(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    只读路由的异步会话：配置了只读副本时读副本
+
+    当前用户在复制延迟窗口内提交过写入时仍读主库（见 app/core/read_routing.py）。
+    """
+    user_id = _token_user_id(credentials)
+    async with read_session(primary=await has_recent_write(user_id)) as db:
+        yield db
+
+
+def get_async_loader(db: AsyncSession = Depends(get_async_read_db)) -> BatchLoader:
+    """获取基于只读会话的批量加载器（prime 后调用 load_async）"""
+    return BatchLoader(db)
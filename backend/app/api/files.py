@@ -0,0 +1,52 @@
+"""上传文件访问API"""
+import mimetypes
+import os
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from fastapi.responses import FileResponse
+from app.core.config import settings
+from app.services import upload_storage
+
+router = APIRouter()
+
+# 按内容哈希寻址的文件不会变化，可永久缓存
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 缩略图尚未生成、暂时返回原图时的缓存时间
+PENDING_CACHE_CONTROL = "public, max-age=60"
+# SVG 可能包含脚本，禁止其执行
+SVG_CONTENT_SECURITY_POLICY = "default-src 'none'; style-src 'unsafe-inline'; sandbox"
+
+
+@router.get("/{name}")
+def get_file(
+    name: str,
+    size: Optional[int] = Query(None, description="缩略图边长，未生成时返回原图")
+):
+    """获取上传的文件（无需登录，用于 img 标签；文件名为内容哈希，无法枚举）"""
+    found = upload_storage.resolve(name, size)
+    if found is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="文件不存在"
+        )
+    relative_path, final = found
+
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if final else PENDING_CACHE_CONTROL,
+        "X-Content-Type-Options": "nosniff",
+    }
+    if name.endswith(".svg"):
+        headers["Content-Security-Policy"] = SVG_CONTENT_SECURITY_POLICY
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    # 由nginx直接发送文件，应用进程只返回响应头
+    if settings.UPLOAD_ACCEL_REDIRECT_PREFIX:
+        prefix = settings.UPLOAD_ACCEL_REDIRECT_PREFIX.rstrip("/")
+        headers["X-Accel-Redirect"] = f"{prefix}/{relative_path.replace(os.sep, '/')}"
+        return Response(headers=headers, media_type=media_type)
+
+    return FileResponse(
+        os.path.join(settings.UPLOAD_DIR, relative_path),
+        media_type=media_type,
+        headers=headers,
+    )
@@ -1,20 +1,67 @@
 """操作日志API"""
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime
-from app.core.database import get_db
+from datetime import datetime, timedelta, timezone
+from app.core.cache import get_cache, make_key
+from app.core.responses import FastJSONResponse, dumps
 from app.models.logs import OperationLog
 from app.models.users import User
 from app.schemas.logs import OperationLogResponse, OperationLogQuery
-from app.api.deps import get_current_user
+from app.api.deps import get_async_loader, get_async_read_db, get_current_user_async
+from app.services.log_stats import compute_log_stats, daily_activity, stats_cache_scope
+from app.services.versions import get_version
+from app.utils.batch_loader import BatchLoader
 
 router = APIRouter()
 
 
+def _user_name(loader: BatchLoader, user_id: int) -> Optional[str]:
+    """通过批量加载器获取用户名"""
+    user = loader.get(User, user_id)
+    return user.name if user else None
+
+
+def _log_to_dict(log: OperationLog, user_name: Optional[str]) -> dict:
+    """日志转为响应字典（字段与 OperationLogResponse 一致）"""
+    return {
+        "id": log.id,
+        "user_id": log.user_id,
+        "user_name": user_name,
+        "action_type": log.action_type,
+        "table_name": log.table_name,
+        "record_id": log.record_id,
+        "old_value": log.old_value,
+        "new_value": log.new_value,
+        "created_at": log.created_at,
+    }
+
+
+def _filter_conditions(
+    user_id: Optional[int],
+    action_type: Optional[str],
+    table_name: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+) -> list:
+    """列表与计数共用的筛选条件"""
+    conditions = []
+    if user_id:
+        conditions.append(OperationLog.user_id == user_id)
+    if action_type:
+        conditions.append(OperationLog.action_type == action_type)
+    if table_name:
+        conditions.append(OperationLog.table_name == table_name)
+    if start_date:
+        conditions.append(OperationLog.created_at >= start_date)
+    if end_date:
+        conditions.append(OperationLog.created_at <= end_date)
+    return conditions
+
+
 @router.get("", response_model=List[OperationLogResponse])
-def list_operation_logs(
+async def list_operation_logs(
     user_id: Optional[int] = Query(None, description="用户ID筛选"),
     action_type: Optional[str] = Query(None, description="操作类型筛选"),
     table_name: Optional[str] = Query(None, description="表名筛选"),
@@ -22,93 +69,102 @@ def list_operation_logs(
     end_date: Optional[datetime] = Query(None, description="结束时间"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(50, ge=1, le=500, description="每页数量"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    loader: BatchLoader = Depends(get_async_loader),
+    current_user: User = Depends(get_current_user_async)
 ):
     """获取操作日志列表"""
-    # 构建查询
-    query = db.query(OperationLog)
-    
-    # 应用筛选条件
-    if user_id:
-        query = query.filter(OperationLog.user_id == user_id)
-    if action_type:
-        query = query.filter(OperationLog.action_type == action_type)
-    if table_name:
-        query = query.filter(OperationLog.table_name == table_name)
-    if start_date:
-        query = query.filter(OperationLog.created_at >= start_date)
-    if end_date:
-        query = query.filter(OperationLog.created_at <= end_date)
-    
-    # 按时间倒序排列
-    query = query.order_by(OperationLog.created_at.desc())
+    # 应用筛选条件，按时间倒序排列
+    stmt = (
+        select(OperationLog)
+        .where(*_filter_conditions(user_id, action_type, table_name, start_date, end_date))
+        .order_by(OperationLog.created_at.desc())
+    )
     
     # 分页
     offset = (page - 1) * page_size
-    logs = query.offset(offset).limit(page_size).all()
+    logs = (await db.execute(stmt.offset(offset).limit(page_size))).scalars().all()
     
-    # 添加用户名
-    result = []
-    for log in logs:
-        log_dict = {
-            "id": log.id,
-            "user_id": log.user_id,
-            "action_type": log.action_type,
-            "table_name": log.table_name,
-            "record_id": log.record_id,
-            "old_value": log.old_value,
-            "new_value": log.new_value,
-            "created_at": log.created_at,
-            "user_name": None
-        }
-        
-        # 获取用户名
-        user = db.query(User).filter(User.id == log.user_id).first()
-        if user:
-            log_dict["user_name"] = user.name
-        
-        result.append(OperationLogResponse(**log_dict))
+    # 批量加载用户名
+    await loader.prime(User, (log.user_id for log in logs)).load_async()
+    result = [_log_to_dict(log, _user_name(loader, log.user_id)) for log in logs]
     
-    return result
+    return FastJSONResponse(result)
 
 
 @router.get("/count")
-def get_log_count(
+async def get_log_count(
     user_id: Optional[int] = Query(None),
     action_type: Optional[str] = Query(None),
     table_name: Optional[str] = Query(None),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """获取日志总数"""
-    query = db.query(OperationLog)
-    
-    if user_id:
-        query = query.filter(OperationLog.user_id == user_id)
-    if action_type:
-        query = query.filter(OperationLog.action_type == action_type)
-    if table_name:
-        query = query.filter(OperationLog.table_name == table_name)
-    if start_date:
-        query = query.filter(OperationLog.created_at >= start_date)
-    if end_date:
-        query = query.filter(OperationLog.created_at <= end_date)
-    
-    total = query.count()
+    stmt = select(func.count()).select_from(OperationLog).where(
+        *_filter_conditions(user_id, action_type, table_name, start_date, end_date)
+    )
+    total = (await db.execute(stmt)).scalar()
     return {"total": total}
 
 
+@router.get("/history/{table_name}/{record_id}", response_model=List[OperationLogResponse])
+async def get_record_history(
+    table_name: str,
+    record_id: int,
+    before: Optional[datetime] = Query(None, description="翻页游标：上一页最后一条的 created_at"),
+    before_id: Optional[int] = Query(None, description="翻页游标：上一页最后一条的 id（与 before 一起使用）"),
+    limit: int = Query(100, ge=1, le=500, description="返回数量"),
+    db: AsyncSession = Depends(get_async_read_db),
+    loader: BatchLoader = Depends(get_async_loader),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    获取单条记录的变更历史（按时间倒序）
+
+    走 (table_name, record_id, created_at) 索引，按 (created_at, id) 排序；翻页时以上一页最后一条的
+    created_at、id 作为 before、before_id（同一事务写入的日志 created_at 相同，只按时间翻页会漏掉记录）。
+    """
+    stmt = select(OperationLog).where(
+        OperationLog.table_name == table_name,
+        OperationLog.record_id == record_id,
+    )
+    if before and before_id is not None:
+        stmt = stmt.where(tuple_(OperationLog.created_at, OperationLog.id) < tuple_(before, before_id))
+    elif before:
+        stmt = stmt.where(OperationLog.created_at < before)
+    stmt = stmt.order_by(OperationLog.created_at.desc(), OperationLog.id.desc()).limit(limit)
+    logs = (await db.execute(stmt)).scalars().all()
+    
+    await loader.prime(User, (log.user_id for log in logs)).load_async()
+    return FastJSONResponse([_log_to_dict(log, _user_name(loader, log.user_id)) for log in logs])
+
+
+@router.get("/activity")
+async def get_daily_activity(
+    start_date: Optional[datetime] = Query(None, description="开始时间，默认30天前"),
+    end_date: Optional[datetime] = Query(None, description="结束时间，默认当前时间"),
+    user_id: Optional[int] = Query(None, description="用户ID筛选"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """按用户、按天统计操作数：[{"user_id", "user_name", "day", "count"}]"""
+    end_date = end_date or datetime.now(timezone.utc)
+    start_date = start_date or end_date - timedelta(days=30)
+    return FastJSONResponse(await db.run_sync(daily_activity, start_date, end_date, user_id))
+
+
 @router.get("/{log_id}", response_model=OperationLogResponse)
-def get_operation_log(
+async def get_operation_log(
     log_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    loader: BatchLoader = Depends(get_async_loader),
+    current_user: User = Depends(get_current_user_async)
 ):
     """获取操作日志详情"""
-    log = db.query(OperationLog).filter(OperationLog.id == log_id).first()
+    log = (await db.execute(select(OperationLog).where(OperationLog.id == log_id))).scalars().first()
     
     if not log:
         raise HTTPException(
@@ -116,70 +172,34 @@ def get_operation_log(
             detail="操作日志不存在"
         )
     
-    log_dict = {
-        "id": log.id,
-        "user_id": log.user_id,
-        "action_type": log.action_type,
-        "table_name": log.table_name,
-        "record_id": log.record_id,
-        "old_value": log.old_value,
-        "new_value": log.new_value,
-        "created_at": log.created_at,
-        "user_name": None
-    }
-    
-    # 获取用户名
-    user = db.query(User).filter(User.id == log.user_id).first()
-    if user:
-        log_dict["user_name"] = user.name
-    
-    return OperationLogResponse(**log_dict)
+    await loader.prime(User, [log.user_id]).load_async()
+    return FastJSONResponse(_log_to_dict(log, _user_name(loader, log.user_id)))
 
 
 @router.get("/stats/summary")
-def get_log_stats(
+async def get_log_stats(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async)
 ):
-    """获取操作日志统计"""
-    query = db.query(OperationLog)
-    
-    if start_date:
-        query = query.filter(OperationLog.created_at >= start_date)
-    if end_date:
-        query = query.filter(OperationLog.created_at <= end_date)
-    
-    # 按操作类型统计
-    action_stats = {}
-    for action_type in ['create', 'update', 'delete']:
-        count = query.filter(OperationLog.action_type == action_type).count()
-        action_stats[action_type] = count
-    
-    # 按表名统计
-    table_stats = {}
-    tables = db.query(OperationLog.table_name).distinct().all()
-    for (table_name,) in tables:
-        count = query.filter(OperationLog.table_name == table_name).count()
-        table_stats[table_name] = count
-    
-    # 按用户统计
-    user_stats = []
-    users = db.query(OperationLog.user_id).distinct().all()
-    for (user_id,) in users:
-        count = query.filter(OperationLog.user_id == user_id).count()
-        user = db.query(User).filter(User.id == user_id).first()
-        user_stats.append({
-            "user_id": user_id,
-            "user_name": user.name if user else None,
-            "count": count
-        })
-    
-    return {
-        "total": query.count(),
-        "action_stats": action_stats,
-        "table_stats": table_stats,
-        "user_stats": user_stats
-    }
+    """
+    获取操作日志统计
 
+    一次分组查询得到全部统计；结果按时间范围缓存，键中包含日志版本号（见 stats_cache_scope）。
+    """
+    scope, ttl = stats_cache_scope(end_date)
+    cache_key = make_key(
+        "log-stats",
+        scope,
+        await db.run_sync(get_version, scope),
+        payload={
+            "start": start_date.isoformat() if start_date else None,
+            "end": end_date.isoformat() if end_date else None,
+        },
+    )
+    async def build() -> bytes:
+        return dumps(await db.run_sync(compute_log_stats, start_date, end_date))
+    
+    body = await get_cache().get_or_set_async(cache_key, build, ttl)
+    return FastJSONResponse(body)
@@ -1,8 +1,10 @@
 """菜单管理API"""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
+from app.core.etag import is_not_modified, not_modified_response, set_etag
+from app.core.responses import FastJSONResponse
 from app.models.menu_items import MenuItem
 from app.models.users import User
 from app.schemas.menu_items import (
@@ -12,79 +14,41 @@ from app.schemas.menu_items import (
     MenuItemBatchSort
 )
 from app.api.deps import get_current_admin, get_current_user
+from app.services.menu_cache import menu_cache
+from app.services.versions import MENU_SCOPE, bump_version
 
 router = APIRouter()
 
 
-def build_menu_tree(items: List[MenuItem]) -> List[dict]:
-    """构建菜单树"""
-    # 创建字典用于快速查找
-    item_dict = {item.id: {
-        "id": item.id,
-        "name": item.name,
-        "icon": item.icon,
-        "path": item.path,
-        "parent_id": item.parent_id,
-        "sort_order": item.sort_order,
-        "is_visible": item.is_visible,
-        "required_role": item.required_role,
-        "component": item.component,
-        "created_at": item.created_at,
-        "updated_at": item.updated_at,
-        "children": []
-    } for item in items}
-    
-    # 构建树结构
-    tree = []
-    for item in items:
-        if item.parent_id is None:
-            tree.append(item_dict[item.id])
-        else:
-            if item.parent_id in item_dict:
-                item_dict[item.parent_id]["children"].append(item_dict[item.id])
-    
-    return tree
+def _role_menus_response(request: Request, etag: str, body: bytes) -> Response:
+    """输出预先序列化的菜单，ETag匹配时返回304"""
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response = FastJSONResponse(body)
+    set_etag(response, etag)
+    return response
 
 
 @router.get("", response_model=List[MenuItemResponse])
 def get_menus(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """获取当前用户可见的菜单"""
-    query = db.query(MenuItem).filter(MenuItem.is_visible == 1)
-    
-    # 根据角色筛选
-    if current_user.role != "admin":
-        query = query.filter(
-            (MenuItem.required_role == "all") | 
-            (MenuItem.required_role == current_user.role)
-        )
-    
-    items = query.order_by(MenuItem.sort_order, MenuItem.id).all()
-    
-    # 返回扁平列表，前端可以自行构建树
-    return items
+    """获取当前用户可见的菜单（扁平列表，前端可以自行构建树）"""
+    menus = menu_cache.for_role(db, current_user.role)
+    return _role_menus_response(request, menus.menus_etag, menus.menus_body)
 
 
 @router.get("/tree", response_model=List[dict])
 def get_menu_tree(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """获取菜单树结构"""
-    query = db.query(MenuItem).filter(MenuItem.is_visible == 1)
-    
-    # 根据角色筛选
-    if current_user.role != "admin":
-        query = query.filter(
-            (MenuItem.required_role == "all") | 
-            (MenuItem.required_role == current_user.role)
-        )
-    
-    items = query.order_by(MenuItem.sort_order, MenuItem.id).all()
-    
-    return build_menu_tree(items)
+    menus = menu_cache.for_role(db, current_user.role)
+    return _role_menus_response(request, menus.tree_etag, menus.tree_body)
 
 
 @router.get("/all", response_model=List[MenuItemResponse])
@@ -133,7 +97,9 @@ def create_menu(
     
     menu = MenuItem(**menu_data.model_dump())
     db.add(menu)
+    bump_version(db, MENU_SCOPE)
     db.commit()
+    menu_cache.invalidate()
     db.refresh(menu)
     
     return menu
@@ -173,8 +139,10 @@ def update_menu(
     # 更新字段
     for field, value in menu_data.model_dump(exclude_unset=True).items():
         setattr(menu, field, value)
+    bump_version(db, MENU_SCOPE)
     
     db.commit()
+    menu_cache.invalidate()
     db.refresh(menu)
     
     return menu
@@ -204,7 +172,9 @@ def delete_menu(
         )
     
     db.delete(menu)
+    bump_version(db, MENU_SCOPE)
     db.commit()
+    menu_cache.invalidate()
     
     return {"message": "菜单已删除"}
 
@@ -220,8 +190,10 @@ def batch_sort_menus(
         menu = db.query(MenuItem).filter(MenuItem.id == item.id).first()
         if menu:
             menu.sort_order = item.sort_order
+    bump_version(db, MENU_SCOPE)
     
     db.commit()
+    menu_cache.invalidate()
     
     return {
         "message": f"成功更新 {len(sort_data.items)} 个菜单的排序",
@@ -8,6 +8,7 @@ from app.models.shops import Shop
 from app.models.users import User
 from app.schemas.platforms import PlatformCreate, PlatformUpdate, PlatformResponse
 from app.api.deps import get_current_admin, get_current_user
+from app.services.versions import TREE_SCOPE, bump_version
 
 router = APIRouter()
 
@@ -102,6 +103,7 @@ def create_platform(
     
     platform = Platform(**platform_data.model_dump())
     db.add(platform)
+    bump_version(db, TREE_SCOPE)
     db.commit()
     db.refresh(platform)
     
@@ -151,6 +153,7 @@ def update_platform(
     # 更新字段
     for field, value in platform_data.model_dump(exclude_unset=True).items():
         setattr(platform, field, value)
+    bump_version(db, TREE_SCOPE)
     
     db.commit()
     db.refresh(platform)
@@ -182,6 +185,7 @@ def delete_platform(
         )
     
     db.delete(platform)
+    bump_version(db, TREE_SCOPE)
     db.commit()
     
     return {"message": "平台已删除"}
@@ -1,10 +1,10 @@
 """系统设置API"""
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request, Response
+from sqlalchemy import String, Text, column, func, update, values
 from sqlalchemy.orm import Session
 from typing import List
-import os
-import uuid
 from app.core.database import get_db
+from app.core.etag import is_not_modified, make_etag, not_modified_response, set_etag
 from app.models.system_settings import SystemSetting
 from app.schemas.system_settings import (
     SystemSettingCreate,
@@ -14,29 +14,45 @@ from app.schemas.system_settings import (
 )
 from app.api.deps import get_current_admin, get_current_user
 from app.models.users import User
+from app.services import upload_storage
+from app.services.settings_cache import settings_cache
+from app.services.versions import bump_version, settings_scope
+from app.utils.log_decorator import create_operation_log
 
 router = APIRouter()
 
+# Logo使用的缩略图边长（须在 THUMBNAIL_SIZES 中）
+LOGO_THUMBNAIL_SIZE = 256
+
+
+def _bump_settings(db: Session, *group_names) -> None:
+    """递增全部设置及相关分组的版本号"""
+    bump_version(db, settings_scope(), *(settings_scope(name) for name in group_names if name))
+
 
 @router.get("", response_model=List[SystemSettingResponse])
 def get_settings(
+    request: Request,
+    response: Response,
     group_name: str = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """获取系统设置（支持按分组筛选）"""
-    query = db.query(SystemSetting)
-    
-    # 非管理员只能看公开配置
-    if current_user.role != "admin":
-        query = query.filter(SystemSetting.is_public == 1)
-    
-    # 按分组筛选
-    if group_name:
-        query = query.filter(SystemSetting.group_name == group_name)
-    
-    settings = query.all()
-    return settings
+    """获取系统设置（支持按分组筛选，从进程内缓存读取）"""
+    snapshot = settings_cache.snapshot(db)
+    
+    # 设置版本号未变化时直接返回304
+    etag = make_etag("settings", snapshot.version, group_name, current_user.role == "admin")
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
+    return [
+        row for row in snapshot.rows
+        # 非管理员只能看公开配置
+        if (current_user.role == "admin" or row["is_public"] == 1)
+        and (not group_name or row["group_name"] == group_name)
+    ]
 
 
 @router.get("/{key}", response_model=SystemSettingResponse)
@@ -46,7 +62,7 @@ def get_setting_by_key(
     current_user: User = Depends(get_current_user)
 ):
     """获取指定配置项"""
-    setting = db.query(SystemSetting).filter(SystemSetting.key == key).first()
+    setting = settings_cache.snapshot(db).by_key.get(key)
     
     if not setting:
         raise HTTPException(
@@ -55,7 +71,7 @@ def get_setting_by_key(
         )
     
     # 检查权限
-    if setting.is_public == 0 and current_user.role != "admin":
+    if setting["is_public"] == 0 and current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="无权访问此配置"
@@ -81,7 +97,9 @@ def create_setting(
     
     setting = SystemSetting(**setting_data.model_dump())
     db.add(setting)
+    _bump_settings(db, setting.group_name)
     db.commit()
+    settings_cache.invalidate()
     db.refresh(setting)
     
     return setting
@@ -104,10 +122,13 @@ def update_setting(
         )
     
     # 更新字段
+    old_group_name = setting.group_name
     for field, value in setting_data.model_dump(exclude_unset=True).items():
         setattr(setting, field, value)
+    _bump_settings(db, old_group_name, setting.group_name)
     
     db.commit()
+    settings_cache.invalidate()
     db.refresh(setting)
     
     return setting
@@ -117,18 +138,35 @@ def update_setting(
 def batch_update_settings(
     batch_data: SystemSettingsBatchUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_admin)
+    current_user: User = Depends(get_current_admin)
 ):
-    """批量更新系统设置（仅管理员）"""
-    updated_count = 0
-    
-    for key, value in batch_data.settings.items():
-        setting = db.query(SystemSetting).filter(SystemSetting.key == key).first()
-        if setting:
-            setting.value = value
-            updated_count += 1
-    
+    """批量更新系统设置（仅管理员）- 一条 UPDATE ... FROM (VALUES ...) 完成"""
+    group_names = []
+    if batch_data.settings:
+        new_values = values(
+            column("key", String), column("value", Text), name="new_values"
+        ).data(list(batch_data.settings.items()))
+        stmt = (
+            update(SystemSetting)
+            .where(SystemSetting.key == new_values.c.key)
+            .values(value=new_values.c.value, updated_at=func.now())
+            .returning(SystemSetting.group_name)
+            .execution_options(synchronize_session=False)
+        )
+        group_names = list(db.execute(stmt).scalars())
+    updated_count = len(group_names)
+    
+    if updated_count:
+        _bump_settings(db, *set(group_names))
+        create_operation_log(
+            db=db,
+            user_id=current_user.id,
+            action_type="update",
+            table_name="system_settings",
+            new_value=batch_data.settings,
+        )
     db.commit()
+    settings_cache.invalidate()
     
     return {
         "message": f"成功更新 {updated_count} 个配置项",
@@ -151,22 +189,11 @@ async def upload_logo(
             detail="不支持的文件类型，仅支持：PNG, JPEG, JPG, GIF, SVG"
         )
     
-    # 生成唯一文件名
-    file_ext = os.path.splitext(file.filename)[1]
-    unique_filename = f"logo_{uuid.uuid4()}{file_ext}"
-    
-    # 确保上传目录存在
-    upload_dir = "uploads/logos"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # 保存文件
-    file_path = os.path.join(upload_dir, unique_filename)
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    # 按内容哈希保存（相同图片只存一份），缩略图在后台生成
+    stored = await upload_storage.save_image(file)
     
     # 更新数据库中的logo_url配置
-    logo_url = f"/{file_path}"
+    logo_url = stored.thumbnail_url(LOGO_THUMBNAIL_SIZE)
     setting = db.query(SystemSetting).filter(SystemSetting.key == "logo_url").first()
     if setting:
         setting.value = logo_url
@@ -181,13 +208,16 @@ async def upload_logo(
             is_public=1
         )
         db.add(setting)
+    _bump_settings(db, setting.group_name)
     
     db.commit()
+    settings_cache.invalidate()
     
     return {
         "message": "Logo上传成功",
         "url": logo_url,
-        "filename": unique_filename
+        "original_url": stored.url,
+        "filename": stored.name
     }
 
 
@@ -207,6 +237,8 @@ def delete_setting(
         )
     
     db.delete(setting)
+    _bump_settings(db, setting.group_name)
     db.commit()
+    settings_cache.invalidate()
     
     return {"message": "配置项已删除"}
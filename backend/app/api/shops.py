@@ -7,12 +7,26 @@ from app.models.shops import Shop
 from app.models.platforms import Platform
 from app.models.users import User
 from app.schemas.shops import ShopCreate, ShopUpdate, ShopResponse, ShopWithManager
-from app.api.deps import get_current_user
-from app.utils.log_decorator import create_operation_log
+from app.api.deps import get_current_user, get_loader
+from app.utils.batch_loader import BatchLoader
+from app.services.versions import TREE_SCOPE, bump_version
 
 router = APIRouter()
 
 
+def _shop_with_manager(shop: Shop, loader: BatchLoader) -> ShopWithManager:
+    """店铺附带平台名称与管理员姓名（通过批量加载器获取）"""
+    shop_dict = ShopResponse.from_orm(shop).model_dump()
+    platform = loader.get(Platform, shop.platform_id)
+    platform_name = platform.name if platform else shop.platform
+    shop_dict["platform_name"] = platform_name
+    # 兼容旧字段
+    shop_dict["platform"] = platform_name
+    manager = loader.get(User, shop.manager_id)
+    shop_dict['manager_name'] = manager.name if manager else None
+    return ShopWithManager(**shop_dict)
+
+
 @router.post("", response_model=ShopResponse, status_code=status.HTTP_201_CREATED)
 def create_shop(
     shop_data: ShopCreate,
@@ -45,23 +59,10 @@ def create_shop(
         **payload,
     )
     db.add(new_shop)
+    bump_version(db, TREE_SCOPE)
     db.commit()
     db.refresh(new_shop)
     
-    # 记录操作日志
-    create_operation_log(
-        db=db,
-        user_id=current_user.id,
-        action_type="create",
-        table_name="shops",
-        record_id=new_shop.id,
-        new_value={
-            "name": new_shop.name,
-            "platform_id": new_shop.platform_id,
-            "platform": platform.name,
-        }
-    )
-    
     shop_response = ShopResponse.model_validate(new_shop, from_attributes=True)
     response_data = shop_response.model_dump()
     response_data["platform_name"] = platform.name
@@ -77,6 +78,7 @@ def list_shops(
     platform_id: Optional[int] = None,
     status: Optional[str] = None,
     db: Session = Depends(get_db),
+    loader: BatchLoader = Depends(get_loader),
     current_user: User = Depends(get_current_user)
 ):
     """获取店铺列表"""
@@ -92,29 +94,18 @@ def list_shops(
     
     shops = query.offset(skip).limit(limit).all()
     
-    # 添加管理员姓名
-    result = []
-    for shop in shops:
-        shop_dict = ShopResponse.from_orm(shop).model_dump()
-        platform_name = shop.platform_obj.name if shop.platform_obj else shop.platform
-        shop_dict["platform_name"] = platform_name
-        # 兼容旧字段
-        shop_dict["platform"] = platform_name
-        manager_name = None
-        if shop.manager_id:
-            manager = db.query(User).filter(User.id == shop.manager_id).first()
-            if manager:
-                manager_name = manager.name
-        shop_dict['manager_name'] = manager_name
-        result.append(ShopWithManager(**shop_dict))
+    # 批量加载平台与管理员
+    loader.prime(Platform, (shop.platform_id for shop in shops))
+    loader.prime(User, (shop.manager_id for shop in shops))
     
-    return result
+    return [_shop_with_manager(shop, loader) for shop in shops]
 
 
 @router.get("/{shop_id}", response_model=ShopWithManager)
 def get_shop(
     shop_id: int,
     db: Session = Depends(get_db),
+    loader: BatchLoader = Depends(get_loader),
     current_user: User = Depends(get_current_user)
 ):
     """获取店铺详情"""
@@ -125,18 +116,7 @@ def get_shop(
             detail="店铺不存在",
         )
     
-    shop_dict = ShopResponse.from_orm(shop).model_dump()
-    platform_name = shop.platform_obj.name if shop.platform_obj else shop.platform
-    shop_dict["platform_name"] = platform_name
-    shop_dict["platform"] = platform_name
-    manager_name = None
-    if shop.manager_id:
-        manager = db.query(User).filter(User.id == shop.manager_id).first()
-        if manager:
-            manager_name = manager.name
-    shop_dict['manager_name'] = manager_name
-    
-    return ShopWithManager(**shop_dict)
+    return _shop_with_manager(shop, loader)
 
 
 @router.put("/{shop_id}", response_model=ShopResponse)
@@ -154,14 +134,6 @@ def update_shop(
             detail="店铺不存在",
         )
     
-    # 保存旧值
-    old_value = {
-        "name": shop.name,
-        "platform_id": shop.platform_id,
-        "platform": shop.platform,
-        "status": shop.status,
-    }
-    
     # 更新字段
     update_data = shop_data.model_dump(exclude_unset=True)
 
@@ -178,26 +150,11 @@ def update_shop(
     
     for field, value in update_data.items():
         setattr(shop, field, value)
+    bump_version(db, TREE_SCOPE)
     
     db.commit()
     db.refresh(shop)
     
-    # 记录操作日志
-    create_operation_log(
-        db=db,
-        user_id=current_user.id,
-        action_type="update",
-        table_name="shops",
-        record_id=shop.id,
-        old_value=old_value,
-        new_value={
-            "name": shop.name,
-            "platform_id": shop.platform_id,
-            "platform": shop.platform,
-            "status": shop.status,
-        }
-    )
-    
     platform_name = shop.platform_obj.name if shop.platform_obj else shop.platform
     shop_response = ShopResponse.model_validate(shop, from_attributes=True)
     response_data = shop_response.model_dump()
@@ -220,26 +177,10 @@ def delete_shop(
             detail="店铺不存在",
         )
     
-    # 保存旧值用于日志
-    old_value = {
-        "name": shop.name,
-        "platform_id": shop.platform_id,
-        "platform": shop.platform,
-    }
-    
     db.delete(shop)
+    bump_version(db, TREE_SCOPE)
     db.commit()
     
-    # 记录操作日志
-    create_operation_log(
-        db=db,
-        user_id=current_user.id,
-        action_type="delete",
-        table_name="shops",
-        record_id=shop_id,
-        old_value=old_value
-    )
-    
     return None
 
 
@@ -2,17 +2,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import os
-import uuid
 from app.core.database import get_db
-from app.core.security import get_password_hash
+from app.core.password_pool import password_hasher
 from app.models.users import User
 from app.schemas.users import UserResponse, UserCreate, UserUpdate
 from app.api.deps import get_current_admin, get_current_user
+from app.services import upload_storage, user_cache
 from pydantic import BaseModel
 
 router = APIRouter()
 
+# 头像使用的缩略图边长（须在 THUMBNAIL_SIZES 中）
+AVATAR_THUMBNAIL_SIZE = 256
+
 
 class PasswordChangeRequest(BaseModel):
     old_password: str
@@ -129,9 +131,10 @@ def update_user(
     
     # 如果提供了新密码
     if user_data.password:
-        user.password_hash = get_password_hash(user_data.password)
+        user.password_hash = password_hasher.hash_sync(user_data.password)
     
     db.commit()
+    user_cache.invalidate_users(user_id)
     db.refresh(user)
     
     return UserResponse.from_orm(user)
@@ -161,6 +164,7 @@ def delete_user(
     
     db.delete(user)
     db.commit()
+    user_cache.invalidate_users(user_id)
     
     return {"message": "用户已删除"}
 
@@ -173,8 +177,6 @@ def change_password(
     current_user: User = Depends(get_current_user)
 ):
     """修改密码"""
-    from app.core.security import verify_password
-    
     # 只能修改自己的密码
     if current_user.id != user_id:
         raise HTTPException(
@@ -191,15 +193,16 @@ def change_password(
         )
     
     # 验证旧密码
-    if not verify_password(request.old_password, user.password_hash):
+    if not password_hasher.verify_sync(request.old_password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="旧密码错误"
         )
     
     # 设置新密码
-    user.password_hash = get_password_hash(request.new_password)
+    user.password_hash = password_hasher.hash_sync(request.new_password)
     db.commit()
+    user_cache.invalidate_users(user_id)
     
     return {"message": "密码修改成功"}
 
@@ -235,29 +238,20 @@ async def upload_avatar(
             detail="不支持的文件类型，仅支持：PNG, JPEG, JPG, GIF"
         )
     
-    # 生成唯一文件名
-    file_ext = os.path.splitext(file.filename)[1]
-    unique_filename = f"avatar_{user_id}_{uuid.uuid4()}{file_ext}"
-    
-    # 确保上传目录存在
-    upload_dir = "uploads/avatars"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # 保存文件
-    file_path = os.path.join(upload_dir, unique_filename)
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    # 按内容哈希保存（相同图片只存一份），缩略图在后台生成
+    stored = await upload_storage.save_image(file)
     
-    # 更新数据库
-    avatar_url = f"/{file_path}"
+    # 更新数据库（头像只以缩略图展示）
+    avatar_url = stored.thumbnail_url(AVATAR_THUMBNAIL_SIZE)
     user.avatar = avatar_url
     db.commit()
+    user_cache.invalidate_users(user_id)
     
     return {
         "message": "头像上传成功",
         "url": avatar_url,
-        "filename": unique_filename
+        "original_url": stored.url,
+        "filename": stored.name
     }
 
 
@@ -277,6 +271,7 @@ def batch_delete_users(
     
     deleted_count = db.query(User).filter(User.id.in_(request.user_ids)).delete(synchronize_session=False)
     db.commit()
+    user_cache.invalidate_users(*request.user_ids)
     
     return {
         "message": f"成功删除 {deleted_count} 个用户",
@@ -304,6 +299,7 @@ def batch_update_role(
     ).update({"role": request.role}, synchronize_session=False)
     
     db.commit()
+    user_cache.invalidate_users(*request.user_ids)
     
     return {
         "message": f"成功更新 {updated_count} 个用户的角色",
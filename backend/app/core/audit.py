@@ -0,0 +1,151 @@
+"""
+基于ORM会话事件的操作日志变更捕获
+
+每次 flush 后收集受审计模型的新增/修改/删除：
+- 新增：记录非空字段
+- 修改：只记录发生变化的字段（old_value / new_value 成对出现）；字典类型的JSON字段
+  （如 TableData.data）只记录变化的键
+- 删除：记录删除前的非空字段
+同一次 flush 的全部日志用一条多行 INSERT 写入，与业务数据在同一事务中提交。
+
+提交后通知日志写入器递增日志版本号（日志统计缓存据此失效）。
+
+操作人取自 session.info["audit_user_id"]（由 get_current_user / get_current_user_async 设置），未设置时不记录。
+集合式SQL（如批量写入、按条件更新）不经过 flush，仍需手动调用 create_operation_log 记录汇总。
+"""
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from sqlalchemy import event, inspect, insert
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.log_writer import log_writer
+from app.models import DataTable, MenuItem, OperationLog, Platform, Shop, SystemSetting, TableData, User
+from app.utils.log_values import to_log_value
+
+AUDIT_USER_KEY = "audit_user_id"
+AUDIT_DISABLED_KEY = "audit_disabled"
+AUDIT_LOGGED_KEY = "audit_logged"
+
+# 受审计的模型及不记录的字段
+_COMMON_EXCLUDED = frozenset({"created_at", "updated_at"})
+AUDITED_MODELS: Dict[type, frozenset] = {
+    Platform: _COMMON_EXCLUDED,
+    Shop: _COMMON_EXCLUDED,
+    DataTable: _COMMON_EXCLUDED | {"data_version"},
+    TableData: _COMMON_EXCLUDED,
+    User: _COMMON_EXCLUDED | {"password_hash"},
+    MenuItem: _COMMON_EXCLUDED,
+    SystemSetting: _COMMON_EXCLUDED,
+}
+
+
+def set_audit_user(session: Session, user_id: Optional[int]) -> None:
+    """设置会话的操作人"""
+    session.info[AUDIT_USER_KEY] = user_id
+
+
+def disable_audit(session: Session) -> None:
+    """本会话不再自动记录（如批量导入时改为记录一条汇总日志）"""
+    session.info[AUDIT_DISABLED_KEY] = True
+
+
+def _column_keys(obj: Any) -> List[str]:
+    excluded = AUDITED_MODELS[type(obj)]
+    return [attr.key for attr in inspect(obj).mapper.column_attrs if attr.key not in excluded]
+
+
+def _snapshot(obj: Any) -> Dict[str, Any]:
+    """对象当前的非空字段"""
+    loaded = inspect(obj).dict
+    return {
+        key: to_log_value(loaded[key])
+        for key in _column_keys(obj)
+        if loaded.get(key) is not None
+    }
+
+
+def _json_diff(old: dict, new: dict) -> Tuple[dict, dict]:
+    """字典的键级差异：返回 (变化键的旧值, 变化键的新值)，删除的键新值为None"""
+    old_part, new_part = {}, {}
+    for key in old.keys() | new.keys():
+        if old.get(key) != new.get(key) or (key in old) != (key in new):
+            old_part[key] = to_log_value(old.get(key))
+            new_part[key] = to_log_value(new.get(key))
+    return old_part, new_part
+
+
+def _changes(obj: Any) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """修改的字段：(旧值, 新值)"""
+    state = inspect(obj)
+    old_values, new_values = {}, {}
+    for key in _column_keys(obj):
+        history = state.attrs[key].history
+        if not history.has_changes():
+            continue
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        if old == new:
+            continue
+        if isinstance(old, dict) and isinstance(new, dict):
+            old_values[key], new_values[key] = _json_diff(old, new)
+        else:
+            old_values[key], new_values[key] = to_log_value(old), to_log_value(new)
+    return old_values, new_values
+
+
+def _record(user_id: int, action_type: str, obj: Any, old_value, new_value) -> Dict[str, Any]:
+    # flush 后新对象尚未设置 identity，直接从实例读取主键
+    primary_key = inspect(obj).mapper.primary_key_from_instance(obj)
+    return {
+        "user_id": user_id,
+        "action_type": action_type,
+        "table_name": obj.__tablename__,
+        "record_id": primary_key[0] if primary_key else None,
+        "old_value": old_value or None,
+        "new_value": new_value or None,
+    }
+
+
+def collect_changes(session: Session, user_id: int) -> List[Dict[str, Any]]:
+    """收集本次 flush 中受审计对象的变更日志"""
+    records = []
+    for obj in session.new:
+        if type(obj) in AUDITED_MODELS:
+            records.append(_record(user_id, "create", obj, None, _snapshot(obj)))
+    for obj in session.dirty:
+        if type(obj) in AUDITED_MODELS and session.is_modified(obj, include_collections=False):
+            old_value, new_value = _changes(obj)
+            if new_value:
+                records.append(_record(user_id, "update", obj, old_value, new_value))
+    for obj in session.deleted:
+        if type(obj) in AUDITED_MODELS:
+            records.append(_record(user_id, "delete", obj, _snapshot(obj), None))
+    return records
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    user_id = session.info.get(AUDIT_USER_KEY)
+    if user_id is None or session.info.get(AUDIT_DISABLED_KEY):
+        return
+    records = collect_changes(session, user_id)
+    if records:
+        session.connection().execute(insert(OperationLog), records)
+        session.info[AUDIT_LOGGED_KEY] = True
+
+
+def _after_commit(session: Session) -> None:
+    if session.info.pop(AUDIT_LOGGED_KEY, False):
+        log_writer.mark_changed()
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(AUDIT_LOGGED_KEY, None)
+
+
+def install_audit(session_factory: Union[sessionmaker, Type[Session]]) -> None:
+    """为会话工厂（或异步会话使用的同步会话类）注册变更捕获"""
+    for name, listener in (
+        ("after_flush", _after_flush),
+        ("after_commit", _after_commit),
+        ("after_rollback", _after_rollback),
+    ):
+        if not event.contains(session_factory, name, listener):
+            event.listen(session_factory, name, listener)
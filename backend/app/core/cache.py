@@ -0,0 +1,292 @@
+"""
+结果缓存（优先使用Redis，不可用时退化为进程内LRU缓存）
+
+同步方法（get/set/delete）供同步路由与后台线程使用；异步路由使用 aget/aset/adelete，
+Redis 经 redis.asyncio 访问，不在事件循环线程上执行阻塞的网络读写。
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import orjson
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCache:
+    """
+    进程内LRU缓存，条目带过期时间
+
+    同时按条目数（max_entries）与值的总字节数（max_bytes，None 表示不限）淘汰最久未使用的条目；
+    Redis 不可用时所有结果都落在这里，字节上限决定了每个 worker 的最大内存占用。
+    """
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.bytes -= len(value)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._pop(key)
+            if self.max_bytes is not None and len(value) > self.max_bytes:
+                return
+            self._data[key] = (time.monotonic() + ttl, value)
+            self.bytes += len(value)
+            while len(self._data) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def _pop(self, key: str) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.bytes -= len(item[1])
+
+    # 进程内操作不涉及I/O，异步接口直接调用同步实现
+    async def aget(self, key: str) -> Optional[bytes]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: bytes, ttl: int) -> None:
+        self.set(key, value, ttl)
+
+    async def adelete(self, *keys: str) -> None:
+        self.delete(*keys)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisCache:
+    """Redis缓存，连接出错后在重试间隔内直接视为不可用"""
+
+    def __init__(self, url: str, retry_interval: int = 30):
+        import redis
+
+        self.url = url
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.retry_interval = retry_interval
+        self._down_until = 0.0
+        self._async_client = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def async_client(self):
+        """当前事件循环的 redis.asyncio 客户端（连接属于创建它的事件循环，换循环时重建）"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            import redis.asyncio
+
+            self._async_client = redis.asyncio.Redis.from_url(
+                self.url, socket_timeout=0.2, socket_connect_timeout=0.2
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def mark_down(self, error: Exception) -> None:
+        logger.warning("Redis不可用，%s秒内使用进程内缓存: %s", self.retry_interval, error)
+        self._down_until = time.monotonic() + self.retry_interval
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self.client.set(key, value, ex=ttl)
+
+    def delete(self, *keys: str) -> None:
+        self.client.delete(*keys)
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        return await self.async_client.get(key)
+
+    async def aset(self, key: str, value: bytes, ttl: int) -> None:
+        await self.async_client.set(key, value, ex=ttl)
+
+    async def adelete(self, *keys: str) -> None:
+        await self.async_client.delete(*keys)
+
+
+class ResultCache:
+    """
+    结果缓存门面
+
+    存取的都是已序列化的字节串；Redis可用时读写Redis，否则读写进程内缓存。
+    缓存失效依赖于键中的版本号，而不是主动删除。
+    """
+
+    def __init__(self, memory: MemoryCache, redis_cache: Optional[RedisCache] = None):
+        self.memory = memory
+        self.redis = redis_cache
+        self.hits = 0
+        self.misses = 0
+        # 按键的命名空间统计：命名空间 -> [命中, 未命中]
+        self.namespace_stats: Dict[str, List[int]] = {}
+
+    def _backend(self):
+        if self.redis is not None and self.redis.available:
+            return self.redis
+        return self.memory
+
+    def _call(self, method: str, *args):
+        backend = self._backend()
+        try:
+            return getattr(backend, method)(*args)
+        except Exception as e:
+            if backend is self.memory:
+                raise
+            self.redis.mark_down(e)
+            return getattr(self.memory, method)(*args)
+
+    async def _acall(self, method: str, *args):
+        backend = self._backend()
+        try:
+            return await getattr(backend, method)(*args)
+        except Exception as e:
+            if backend is self.memory:
+                raise
+            self.redis.mark_down(e)
+            return await getattr(self.memory, method)(*args)
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not settings.CACHE_ENABLED:
+            return None
+        return self._count(key, self._call("get", key))
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        """get 的异步版本"""
+        if not settings.CACHE_ENABLED:
+            return None
+        return self._count(key, await self._acall("aget", key))
+
+    def _count(self, key: str, value: Optional[bytes]) -> Optional[bytes]:
+        """记录命中/未命中"""
+        namespace = _namespace(key)
+        counts = self.namespace_stats.get(namespace)
+        if counts is None:
+            counts = self.namespace_stats.setdefault(namespace, [0, 0])
+        if value is None:
+            self.misses += 1
+            counts[1] += 1
+        else:
+            self.hits += 1
+            counts[0] += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        if not settings.CACHE_ENABLED or len(value) > settings.CACHE_MAX_ITEM_BYTES:
+            return
+        self._call("set", key, value, ttl or settings.CACHE_TTL_SECONDS)
+
+    async def aset(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        """set 的异步版本"""
+        if not settings.CACHE_ENABLED or len(value) > settings.CACHE_MAX_ITEM_BYTES:
+            return
+        await self._acall("aset", key, value, ttl or settings.CACHE_TTL_SECONDS)
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self._call("delete", *keys)
+
+    async def adelete(self, *keys: str) -> None:
+        """delete 的异步版本"""
+        if keys:
+            await self._acall("adelete", *keys)
+
+    def get_or_set(self, key: str, factory: Callable[[], bytes], ttl: Optional[int] = None) -> bytes:
+        """读取缓存，未命中时调用 factory 生成并写入"""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    async def get_or_set_async(
+        self, key: str, factory: Callable[[], Awaitable[bytes]], ttl: Optional[int] = None
+    ) -> bytes:
+        """get_or_set 的异步版本，factory 为协程函数（如使用异步会话查询）"""
+        value = await self.aget(key)
+        if value is None:
+            value = await factory()
+            await self.aset(key, value, ttl)
+        return value
+
+    @property
+    def redis_client(self):
+        """可用的Redis客户端（不可用时为None）"""
+        if self.redis is not None and self.redis.available:
+            return self.redis.client
+        return None
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResultCache:
+    """获取全局结果缓存（首次调用时创建）"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                redis_cache = None
+                if settings.CACHE_REDIS_ENABLED:
+                    try:
+                        redis_cache = RedisCache(settings.REDIS_URL)
+                    except ImportError:
+                        logger.warning("未安装redis，使用进程内缓存")
+                _cache = ResultCache(MemoryCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_MAX_BYTES), redis_cache)
+    return _cache
+
+
+def set_cache(cache: Optional[ResultCache]) -> None:
+    """替换全局结果缓存（测试时可注入进程内实现）"""
+    global _cache
+    _cache = cache
+
+
+def _namespace(key: str) -> str:
+    """由 make_key 生成的键取出命名空间"""
+    return key[len(settings.CACHE_KEY_PREFIX) + 1:].split(":", 1)[0]
+
+
+def make_key(namespace: str, *parts: Any, payload: Any = None) -> str:
+    """
+    构造缓存键：前缀:命名空间:各部分:规范化参数摘要
+    """
+    key = ":".join([settings.CACHE_KEY_PREFIX, namespace, *(str(part) for part in parts)])
+    if payload is not None:
+        digest = hashlib.sha1(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+        key = f"{key}:{digest}"
+    return key
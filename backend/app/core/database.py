@@ -1,19 +1,49 @@
-from sqlalchemy import create_engine
+import random
+from typing import List
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
+from app.core.db_pool import create_pooled_async_engine, create_pooled_engine
 
-# 创建数据库引擎
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-)
+# 创建数据库引擎（同步，供 Alembic、脚本及未迁移的路由使用）；连接池参数见 app/core/db_pool.py
+engine = create_pooled_engine("primary", settings.DATABASE_URL)
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步引擎（asyncpg），数据表、数据、日志等热点路由直接在事件循环中访问数据库
+async_engine = create_pooled_async_engine("primary-async", settings.ASYNC_DATABASE_URL)
+
+
+class AsyncSyncSession(Session):
+    """异步会话内部使用的同步会话类，用于注册会话事件（如 install_audit）"""
+
+
+# 异步会话工厂：提交后不使对象过期，避免在协程中访问属性时触发隐式加载
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    sync_session_class=AsyncSyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+# 只读副本（可选）：报表类只读路由在副本上查询
+replica_engines: List[AsyncEngine] = [
+    create_pooled_async_engine(f"replica-{index}", make_url(url).set(drivername="postgresql+asyncpg"))
+    for index, url in enumerate(settings.DATABASE_REPLICA_URLS)
+]
+
+
+def read_session(primary: bool = False) -> AsyncSession:
+    """只读会话：配置了副本时随机选择一个副本；primary=True 或未配置副本时使用主库"""
+    if primary or not replica_engines:
+        return AsyncSessionLocal()
+    return AsyncSessionLocal(bind=random.choice(replica_engines))
+
+
 # 创建基类
 Base = declarative_base()
 
@@ -26,3 +56,15 @@ def get_db():
     finally:
         db.close()
 
+
+# 依赖项：获取异步数据库会话
+async def get_async_db():
+    # 避免循环导入：read_routing -> audit -> log_writer -> database
+    from app.core.read_routing import flush_recent_write
+
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        finally:
+            # 请求结束、响应发出之前写入副本路由的写入标记
+            await flush_recent_write(db)
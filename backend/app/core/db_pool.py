@@ -0,0 +1,206 @@
+"""
+数据库连接池配置与监控
+
+- 连接池参数取自 Settings（DB_POOL_*）；
+- 每个引擎记录借出等待时间、借出时连接的年龄、超时/新建/失效次数，可通过 pool_status() 查看；
+- 默认不再在每次借出时 pre-ping，改由 validate_idle_connections 在后台定期检查空闲连接；
+- DB_PGBOUNCER_MODE 开启时连接 PgBouncer（事务池模式）：应用端不再保持连接池，
+  asyncpg 不缓存预编译语句并使用随机语句名，避免依赖服务端会话状态。
+"""
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from app.core.config import settings
+from app.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# 连接年龄分桶（秒）
+CONNECTION_AGE_BUCKETS = (60, 300, 900, 1800, 3600, 7200, 21600, 86400)
+
+
+class PoolMetrics:
+    """单个连接池的计数与直方图"""
+
+    def __init__(self):
+        self.wait = Histogram()
+        self.age = Histogram(CONNECTION_AGE_BUCKETS)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.validations = 0
+        self.validation_failures = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "validations": self.validations,
+            "validation_failures": self.validation_failures,
+            "wait_seconds": self.wait.snapshot(),
+            "connection_age_seconds": self.age.snapshot(),
+        }
+
+
+@dataclass
+class _PoolEntry:
+    engine: Engine  # 异步引擎时为其 sync_engine
+    metrics: PoolMetrics
+    async_engine: Optional[AsyncEngine] = None
+
+
+_engines: Dict[str, _PoolEntry] = {}
+_lock = threading.Lock()
+
+
+def _instrumented_pool_class(base: type, metrics: PoolMetrics) -> type:
+    """记录借出等待时间的连接池类（dispose 重建连接池时沿用同一个类）"""
+
+    class InstrumentedPool(base):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                metrics.timeouts += 1
+                raise
+            finally:
+                metrics.wait.observe(time.perf_counter() - started)
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+def _pool_options(base: type, metrics: PoolMetrics) -> Dict[str, Any]:
+    if settings.DB_PGBOUNCER_MODE:
+        # 由 PgBouncer 复用服务端连接
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": _instrumented_pool_class(base, metrics),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _register(name: str, engine: Engine, metrics: PoolMetrics, async_engine: Optional[AsyncEngine] = None) -> None:
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        connection_record.info["connected_at"] = time.monotonic()
+        metrics.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        now = time.monotonic()
+        metrics.age.observe(now - connection_record.info.get("connected_at", now))
+        metrics.checkouts += 1
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    with _lock:
+        _engines[name] = _PoolEntry(engine, metrics, async_engine)
+
+
+def create_pooled_engine(name: str, url: Any) -> Engine:
+    """创建同步引擎（psycopg2）并登记连接池指标"""
+    metrics = PoolMetrics()
+    engine = create_engine(url, **_pool_options(QueuePool, metrics))
+    _register(name, engine, metrics)
+    return engine
+
+
+def create_pooled_async_engine(name: str, url: Any) -> AsyncEngine:
+    """创建异步引擎（asyncpg）并登记连接池指标"""
+    metrics = PoolMetrics()
+    connect_args = {}
+    if settings.DB_PGBOUNCER_MODE:
+        connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    engine = create_async_engine(
+        url, connect_args=connect_args, **_pool_options(AsyncAdaptedQueuePool, metrics)
+    )
+    _register(name, engine.sync_engine, metrics, engine)
+    return engine
+
+
+def pool_status() -> Dict[str, Dict[str, Any]]:
+    """各引擎连接池当前状态与累计指标"""
+    with _lock:
+        engines = list(_engines.items())
+    status = {}
+    for name, entry in engines:
+        pool = entry.engine.pool
+        item: Dict[str, Any] = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            item.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            })
+        item.update(entry.metrics.snapshot())
+        status[name] = item
+    return status
+
+
+def _idle_count(engine: Engine) -> int:
+    pool = engine.pool
+    return pool.checkedin() if isinstance(pool, QueuePool) else 0
+
+
+def _validate_sync(name: str, engine: Engine, metrics: PoolMetrics) -> None:
+    # 连接池按先进先出借出，依次借出空闲连接数次即可逐个检查到每个空闲连接
+    for _ in range(_idle_count(engine)):
+        if _idle_count(engine) == 0:
+            break
+        try:
+            with engine.connect() as connection:
+                connection.exec_driver_sql("SELECT 1")
+            metrics.validations += 1
+        except Exception as e:
+            # 断开的连接已由 SQLAlchemy 标记失效，下次借出时重新建立
+            metrics.validation_failures += 1
+            logger.warning("数据库连接检查失败（%s）: %s", name, e)
+
+
+async def _validate_async(name: str, engine: AsyncEngine, metrics: PoolMetrics) -> None:
+    for _ in range(_idle_count(engine.sync_engine)):
+        if _idle_count(engine.sync_engine) == 0:
+            break
+        try:
+            async with engine.connect() as connection:
+                await connection.exec_driver_sql("SELECT 1")
+            metrics.validations += 1
+        except Exception as e:
+            metrics.validation_failures += 1
+            logger.warning("数据库连接检查失败（%s）: %s", name, e)
+
+
+async def validate_idle_connections() -> None:
+    """检查所有引擎的空闲连接（同步引擎在线程池中检查）"""
+    with _lock:
+        entries = list(_engines.items())
+    for name, entry in entries:
+        if entry.async_engine is not None:
+            await _validate_async(name, entry.async_engine, entry.metrics)
+        else:
+            await run_in_threadpool(_validate_sync, name, entry.engine, entry.metrics)
@@ -0,0 +1,37 @@
+"""ETag与条件请求"""
+import hashlib
+from typing import Any
+from fastapi import Request, Response
+
+# 浏览器每次使用前都需重新验证，未变化时由304复用本地副本
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """由版本号等廉价参数生成强ETag"""
+    raw = "|".join(str(part) for part in parts)
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match 是否与当前ETag匹配"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in header.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """写入ETag相关响应头"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified_response(etag: str) -> Response:
+    """304响应"""
+    response = Response(status_code=304)
+    set_etag(response, etag)
+    return response
@@ -0,0 +1,223 @@
+"""操作日志异步批量写入器"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+import orjson
+from sqlalchemy import insert
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.logs import OperationLog
+from app.services.versions import LOGS_SCOPE, bump_version
+
+logger = logging.getLogger(__name__)
+
+
+class OperationLogWriter:
+    """
+    进程内日志写入器
+
+    业务请求只把日志记录放入有界队列，后台线程在攒够 batch_size 条或距上次写入超过
+    flush_interval 秒时，用一条多行 INSERT 批量写入。队列满时调用方最多阻塞 put_timeout 秒
+    （背压），仍无法入队则在调用方线程直接写入。
+    在事件循环线程中调用时（异步路由）不阻塞：入队使用 put_nowait，需要直接写入时交给线程池执行。
+
+    写入失败时后台线程按 retry_backoff 秒起、每次翻倍的间隔重试 retries 次（期间新日志在队列中等待）；
+    仍失败的日志逐条以 error 级别记录完整内容后丢弃，可据此补录。
+
+    每次写入在同一事务中递增日志版本号（LOGS_SCOPE），供日志统计缓存判断失效；
+    随业务事务写入的审计日志提交后调用 mark_changed，由后台线程递增版本号。
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_queue_size: int = 10000,
+        put_timeout: float = 1.0,
+        retries: int = 3,
+        retry_backoff: float = 0.5,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._changed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # 交给线程池执行、尚未完成的写入（保留引用直到完成）
+        self._pending: Set["asyncio.Future[bool]"] = set()
+        self.written = 0
+        self.retried = 0
+        self.dropped = 0
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """启动后台写入线程"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="operation-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """停止后台线程，并写入队列中剩余的日志"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._drain()
+
+    def submit(self, record: Dict[str, Any]) -> None:
+        """
+        提交一条日志记录（OperationLog 的列值字典）
+
+        未指定 created_at 时取提交时刻，而不是批量写入时数据库的 now()（后者会滞后刷新间隔与重试退避，
+        可能跨过日期或分区边界，并与随业务事务写入的审计日志顺序错乱）。
+        """
+        record.setdefault("created_at", datetime.now(timezone.utc))
+        loop = _running_loop()
+        if loop is not None:
+            self._submit_nowait(record, loop)
+            return
+        if not self.running:
+            self.write([record])
+            return
+        try:
+            self._queue.put(record, timeout=self.put_timeout)
+        except queue.Full:
+            logger.warning("操作日志队列已满，直接写入")
+            self.write([record])
+
+    def _submit_nowait(self, record: Dict[str, Any], loop: asyncio.AbstractEventLoop) -> None:
+        """事件循环线程中提交：不等待队列空位，直接写入交给线程池"""
+        if self.running:
+            try:
+                self._queue.put_nowait(record)
+                return
+            except queue.Full:
+                logger.warning("操作日志队列已满，交给线程池直接写入")
+        self._write_in_executor(loop, [record])
+
+    def _write_in_executor(self, loop: asyncio.AbstractEventLoop, records: List[Dict[str, Any]]) -> None:
+        future = loop.run_in_executor(None, self.write, records)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+
+    def submit_many(self, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            self.submit(record)
+
+    def mark_changed(self) -> None:
+        """其它途径写入的日志已提交，递增日志版本号（后台线程未启动时同步执行）"""
+        self._changed.set()
+        if self.running:
+            return
+        loop = _running_loop()
+        if loop is not None:
+            self._write_in_executor(loop, [])
+        else:
+            self.write([])
+
+    def write(self, records: List[Dict[str, Any]], retries: int = 0) -> bool:
+        """
+        同步批量写入（一条多行 INSERT，独立事务），同时递增日志版本号
+
+        失败时按退避间隔重试 retries 次；最终失败时逐条记录被丢弃的日志，返回 False。
+        """
+        if not records and not self._changed.is_set():
+            return True
+        # 先清除标记再开始事务：版本号的递增总是晚于已提交的审计日志
+        was_changed = self._changed.is_set()
+        self._changed.clear()
+        delay = self.retry_backoff
+        for attempt in range(retries + 1):
+            try:
+                self._insert(records)
+                self.written += len(records)
+                return True
+            except Exception as e:
+                error = e
+            if attempt < retries:
+                self.retried += 1
+                logger.warning("操作日志写入失败（%s条），%.1f秒后重试: %s", len(records), delay, error)
+                time.sleep(delay)
+                delay *= 2
+
+        # 日志写入失败不影响主业务；未完成的版本号递增留到下次写入
+        if was_changed:
+            self._changed.set()
+        self.dropped += len(records)
+        logger.error("操作日志写入失败（%s条），已放弃: %s", len(records), error)
+        for record in records:
+            logger.error("丢弃的操作日志: %s", orjson.dumps(record, default=str).decode())
+        return False
+
+    def _insert(self, records: List[Dict[str, Any]]) -> None:
+        db = SessionLocal()
+        try:
+            if records:
+                db.execute(insert(OperationLog), records)
+            bump_version(db, LOGS_SCOPE)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _take_batch(self, block_until: float) -> List[Dict[str, Any]]:
+        batch: List[Dict[str, Any]] = []
+        while len(batch) < self.batch_size:
+            remaining = block_until - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._take_batch(time.monotonic() + self.flush_interval)
+            self.write(batch, self.retries)
+
+    def _drain(self) -> None:
+        while True:
+            batch = self._take_batch(0)
+            if not batch:
+                return
+            self.write(batch, self.retries)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """当前线程正在运行的事件循环（异步会话的同步代码经 greenlet 也运行在该线程上）"""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+log_writer = OperationLogWriter(
+    batch_size=settings.LOG_WRITER_BATCH_SIZE,
+    flush_interval=settings.LOG_WRITER_FLUSH_INTERVAL,
+    max_queue_size=settings.LOG_WRITER_QUEUE_SIZE,
+    put_timeout=settings.LOG_WRITER_PUT_TIMEOUT,
+    retries=settings.LOG_WRITER_RETRIES,
+    retry_backoff=settings.LOG_WRITER_RETRY_BACKOFF,
+)
@@ -0,0 +1,97 @@
+"""运行指标基础类型"""
+import bisect
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+# 耗时类直方图的默认分桶上界（秒）
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """分桶直方图（线程安全），桶上界与观测值单位一致"""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """累计计数：{"buckets": {上界: 不超过该值的次数, "+Inf": 总次数}, "count", "sum"}"""
+        with self._lock:
+            counts = list(self._counts)
+            total, value_sum = self._count, self._sum
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = total
+        return {"buckets": cumulative, "count": total, "sum": round(value_sum, 6)}
+
+
+class Counter:
+    """按标签累计的计数器（标签为按固定顺序排列的取值元组）"""
+
+    def __init__(self):
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def items(self) -> List[Tuple[Tuple[str, ...], float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class PrometheusWriter:
+    """按 Prometheus 文本格式（0.0.4）拼接指标，同名指标的 HELP/TYPE 只输出一次"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._lines: List[str] = []
+        self._declared = set()
+
+    def _declare(self, name: str, kind: str, help_text: str) -> None:
+        if name not in self._declared:
+            self._declared.add(name)
+            self._lines.append(f"# HELP {name} {help_text}")
+            self._lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, kind: str, help_text: str, value: float, labels: Dict[str, Any] = None) -> None:
+        """输出一个 gauge/counter 样本"""
+        self._declare(name, kind, help_text)
+        self._lines.append(f"{name}{format_labels(labels or {})} {value}")
+
+    def histogram(self, name: str, help_text: str, snapshot: Dict[str, Any], labels: Dict[str, Any] = None) -> None:
+        """输出 Histogram.snapshot() 的结果"""
+        self._declare(name, "histogram", help_text)
+        labels = labels or {}
+        for bound, count in snapshot["buckets"].items():
+            self._lines.append(f"{name}_bucket{format_labels({**labels, 'le': bound})} {count}")
+        self._lines.append(f"{name}_sum{format_labels(labels)} {snapshot['sum']}")
+        self._lines.append(f"{name}_count{format_labels(labels)} {snapshot['count']}")
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
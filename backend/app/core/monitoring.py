@@ -0,0 +1,189 @@
+"""
+请求级运行指标（GET /metrics 以 Prometheus 文本格式输出）
+
+- MetricsMiddleware 为纯 ASGI 中间件（不经过 BaseHTTPMiddleware 的额外任务与队列），
+  按 方法 + 路由模板 记录耗时、响应大小、状态码，以及请求期间的SQL条数与SQL耗时；
+- SQL 条数与耗时由 app.core.query_inspector 统计（同时检测 N+1 与慢查询）；
+- 指标只在内存中累加，/metrics 被抓取时才汇总输出，请求路径上只有几次分桶计数。
+"""
+import time
+from typing import Dict, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.cache import get_cache
+from app.core.db_pool import pool_status
+from app.core.log_writer import log_writer
+from app.core.metrics import Counter, Histogram, PrometheusWriter
+from app.core.password_pool import password_hasher
+from app.core.query_inspector import RequestDbStats, finish_request, start_request
+
+# 响应大小分桶（字节）
+RESPONSE_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# 每个请求的SQL条数分桶
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# 导入速度分桶（行/秒）
+IMPORT_RATE_BUCKETS = (100, 500, 1000, 5000, 10000, 50000, 100000)
+
+# 未匹配任何路由的请求统一归为一类，避免按原始路径产生无限多的标签
+UNMATCHED_ROUTE = "unmatched"
+
+
+class _RouteMetrics:
+    __slots__ = ("latency", "response_size", "queries", "db_seconds")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.response_size = Histogram(RESPONSE_SIZE_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_seconds = Histogram()
+
+
+class RequestMetrics:
+    """按 (方法, 路由模板) 汇总的请求指标"""
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], _RouteMetrics] = {}
+        self.responses = Counter()  # (方法, 路由, 状态码) -> 次数
+        self.in_flight = 0
+        self.import_rows = 0
+        self.import_seconds = 0.0
+        self.import_rate = Histogram(IMPORT_RATE_BUCKETS)
+        self.n_plus_one = Counter()  # (方法, 路由) -> 发现疑似 N+1 的请求数
+
+    def observe(
+        self, method: str, route: str, status_code: int,
+        seconds: float, size: int, db: RequestDbStats, n_plus_one: bool = False
+    ) -> None:
+        key = (method, route)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes.setdefault(key, _RouteMetrics())
+        metrics.latency.observe(seconds)
+        metrics.response_size.observe(size)
+        metrics.queries.observe(db.queries)
+        metrics.db_seconds.observe(db.seconds)
+        self.responses.inc((method, route, str(status_code)))
+        if n_plus_one:
+            self.n_plus_one.inc(key)
+
+    def observe_import(self, rows: int, seconds: float) -> None:
+        """记录一次数据导入（行数与耗时）"""
+        self.import_rows += rows
+        self.import_seconds += seconds
+        if seconds > 0:
+            self.import_rate.observe(rows / seconds)
+
+    def write(self, writer: PrometheusWriter) -> None:
+        writer.sample("app_http_requests_in_flight", "gauge", "正在处理的请求数", self.in_flight)
+        for (method, route, status_code), count in self.responses.items():
+            writer.sample(
+                "app_http_requests_total", "counter", "请求数",
+                count, {"method": method, "route": route, "status": status_code},
+            )
+        for (method, route), metrics in sorted(self.routes.items()):
+            labels = {"method": method, "route": route}
+            writer.histogram("app_http_request_duration_seconds", "请求耗时（秒）", metrics.latency.snapshot(), labels)
+            writer.histogram("app_http_response_size_bytes", "响应体大小（字节）", metrics.response_size.snapshot(), labels)
+            writer.histogram("app_db_queries_per_request", "每个请求执行的SQL条数", metrics.queries.snapshot(), labels)
+            writer.histogram("app_db_seconds_per_request", "每个请求的SQL累计耗时（秒）", metrics.db_seconds.snapshot(), labels)
+        for (method, route), count in self.n_plus_one.items():
+            writer.sample(
+                "app_db_n_plus_one_requests_total", "counter", "出现重复语句（疑似 N+1）的请求数",
+                count, {"method": method, "route": route},
+            )
+        writer.sample("app_import_rows_total", "counter", "导入的数据行数", self.import_rows)
+        writer.sample("app_import_seconds_total", "counter", "导入累计耗时（秒）", round(self.import_seconds, 6))
+        writer.histogram("app_import_rows_per_second", "单次导入速度（行/秒）", self.import_rate.snapshot())
+
+
+request_metrics = RequestMetrics()
+
+
+def _write_cache(writer: PrometheusWriter) -> None:
+    cache = get_cache()
+    for namespace, (hits, misses) in sorted(cache.namespace_stats.items()):
+        labels = {"namespace": namespace}
+        writer.sample("app_cache_hits_total", "counter", "结果缓存命中次数", hits, labels)
+        writer.sample("app_cache_misses_total", "counter", "结果缓存未命中次数", misses, labels)
+        total = hits + misses
+        writer.sample(
+            "app_cache_hit_ratio", "gauge", "结果缓存命中率（进程启动以来）",
+            round(hits / total, 4) if total else 0, labels,
+        )
+
+
+def _write_password_pool(writer: PrometheusWriter) -> None:
+    stats = password_hasher.stats()
+    writer.sample("app_password_pool_workers", "gauge", "密码哈希进程数", stats["workers"])
+    writer.sample("app_password_pool_pending", "gauge", "排队与执行中的密码哈希任务数", stats["pending"])
+    writer.sample("app_password_pool_completed_total", "counter", "完成的密码哈希任务数", stats["completed"])
+    writer.sample("app_password_pool_rejected_total", "counter", "因排队过多被拒绝的任务数", stats["rejected"])
+    writer.sample("app_password_pool_avg_seconds", "gauge", "密码哈希任务平均耗时（秒）", stats["avg_ms"] / 1000)
+
+
+def _write_log_writer(writer: PrometheusWriter) -> None:
+    writer.sample("app_log_writer_queue_size", "gauge", "等待写入的操作日志条数", log_writer.queue_size)
+    writer.sample("app_log_writer_written_total", "counter", "已写入的操作日志条数", log_writer.written)
+    writer.sample("app_log_writer_retries_total", "counter", "操作日志批量写入的重试次数", log_writer.retried)
+    writer.sample("app_log_writer_dropped_total", "counter", "重试后仍写入失败而丢弃的操作日志条数", log_writer.dropped)
+
+
+def _write_db_pools(writer: PrometheusWriter) -> None:
+    for name, item in pool_status().items():
+        labels = {"pool": name}
+        for key in ("size", "checked_out", "checked_in", "overflow"):
+            if key in item:
+                writer.sample(f"app_db_pool_{key}", "gauge", f"连接池 {key} 连接数", item[key], labels)
+        for key in ("checkouts", "timeouts", "connects", "invalidations", "validation_failures"):
+            writer.sample(f"app_db_pool_{key}_total", "counter", f"连接池累计 {key} 次数", item[key], labels)
+        writer.histogram("app_db_pool_wait_seconds", "借出连接的等待时间（秒）", item["wait_seconds"], labels)
+        writer.histogram(
+            "app_db_pool_connection_age_seconds", "借出时连接已建立的时间（秒）", item["connection_age_seconds"], labels
+        )
+
+
+def render_metrics() -> str:
+    """汇总全部指标，返回 Prometheus 文本"""
+    writer = PrometheusWriter()
+    request_metrics.write(writer)
+    _write_cache(writer)
+    _write_password_pool(writer)
+    _write_log_writer(writer)
+    _write_db_pools(writer)
+    return writer.render()
+
+
+class MetricsMiddleware:
+    """记录每个HTTP请求的耗时、响应大小、状态码与SQL统计"""
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        db, token = start_request()
+        self.metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.in_flight -= 1
+            # 路由匹配后 scope["route"] 为匹配到的路由，用其路径模板作为标签
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            n_plus_one = finish_request(token, db, scope["method"], route)
+            self.metrics.observe(scope["method"], route, status_code, elapsed, size, db, n_plus_one)
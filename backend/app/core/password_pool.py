@@ -0,0 +1,110 @@
+"""密码哈希进程池"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.core import security
+from app.core.config import settings
+from app.utils.exceptions import ServiceBusyException
+
+
+def _noop() -> None:
+    return None
+
+
+class PasswordHasher:
+    """
+    在独立进程池中执行 bcrypt 哈希与验证
+
+    bcrypt 每次约占用数百毫秒CPU，放在进程池中可利用多核，且不占用处理普通请求的线程池。
+    同时排队的任务超过 max_pending 时直接拒绝（ServiceBusyException），避免登录高峰拖慢其它请求。
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def start(self) -> None:
+        """提前创建工作进程（应在启动其它后台线程之前调用）"""
+        self._get_executor().submit(_noop).result()
+
+    def stop(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise ServiceBusyException("登录请求过多，请稍后重试")
+            self.pending += 1
+            self.submitted += 1
+        started = time.perf_counter()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(lambda _: self._done(time.perf_counter() - started))
+        return future
+
+    def _done(self, elapsed: float) -> None:
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(security.get_password_hash, password))
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """验证密码，哈希参数过时时同时返回新哈希"""
+        return await asyncio.wrap_future(
+            self._submit(security.verify_and_update_password, plain_password, hashed_password)
+        )
+
+    def hash_sync(self, password: str) -> str:
+        """供同步接口使用：等待进程池结果（等待期间不占用CPU）"""
+        return self._submit(security.get_password_hash, password).result()
+
+    def verify_sync(self, plain_password: str, hashed_password: str) -> bool:
+        return self._submit(security.verify_password, plain_password, hashed_password).result()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self.pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": round(self.total_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+                "max_ms": round(self.max_seconds * 1000, 2),
+            }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_POOL_WORKERS or min(4, os.cpu_count() or 1),
+    max_pending=settings.PASSWORD_POOL_MAX_PENDING,
+)
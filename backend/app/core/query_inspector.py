@@ -0,0 +1,217 @@
+"""
+SQL 执行统计、N+1 与慢查询检测
+
+- 所有引擎（含异步引擎底层的同步引擎）的游标事件统一在这里处理；
+  统计对象通过 contextvar 关联到当前请求，线程池与异步会话的 greenlet 中同样可见，
+  不在请求中的SQL（如操作日志写入线程）不计入；
+- 请求统计由 MetricsMiddleware 开始；关闭指标（METRICS_ENABLED=false）时改由 QueryStatsMiddleware 开始，
+  N+1 检测与 assert_max_queries 不依赖指标是否开启；
+- 同一请求中同一条语句（参数化后的SQL文本相同）执行次数达到 SQL_N_PLUS_ONE_THRESHOLD 时，
+  在请求结束后记录警告（通常是循环中逐行查询关联数据）；
+- 单条语句耗时超过 SQL_SLOW_QUERY_SECONDS 时记录语句、参数与执行计划（EXPLAIN，不重新执行语句）；
+- assert_max_queries 供测试断言接口或函数执行的SQL条数上限。
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 日志中语句与参数的最大长度
+_LOG_TEXT_LIMIT = 2000
+# 只对查询语句执行 EXPLAIN
+_EXPLAINABLE_PREFIXES = ("select", "with")
+
+
+class RequestDbStats:
+    """一个请求（或一次 record_queries）执行的SQL：总条数、总耗时、每条语句的执行次数"""
+
+    __slots__ = ("queries", "seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.seconds += elapsed
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """执行次数不少于 threshold 的语句，按次数降序"""
+        found = [(statement, count) for statement, count in self.statements.items() if count >= threshold]
+        return sorted(found, key=lambda item: item[1], reverse=True)
+
+    def report(self) -> str:
+        """按执行次数列出全部语句（用于断言失败信息）"""
+        lines = [f"共 {self.queries} 条SQL，耗时 {self.seconds * 1000:.1f}ms："]
+        for statement, count in sorted(self.statements.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"  [{count}次] {_shorten(statement)}")
+        return "\n".join(lines)
+
+
+_request_db: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db_stats", default=None)
+# 正在进行的 record_queries（测试中 TestClient 在其它线程处理请求，需跨线程收集）
+_recorders: List[RequestDbStats] = []
+_recorders_lock = threading.Lock()
+
+
+def current_db_stats() -> Optional[RequestDbStats]:
+    """当前请求的SQL统计（不在请求中时为None）"""
+    return _request_db.get()
+
+
+def start_request() -> Tuple[RequestDbStats, Token]:
+    """开始统计当前请求的SQL，返回统计对象与用于 finish_request 的令牌"""
+    stats = RequestDbStats()
+    return stats, _request_db.set(stats)
+
+
+def finish_request(token: Token, stats: RequestDbStats, method: str, route: str) -> bool:
+    """结束统计；发现疑似 N+1 查询时记录警告并返回 True"""
+    _request_db.reset(token)
+    threshold = settings.SQL_N_PLUS_ONE_THRESHOLD
+    if threshold <= 0 or stats.queries < threshold:
+        return False
+    repeated = stats.repeated(threshold)
+    for statement, count in repeated:
+        logger.warning(
+            "疑似 N+1 查询：%s %s 中同一语句执行了 %d 次：%s",
+            method, route, count, _shorten(statement),
+        )
+    return bool(repeated)
+
+
+class QueryStatsMiddleware:
+    """只统计请求SQL（检测 N+1、供 record_queries 收集），不记录指标；关闭指标时使用"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _request_db.get() is not None:
+            await self.app(scope, receive, send)
+            return
+        stats, token = start_request()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            finish_request(token, stats, scope["method"], route)
+
+
+def _shorten(text: str) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= _LOG_TEXT_LIMIT else text[:_LOG_TEXT_LIMIT] + "..."
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    """在同一连接上获取执行计划；放在保存点中，失败时不影响当前事务"""
+    try:
+        explain_cursor = conn.connection.cursor()
+    except Exception:
+        return None
+    try:
+        explain_cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            explain_cursor.execute(f"EXPLAIN {statement}", parameters)
+            plan = "\n".join(str(row[0]) for row in explain_cursor.fetchall())
+            explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            return plan
+        except Exception as e:
+            explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            return f"EXPLAIN 失败: {e}"
+    except Exception:
+        return None
+    finally:
+        explain_cursor.close()
+
+
+def _mask_parameters(parameters):
+    """隐藏参数中的密码类字段（只能识别命名参数）"""
+    if isinstance(parameters, dict):
+        return {key: "***" if "password" in key else value for key, value in parameters.items()}
+    return parameters
+
+
+def _log_slow_query(conn, statement: str, parameters, elapsed: float, executemany: bool) -> None:
+    plan = None
+    if (
+        settings.SQL_SLOW_QUERY_EXPLAIN
+        and not executemany
+        and statement.lstrip()[:6].lower().startswith(_EXPLAINABLE_PREFIXES)
+    ):
+        plan = _explain(conn, statement, parameters)
+    logger.warning(
+        "慢查询 %.1fms：%s\n参数：%s%s",
+        elapsed * 1000, _shorten(statement), _shorten(repr(_mask_parameters(parameters))),
+        f"\n执行计划：\n{plan}" if plan else "",
+    )
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if 0 < settings.SQL_SLOW_QUERY_SECONDS <= elapsed:
+        _log_slow_query(conn, statement, parameters, elapsed, executemany)
+    stats = _request_db.get()
+    if stats is None:
+        return
+    stats.record(statement, elapsed)
+    if _recorders:
+        with _recorders_lock:
+            for recorder in _recorders:
+                recorder.record(statement, elapsed)
+
+
+@contextmanager
+def record_queries() -> Iterator[RequestDbStats]:
+    """
+    收集代码块执行期间的SQL
+
+    包括当前线程中直接执行的SQL，以及期间任意线程中处理的HTTP请求执行的SQL
+    （TestClient 在单独的线程中处理请求）。
+    """
+    recorder = RequestDbStats()
+    # 当前线程不在请求中时也要计入（直接调用服务函数的测试）
+    token = _request_db.set(RequestDbStats()) if _request_db.get() is None else None
+    with _recorders_lock:
+        _recorders.append(recorder)
+    try:
+        yield recorder
+    finally:
+        with _recorders_lock:
+            _recorders.remove(recorder)
+        if token is not None:
+            _request_db.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int, label: str = "") -> Iterator[RequestDbStats]:
+    """
+    断言代码块执行的SQL不超过 limit 条，超过时列出所有语句
+
+    用法：
+        with assert_max_queries(3, "GET /api/shops"):
+            client.get("/api/shops", headers=headers)
+    """
+    with record_queries() as recorder:
+        yield recorder
+    if recorder.queries > limit:
+        raise AssertionError(f"{label or '代码块'} 执行了 {recorder.queries} 条SQL，超过上限 {limit}\n{recorder.report()}")
@@ -0,0 +1,88 @@
+"""
+只读请求的主库/副本路由
+
+用户的会话提交事务后，在缓存中记录一个 REPLICA_LAG_WINDOW_SECONDS 秒过期的标记；
+标记存在期间该用户的只读请求改走主库，保证"写后读"能读到自己的修改。
+标记存放在 Redis 中供多个 worker 共享，因此配置了副本时启动即检查 Redis（check_write_tracking），
+未配置副本时不记录。
+
+异步会话提交时不在事件循环线程上同步访问 Redis：标记先记在会话上，
+由 get_async_db 在请求结束、响应发出之前经 redis.asyncio 写入（flush_recent_write）。
+"""
+import asyncio
+from typing import Optional, Type, Union
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.audit import AUDIT_USER_KEY
+from app.core.cache import get_cache, make_key
+from app.core.config import settings
+
+# 异步会话上待写入的写入标记（用户ID）
+PENDING_WRITE_KEY = "recent_write_user_id"
+
+
+def _write_key(user_id: int) -> str:
+    return make_key("recent-write", user_id)
+
+
+def mark_recent_write(user_id: Optional[int]) -> None:
+    """记录用户刚刚提交过写入"""
+    if user_id is None or not settings.DATABASE_REPLICA_URLS:
+        return
+    get_cache().set(_write_key(user_id), b"1", settings.REPLICA_LAG_WINDOW_SECONDS)
+
+
+async def flush_recent_write(db: AsyncSession) -> None:
+    """写入异步会话提交时记下的写入标记"""
+    user_id = db.info.pop(PENDING_WRITE_KEY, None)
+    if user_id is None or not settings.DATABASE_REPLICA_URLS:
+        return
+    await get_cache().aset(_write_key(user_id), b"1", settings.REPLICA_LAG_WINDOW_SECONDS)
+
+
+async def has_recent_write(user_id: int) -> bool:
+    """用户是否在延迟窗口内写入过（是则应读主库）"""
+    if not settings.DATABASE_REPLICA_URLS:
+        return False
+    return await get_cache().aget(_write_key(user_id)) is not None
+
+
+def check_write_tracking() -> None:
+    """
+    配置了副本时检查写入标记可在进程间共享（启动时调用）
+
+    标记只存在进程内缓存时，写入与随后的读取落在不同 worker 上就读不到自己的修改，
+    因此结果缓存或 Redis 关闭、Redis 无法连接时拒绝启动。
+    """
+    if not settings.DATABASE_REPLICA_URLS:
+        return
+    if not settings.CACHE_ENABLED or not settings.CACHE_REDIS_ENABLED:
+        raise RuntimeError(
+            "配置了只读副本（DATABASE_REPLICA_URLS）时须启用 CACHE_ENABLED 与 CACHE_REDIS_ENABLED，"
+            "写后读依赖 Redis 在各 worker 间共享写入标记"
+        )
+    cache = get_cache()
+    if cache.redis is None:
+        raise RuntimeError("配置了只读副本（DATABASE_REPLICA_URLS）时须安装 redis")
+    try:
+        cache.redis.client.ping()
+    except Exception as e:
+        raise RuntimeError(f"配置了只读副本（DATABASE_REPLICA_URLS）但无法连接 Redis（{settings.REDIS_URL}）: {e}") from e
+
+
+def _after_commit(session: Session) -> None:
+    user_id = session.info.get(AUDIT_USER_KEY)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        mark_recent_write(user_id)
+        return
+    if user_id is not None:
+        session.info[PENDING_WRITE_KEY] = user_id
+
+
+def install_write_tracking(session_factory: Union[sessionmaker, Type[Session]]) -> None:
+    """为会话工厂（或异步会话使用的同步会话类）注册提交后的写入标记"""
+    if not event.contains(session_factory, "after_commit", _after_commit):
+        event.listen(session_factory, "after_commit", _after_commit)
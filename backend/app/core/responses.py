@@ -0,0 +1,44 @@
+"""高性能JSON响应"""
+from decimal import Decimal
+from typing import Any, Optional
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    """orjson无法直接序列化的类型"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为JSON字节串"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def json_fragment(raw: Optional[str], fallback: str = "[]") -> orjson.Fragment:
+    """
+    包装已经是JSON文本的片段（如PostgreSQL json_agg的结果），序列化时原样拼接
+    """
+    return orjson.Fragment(raw if raw is not None else fallback)
+
+
+class FastJSONResponse(Response):
+    """
+    基于orjson的JSON响应
+
+    直接返回该响应可跳过FastAPI的 response_model 校验与 jsonable_encoder，
+    适用于数据量大的列表接口；content 为 bytes 时视为已序列化的JSON原样输出。
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            return bytes(content)
+        return dumps(content)
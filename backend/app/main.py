@@ -1,11 +1,88 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core.audit import install_audit
 from app.core.config import settings
+from app.core.db_pool import pool_status, validate_idle_connections
+from app.core.database import AsyncSyncSession, SessionLocal, async_engine, replica_engines
+from app.core.log_writer import log_writer
+from app.core.metrics import PrometheusWriter
+from app.core.monitoring import MetricsMiddleware, render_metrics
+from app.core.password_pool import password_hasher
+from app.core.query_inspector import QueryStatsMiddleware
+from app.core.read_routing import check_write_tracking, install_write_tracking
+from app.services import log_partitions
+from app.services.menu_cache import menu_cache
+from app.services.settings_cache import settings_cache
+from app.services.upload_storage import thumbnail_pool
+from app.utils.exceptions import BusinessException
+
+logger = logging.getLogger(__name__)
+
+# 数据变更在 flush 时自动记录操作日志（同步会话与异步会话）
+install_audit(SessionLocal)
+install_audit(AsyncSyncSession)
+# 提交写入后短时间内该用户的只读请求走主库（配置只读副本时）
+install_write_tracking(SessionLocal)
+install_write_tracking(AsyncSyncSession)
+
+
+async def _log_partition_maintenance():
+    """每天预建操作日志分区、归档过期分区"""
+    while True:
+        try:
+            await run_in_threadpool(log_partitions.run_maintenance)
+        except Exception as e:
+            logger.error("操作日志分区维护失败: %s", e)
+        await asyncio.sleep(24 * 3600)
+
+
+async def _db_idle_validation():
+    """后台定期检查空闲数据库连接（代替每次借出时的 pre-ping）"""
+    while True:
+        await asyncio.sleep(settings.DB_IDLE_CHECK_INTERVAL)
+        try:
+            await validate_idle_connections()
+        except Exception as e:
+            logger.error("数据库空闲连接检查失败: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 配置了只读副本时，写后读依赖 Redis 共享写入标记，不可用时拒绝启动
+    check_write_tracking()
+    # 先创建密码哈希进程池（在启动其它后台线程之前）
+    password_hasher.start()
+    # 启动操作日志写入器，关闭时写入队列中剩余的日志
+    log_writer.start()
+    # 订阅系统设置、菜单失效通知（无Redis时按版本号轮询）
+    settings_cache.start_listener()
+    menu_cache.start_listener()
+    background = [asyncio.create_task(_log_partition_maintenance())]
+    if settings.DB_IDLE_CHECK_INTERVAL > 0 and not settings.DB_PGBOUNCER_MODE:
+        background.append(asyncio.create_task(_db_idle_validation()))
+    yield
+    for task in background:
+        task.cancel()
+    menu_cache.stop_listener()
+    settings_cache.stop_listener()
+    thumbnail_pool.stop()
+    log_writer.stop()
+    password_hasher.stop()
+    await async_engine.dispose()
+    for replica in replica_engines:
+        await replica.dispose()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="电商运营系统API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS中间件配置
@@ -15,8 +92,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# 请求指标（最外层，耗时包含其它中间件）；关闭指标时仍统计请求SQL（N+1 检测、测试中的SQL条数断言）
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+else:
+    app.add_middleware(QueryStatsMiddleware)
+
+
+@app.exception_handler(BusinessException)
+async def business_exception_handler(request: Request, exc: BusinessException):
+    return JSONResponse(status_code=exc.code, content={"detail": exc.message})
+
 
 @app.get("/")
 async def root():
@@ -28,20 +117,35 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/health/db")
+async def health_db():
+    """数据库连接池状态：借出/空闲/溢出连接数、借出等待与连接年龄直方图"""
+    return {"status": "ok", "pgbouncer_mode": settings.DB_PGBOUNCER_MODE, "pools": pool_status()}
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus 指标（nginx 未转发该路径，仅供内网抓取）"""
+        return PlainTextResponse(render_metrics(), media_type=PrometheusWriter.CONTENT_TYPE)
+
+
 # 导入路由
 from app.api import (
     auth, shops,
-    settings, menus, platforms,
-    users, logs,
+    menus, platforms,
+    users, logs, files,
     data_tables, data_table_data
 )
+# 与配置对象 settings 同名，单独取别名导入
+from app.api import settings as settings_api
 
 # 认证和用户
 app.include_router(auth.router, prefix="/api/auth", tags=["认证"])
 app.include_router(users.router, prefix="/api/users", tags=["用户管理"])
 
 # 系统配置
-app.include_router(settings.router, prefix="/api/settings", tags=["系统设置"])
+app.include_router(settings_api.router, prefix="/api/settings", tags=["系统设置"])
 app.include_router(menus.router, prefix="/api/menus", tags=["菜单管理"])
 app.include_router(platforms.router, prefix="/api/platforms", tags=["平台管理"])
 
@@ -53,6 +157,9 @@ app.include_router(data_table_data.router, prefix="/api/data-table-data", tags=[
 # 操作日志
 app.include_router(logs.router, prefix="/api/logs", tags=["操作日志"])
 
+# 上传文件
+app.include_router(files.router, prefix="/api/files", tags=["文件"])
+
 # TODO: 待开发
 # app.include_router(sales.router, prefix="/api/sales", tags=["销售"])
 
@@ -6,6 +6,7 @@ from app.models.system_settings import SystemSetting
 from app.models.menu_items import MenuItem
 from app.models.platforms import Platform
 from app.models.data_tables import DataTable, TableData
+from app.models.cache_versions import CacheVersion
 
 __all__ = [
     "User",
@@ -17,5 +18,6 @@ __all__ = [
     "Platform",
     "DataTable",
     "TableData",
+    "CacheVersion",
 ]
 
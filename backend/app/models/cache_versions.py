@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class CacheVersion(Base):
+    """缓存版本号模型 - 按作用域记录数据变更版本，用于ETag与缓存失效"""
+    __tablename__ = "cache_versions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(100), unique=True, nullable=False, index=True, comment="作用域（如 menus、settings:basic、data_table_tree）")
+    version = Column(BigInteger, nullable=False, default=0, server_default="0", comment="版本号")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Text, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, JSON, Text, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -16,6 +16,7 @@ class DataTable(Base):
     fields = Column(JSON, nullable=False, comment="字段配置列表（JSONB）")
     sort_order = Column(Integer, default=0, comment="排序")
     is_active = Column(Integer, default=1, comment="是否启用（0=禁用，1=启用）")
+    data_version = Column(BigInteger, nullable=False, default=0, server_default="0", comment="数据版本号（导入或数据写入时递增，用于缓存失效）")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
 
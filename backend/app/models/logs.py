@@ -1,18 +1,33 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, JSON
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 
 class OperationLog(Base):
-    """操作日志模型"""
+    """
+    操作日志模型
+
+    按 created_at 月度范围分区（见 app/services/log_partitions.py），
+    分区键必须包含在主键中，因此主键为 (id, created_at)。
+    """
     __tablename__ = "operation_logs"
+    __table_args__ = (
+        # 单条记录的变更历史
+        Index("ix_operation_logs_table_record_created", "table_name", "record_id", "created_at"),
+        # 按用户、按天的操作量
+        Index("ix_operation_logs_user_created", "user_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="操作用户ID")
     action_type = Column(String(50), nullable=False, index=True, comment="操作类型：create/update/delete")
     table_name = Column(String(50), nullable=False, comment="操作表名")
     record_id = Column(Integer, comment="记录ID")
     old_value = Column(JSON, comment="旧值")
     new_value = Column(JSON, comment="新值")
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True, comment="创建时间")
+    created_at = Column(
+        DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now(), index=True,
+        comment="创建时间"
+    )
 
@@ -71,6 +71,34 @@ class TableDataCreate(BaseModel):
     data: Dict[str, Any] = Field(..., description="数据内容")
 
 
+class TableDataPatch(BaseModel):
+    """数据局部更新Schema（按键合并到已有数据）"""
+    id: int = Field(..., description="数据ID")
+    data: Dict[str, Any] = Field(..., description="需要更新的字段")
+
+
+class TableDataBatch(BaseModel):
+    """数据批量操作Schema"""
+    create: List[Dict[str, Any]] = Field(default_factory=list, max_length=5000, description="新增的数据内容")
+    update: List[TableDataPatch] = Field(default_factory=list, max_length=5000, description="局部更新")
+    delete: List[int] = Field(default_factory=list, max_length=5000, description="删除的数据ID")
+
+
+class TableDataBatchResult(BaseModel):
+    """数据批量操作结果Schema"""
+    created: int
+    updated: int
+    deleted: int
+    created_ids: List[int] = []
+    missing_ids: List[int] = Field([], description="更新或删除时未找到的数据ID")
+
+
+class TableDataBulkUpdate(BaseModel):
+    """按筛选条件批量更新Schema"""
+    filters: Dict[str, Any] = Field(..., description="筛选条件（与查询接口语法一致）")
+    assignments: Dict[str, Any] = Field(..., description="字段赋值，合并到所有匹配数据")
+
+
 class TableDataResponse(BaseModel):
     """数据响应Schema"""
     id: int
@@ -87,10 +115,28 @@ class DataTableDataQuery(BaseModel):
     """数据表数据查询Schema"""
     table_type: str = Field(..., description="表类型")
     shop_id: Optional[int] = Field(None, description="店铺ID")
-    filters: Optional[Dict[str, Any]] = Field(None, description="筛选条件")
+    filters: Optional[Dict[str, Any]] = Field(
+        None,
+        description="筛选条件：{字段: 值} 等值匹配，或 {字段: {eq/ne/lt/lte/gt/gte/in/contains/is_null: 值}}"
+    )
     data_table_id: Optional[int] = Field(None, description="数据表ID")
     sort_by: Optional[str] = Field(None, description="排序字段")
     sort_order: Optional[str] = Field(None, description="排序方向 asc/desc")
     skip: int = Field(0, ge=0, description="跳过记录数")
     limit: int = Field(20, ge=1, le=100, description="返回记录数")
 
+
+
+class AggregateMetric(BaseModel):
+    """聚合指标Schema"""
+    func: str = Field(..., description="聚合函数：count/sum/avg/min/max")
+    field: Optional[str] = Field(None, description="字段名（count 可省略）")
+
+
+class DataTableAggregateQuery(BaseModel):
+    """数据表聚合查询Schema"""
+    data_table_id: int = Field(..., description="数据表ID")
+    filters: Optional[Dict[str, Any]] = Field(None, description="筛选条件（与查询接口语法一致）")
+    group_by: List[str] = Field(default_factory=list, max_length=3, description="分组字段")
+    metrics: List[AggregateMetric] = Field(..., min_length=1, max_length=10, description="聚合指标")
+    limit: int = Field(1000, ge=1, le=10000, description="最多返回分组数")
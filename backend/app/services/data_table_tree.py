@@ -0,0 +1,94 @@
+"""数据表树（平台-店铺-数据表）构建服务"""
+from typing import List, Optional
+from sqlalchemy import and_, literal, select
+from sqlalchemy.orm import Session
+from app.models import DataTable, Platform, Shop
+from app.schemas.data_tables import DataTableTreeNode
+
+_TREE_NODE_KEYS = tuple(DataTableTreeNode.model_fields)
+
+
+def _tree_node(**values) -> dict:
+    """构造树节点字典（键与 DataTableTreeNode 一致，未给出的键为 None）"""
+    node = dict.fromkeys(_TREE_NODE_KEYS)
+    node.update(values)
+    return node
+
+
+def build_tree(db: Session, platform_id: Optional[int] = None, lite: bool = False) -> List[dict]:
+    """
+    一次连接查询取出平台、启用的店铺与数据表，在内存中分组构建树
+
+    Args:
+        platform_id: 只返回指定平台
+        lite: 精简模式，不返回数据表的字段配置
+    """
+    fields_column = literal(None).label("fields") if lite else DataTable.fields
+    stmt = (
+        select(
+            Platform.id, Platform.name,
+            Shop.id, Shop.name, Shop.status,
+            DataTable.id, DataTable.name, DataTable.table_type, DataTable.shop_id,
+            DataTable.is_active, DataTable.description, DataTable.sort_order, fields_column,
+        )
+        .select_from(Platform)
+        .outerjoin(Shop, and_(Shop.platform_id == Platform.id, Shop.status == "active"))
+        .outerjoin(DataTable, and_(DataTable.shop_id == Shop.id, DataTable.is_active == 1))
+        .where(Platform.is_active == 1)
+        .order_by(Platform.sort_order, Platform.id, Shop.id, DataTable.sort_order, DataTable.id)
+    )
+    if platform_id:
+        stmt = stmt.where(Platform.id == platform_id)
+
+    tree = []
+    platform_nodes = {}
+    shop_nodes = {}
+    for (
+        p_id, p_name, s_id, s_name, s_status,
+        t_id, t_name, t_type, t_shop_id, t_active, t_description, t_sort, t_fields,
+    ) in db.execute(stmt):
+        platform_node = platform_nodes.get(p_id)
+        if platform_node is None:
+            platform_node = _tree_node(
+                id=p_id,
+                name=p_name,
+                type="platform",
+                platform_id=p_id,
+                platform_name=p_name,
+                children=[]
+            )
+            platform_nodes[p_id] = platform_node
+            tree.append(platform_node)
+        if s_id is None:
+            continue
+
+        shop_node = shop_nodes.get(s_id)
+        if shop_node is None:
+            shop_node = _tree_node(
+                id=s_id,
+                name=s_name,
+                type="shop",
+                platform_id=p_id,
+                platform_name=p_name,
+                status=s_status,
+                children=[]
+            )
+            shop_nodes[s_id] = shop_node
+            platform_node["children"].append(shop_node)
+        if t_id is None:
+            continue
+
+        shop_node["children"].append(_tree_node(
+            id=t_id,
+            name=t_name,
+            type="data_table",
+            table_type=t_type,
+            platform_id=p_id,
+            platform_name=p_name,
+            shop_id=t_shop_id,
+            is_active=t_active,
+            fields=t_fields,  # 精简模式下为 None
+            description=t_description,
+            sort_order=t_sort
+        ))
+    return tree
@@ -0,0 +1,287 @@
+"""
+操作日志分区维护
+
+operation_logs 按 created_at 月度范围分区（分区名 operation_logs_pYYYY_MM），另有默认分区兜底。
+- ensure_partitions: 预建当前月及之后若干个月的分区
+- archive_expired / archive_partition: 将超过保留期的分区导出为 gzip 压缩的CSV，校验后分离并删除
+- restore_archive: 将归档文件恢复为分区
+- run_maintenance: 应用运行期间每天执行一次的维护任务
+- read_archive: 不恢复分区，直接按条件读取归档文件
+"""
+import csv
+import gzip
+import io
+import logging
+import os
+import re
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import Connection, Engine
+from app.core.config import settings
+from app.core.database import engine
+from app.services.versions import LOG_ARCHIVE_SCOPE, LOGS_SCOPE, bump_version
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "operation_logs"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+ARCHIVE_COLUMNS = (
+    "id", "user_id", "action_type", "table_name", "record_id", "old_value", "new_value", "created_at"
+)
+# 分区维护咨询锁的键（pg_advisory_xact_lock）
+MAINTENANCE_LOCK_ID = 7020_0001
+# 归档删除分区时 DETACH 等待父表排他锁的上限；超时则本次放弃，下次维护重试
+DETACH_LOCK_TIMEOUT = "5s"
+_PARTITION_PATTERN = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(value: Optional[date] = None) -> date:
+    value = value or date.today()
+    return date(value.year, value.month, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """从分区名解析月份，非月度分区返回None"""
+    match = _PARTITION_PATTERN.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def list_partitions(conn: Connection) -> List[str]:
+    """当前挂载在 operation_logs 下的分区"""
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :parent ORDER BY c.relname"
+    ), {"parent": PARENT_TABLE})
+    return [row[0] for row in rows]
+
+
+def create_partition(conn: Connection, month: date) -> str:
+    """创建指定月份的分区（已存在时跳过）"""
+    name = partition_name(month)
+    conn.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+    ))
+    return name
+
+
+def ensure_partitions(conn: Connection, months_ahead: int = 3) -> List[str]:
+    """
+    预建默认分区以及当前月到之后 months_ahead 个月的分区
+
+    提前建好分区可避免新月份的日志落入默认分区；返回本次新建的分区名。
+    """
+    existing = set(list_partitions(conn))
+    created = []
+    if DEFAULT_PARTITION not in existing:
+        conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{DEFAULT_PARTITION}" PARTITION OF {PARENT_TABLE} DEFAULT'))
+        created.append(DEFAULT_PARTITION)
+    current = month_start()
+    for offset in range(months_ahead + 1):
+        month = _add_months(current, offset)
+        if partition_name(month) not in existing:
+            created.append(create_partition(conn, month))
+    return created
+
+
+def lock_maintenance(conn: Connection, wait: bool = False) -> bool:
+    """
+    在当前事务中获取分区维护的咨询锁（事务结束时释放，兼容 PgBouncer 事务池模式）
+
+    多个 worker 同时执行定时维护时只有一个获得锁，其余跳过，避免并发 DETACH 同一分区。
+    wait 为 True 时等待锁（命令行手动维护）。
+    """
+    if wait:
+        conn.execute(select(func.pg_advisory_xact_lock(MAINTENANCE_LOCK_ID)))
+        return True
+    return bool(conn.execute(select(func.pg_try_advisory_xact_lock(MAINTENANCE_LOCK_ID))).scalar())
+
+
+def _fsync_directory(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _count_archive_rows(path: str) -> int:
+    """归档文件中的数据行数（按CSV解析，JSON值中可能含换行）"""
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+        return sum(1 for _ in csv.reader(f)) - 1
+
+
+def _export_partition(conn: Connection, name: str, path: str) -> Tuple[int, Optional[int]]:
+    """
+    把仍挂载的分区导出到 path（先写临时文件并 fsync，校验行数后重命名并 fsync 目录）
+
+    在可重复读事务中执行，行数、最大ID与 COPY 使用同一快照；只持有分区上的读锁，不阻塞新日志写入。
+
+    Returns:
+        (行数, 最大ID)
+    """
+    expected, max_id = conn.execute(text(f'SELECT count(*), max(id) FROM "{name}"')).one()
+    temp_path = f"{path}.tmp"
+    columns = ", ".join(ARCHIVE_COLUMNS)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        with open(temp_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as compressed:
+                with io.TextIOWrapper(compressed, encoding="utf-8", newline="") as f:
+                    cursor.copy_expert(
+                        f'COPY (SELECT {columns} FROM "{name}" ORDER BY id) TO STDOUT WITH (FORMAT csv, HEADER true)', f
+                    )
+            raw.flush()
+            os.fsync(raw.fileno())
+    finally:
+        cursor.close()
+
+    written = _count_archive_rows(temp_path)
+    if written != expected:
+        os.remove(temp_path)
+        raise RuntimeError(f"归档校验失败：分区 {name} 有 {expected} 行，归档文件中 {written} 行")
+    os.replace(temp_path, path)
+    _fsync_directory(os.path.dirname(path))
+    return expected, max_id
+
+
+def archive_partition(bind: Engine, name: str, archive_dir: str, wait: bool = False) -> Optional[str]:
+    """
+    将分区导出为 gzip 压缩的CSV（带表头），确认文件已落盘且行数一致后分离并删除分区
+
+    分两个事务执行，避免长时间持有父表的排他锁（期间所有日志写入都会阻塞）：
+    1. 导出：分区仍挂载，在可重复读快照中导出并校验行数（过去的月份不再写入）；
+    2. 删除：DETACH（取父表排他锁，等待不超过 DETACH_LOCK_TIMEOUT）后确认没有导出之后新写入的行，
+       再 DROP 并递增版本号，只包含这几条语句。
+    任一步失败时分区保持原样（第二步失败时删除已导出的文件）。两步各自持有维护咨询锁，
+    其它进程正在维护时返回 None（wait 为 True 时等待锁）。
+
+    Returns:
+        归档文件路径
+    """
+    if partition_month(name) is None:
+        raise ValueError(f"不是月度日志分区: {name}")
+    if not os.path.isabs(archive_dir):
+        raise ValueError(f"归档目录必须是绝对路径: {archive_dir}")
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+
+    with bind.connect() as conn:
+        conn = conn.execution_options(isolation_level="REPEATABLE READ")
+        with conn.begin():
+            if not lock_maintenance(conn, wait):
+                return None
+            if name not in list_partitions(conn):
+                raise ValueError(f"分区不存在: {name}")
+            expected, max_id = _export_partition(conn, name, path)
+
+    try:
+        with bind.begin() as conn:
+            if not lock_maintenance(conn, wait):
+                return None
+            if name not in list_partitions(conn):
+                # 两个事务之间已被其它进程归档
+                return path
+            conn.execute(text(f"SET LOCAL lock_timeout = '{DETACH_LOCK_TIMEOUT}'"))
+            conn.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"'))
+            newer = text(f'SELECT EXISTS (SELECT 1 FROM "{name}" WHERE id > :max_id)')
+            if conn.execute(newer, {"max_id": max_id if max_id is not None else 0}).scalar():
+                raise RuntimeError(f"分区 {name} 在导出后有新写入的日志，本次不删除")
+            conn.execute(text(f'DROP TABLE "{name}"'))
+            bump_version(conn, LOGS_SCOPE, LOG_ARCHIVE_SCOPE)
+    except Exception:
+        os.remove(path)
+        raise
+    logger.info("操作日志分区 %s 已归档到 %s（%d 行）", name, path, expected)
+    return path
+
+
+def archive_expired(bind: Engine, retention_months: int, archive_dir: str, wait: bool = False) -> List[str]:
+    """归档早于保留期（当前月往前 retention_months 个月）的全部月度分区，每个分区单独处理"""
+    cutoff = _add_months(month_start(), -retention_months)
+    with bind.connect() as conn:
+        expired = [name for name in list_partitions(conn) if (partition_month(name) or cutoff) < cutoff]
+    paths = []
+    for name in expired:
+        path = archive_partition(bind, name, archive_dir, wait)
+        if path is None:
+            logger.info("其它进程正在维护操作日志分区，停止归档")
+            break
+        paths.append(path)
+    return paths
+
+
+def restore_archive(conn: Connection, path: str) -> str:
+    """将归档文件恢复为分区（分区已存在时报错）"""
+    name = os.path.basename(path).split(".", 1)[0]
+    month = partition_month(name)
+    if month is None:
+        raise ValueError(f"无法从文件名识别分区: {path}")
+    if name in list_partitions(conn):
+        raise ValueError(f"分区已存在: {name}")
+
+    conn.execute(text(f'CREATE TABLE "{name}" (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)'))
+    columns = ", ".join(ARCHIVE_COLUMNS)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+            cursor.copy_expert(f'COPY "{name}" ({columns}) FROM STDIN WITH (FORMAT csv, HEADER true)', f)
+    finally:
+        cursor.close()
+    conn.execute(text(
+        f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION "{name}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+    ))
+    bump_version(conn, LOGS_SCOPE, LOG_ARCHIVE_SCOPE)
+    logger.info("归档 %s 已恢复为分区 %s", path, name)
+    return name
+
+
+def run_maintenance() -> None:
+    """
+    定时维护：预建分区，配置了保留期时归档过期分区
+
+    每步（预建、每个分区的导出与删除）独立事务，并各自持有维护咨询锁；其它 worker 正在执行时本次跳过。
+    """
+    with engine.begin() as conn:
+        if not lock_maintenance(conn):
+            logger.info("其它进程正在维护操作日志分区，本次跳过")
+            return
+        created = ensure_partitions(conn, settings.LOG_PARTITION_MONTHS_AHEAD)
+    if created:
+        logger.info("已创建操作日志分区: %s", ", ".join(created))
+    if settings.LOG_RETENTION_MONTHS > 0:
+        archive_expired(engine, settings.LOG_RETENTION_MONTHS, settings.LOG_ARCHIVE_DIR)
+
+
+def read_archive(
+    path: str,
+    user_id: Optional[int] = None,
+    action_type: Optional[str] = None,
+    table_name: Optional[str] = None,
+    record_id: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """流式读取归档文件并按条件筛选（值均为文本，空值为None）"""
+    expected = {
+        "user_id": None if user_id is None else str(user_id),
+        "action_type": action_type,
+        "table_name": table_name,
+        "record_id": None if record_id is None else str(record_id),
+    }
+    expected = {key: value for key, value in expected.items() if value is not None}
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            if all(row.get(key) == value for key, value in expected.items()):
+                yield {key: (value if value != "" else None) for key, value in row.items()}
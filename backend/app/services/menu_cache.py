@@ -0,0 +1,104 @@
+"""
+菜单进程内缓存
+
+可见菜单一次读入内存，按角色预先构建扁平列表与菜单树并序列化为JSON字节串，
+读接口直接输出；菜单增删改提交后失效（机制见 snapshot_cache）。
+"""
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.etag import make_etag
+from app.core.responses import dumps
+from app.models.menu_items import MenuItem
+from app.services.snapshot_cache import VersionedSnapshotCache
+from app.services.versions import MENU_SCOPE
+
+_RESPONSE_FIELDS = (
+    "id", "name", "icon", "path", "parent_id", "sort_order", "is_visible",
+    "required_role", "component", "created_at", "updated_at",
+)
+
+# 预先构建的角色，其它角色首次访问时构建
+PRECOMPUTED_ROLES = ("admin", "operator", "all")
+
+
+def build_menu_tree(items: List[Dict[str, Any]]) -> List[dict]:
+    """构建菜单树（items 已按顺序排列）"""
+    # 创建字典用于快速查找
+    item_dict = {item["id"]: {**item, "children": []} for item in items}
+
+    # 构建树结构
+    tree = []
+    for item in items:
+        if item["parent_id"] is None:
+            tree.append(item_dict[item["id"]])
+        elif item["parent_id"] in item_dict:
+            item_dict[item["parent_id"]]["children"].append(item_dict[item["id"]])
+
+    return tree
+
+
+@dataclass
+class RoleMenus:
+    """某角色的菜单响应"""
+    menus_etag: str
+    menus_body: bytes
+    tree_etag: str
+    tree_body: bytes
+
+
+@dataclass
+class MenuSnapshot:
+    version: int
+    items: List[Dict[str, Any]]
+    roles: Dict[str, RoleMenus] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def _build(self, role: str) -> RoleMenus:
+        if role == "admin":
+            items = self.items
+        else:
+            items = [item for item in self.items if item["required_role"] in ("all", role)]
+        # 扁平列表与 MenuItemResponse 一致，children 为空
+        flat = [{**item, "children": []} for item in items]
+        return RoleMenus(
+            menus_etag=make_etag("menus", self.version, role),
+            menus_body=dumps(flat),
+            tree_etag=make_etag("menu-tree", self.version, role),
+            tree_body=dumps(build_menu_tree(items)),
+        )
+
+    def for_role(self, role: str) -> RoleMenus:
+        entry = self.roles.get(role)
+        if entry is None:
+            with self._lock:
+                entry = self.roles.get(role)
+                if entry is None:
+                    entry = self.roles[role] = self._build(role)
+        return entry
+
+
+class MenuCache(VersionedSnapshotCache[MenuSnapshot]):
+    def load(self, db: Session, version: int) -> MenuSnapshot:
+        menus = (
+            db.query(MenuItem)
+            .filter(MenuItem.is_visible == 1)
+            .order_by(MenuItem.sort_order, MenuItem.id)
+            .all()
+        )
+        snapshot = MenuSnapshot(
+            version=version,
+            items=[{name: getattr(menu, name) for name in _RESPONSE_FIELDS} for menu in menus],
+        )
+        for role in PRECOMPUTED_ROLES:
+            snapshot.for_role(role)
+        return snapshot
+
+    def for_role(self, db: Session, role: str) -> RoleMenus:
+        """获取角色的菜单响应"""
+        return self.snapshot(db).for_role(role)
+
+
+menu_cache = MenuCache(MENU_SCOPE, poll_interval=settings.MENU_POLL_INTERVAL)
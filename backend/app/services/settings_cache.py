@@ -0,0 +1,66 @@
+"""
+系统设置进程内缓存
+
+全部设置一次性读入内存，按 value_type 解析为Python值；失效机制见 snapshot_cache。
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import orjson
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.system_settings import SystemSetting
+from app.services.snapshot_cache import VersionedSnapshotCache
+from app.services.versions import SETTINGS_SCOPE
+
+logger = logging.getLogger(__name__)
+
+_RESPONSE_FIELDS = (
+    "id", "key", "value", "value_type", "description", "group_name", "is_public", "created_at", "updated_at"
+)
+
+
+def parse_value(value: Optional[str], value_type: Optional[str]) -> Any:
+    """按 value_type 解析配置值，解析失败时返回原文本"""
+    if value is None:
+        return None
+    try:
+        if value_type == "json":
+            return orjson.loads(value)
+        if value_type == "number":
+            number = float(value)
+            return int(number) if number.is_integer() and "." not in value else number
+        if value_type == "boolean":
+            return value.strip().lower() in ("true", "1", "yes", "是")
+    except ValueError:
+        logger.warning("配置值无法按 %s 解析: %r", value_type, value)
+    return value
+
+
+@dataclass
+class SettingsSnapshot:
+    version: int
+    rows: List[Dict[str, Any]]
+    by_key: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    values: Dict[str, Any] = field(default_factory=dict)
+
+
+class SettingsCache(VersionedSnapshotCache[SettingsSnapshot]):
+    def load(self, db: Session, version: int) -> SettingsSnapshot:
+        rows = [
+            {name: getattr(setting, name) for name in _RESPONSE_FIELDS}
+            for setting in db.query(SystemSetting).order_by(SystemSetting.id).all()
+        ]
+        return SettingsSnapshot(
+            version=version,
+            rows=rows,
+            by_key={row["key"]: row for row in rows},
+            values={row["key"]: parse_value(row["value"], row["value_type"]) for row in rows},
+        )
+
+    def get_value(self, db: Session, key: str, default: Any = None) -> Any:
+        """读取解析后的配置值"""
+        return self.snapshot(db).values.get(key, default)
+
+
+settings_cache = SettingsCache(SETTINGS_SCOPE, poll_interval=settings.SETTINGS_POLL_INTERVAL)
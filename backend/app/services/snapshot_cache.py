@@ -0,0 +1,102 @@
+"""
+按版本号失效的进程内快照缓存
+
+快照带有对应作用域（cache_versions）的版本号：
+- Redis可用时订阅该作用域的失效频道，任一进程修改数据后广播，其它进程收到后立即丢弃快照；
+- 未订阅时按 poll_interval 秒读取一次版本号（单行查询），版本变化则重新加载。
+"""
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Generic, Optional, TypeVar
+from sqlalchemy.orm import Session
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.services.versions import get_version
+
+logger = logging.getLogger(__name__)
+
+# 订阅生效时的兜底检查间隔（秒）
+SUBSCRIBED_POLL_INTERVAL = 60
+
+T = TypeVar("T")
+
+
+class VersionedSnapshotCache(ABC, Generic[T]):
+    """子类实现 load(db, version) 构造快照，快照对象须带 version 属性（系统设置、菜单共用）"""
+
+    def __init__(self, scope: str, poll_interval: float):
+        self.scope = scope
+        self.poll_interval = poll_interval
+        self.channel = f"{settings.CACHE_KEY_PREFIX}:invalidate:{scope}"
+        self._snapshot: Optional[T] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._subscribed = False
+        self._stop = threading.Event()
+
+    @abstractmethod
+    def load(self, db: Session, version: int) -> T:
+        """从数据库构造指定版本的快照"""
+
+    def snapshot(self, db: Session) -> T:
+        """获取当前快照（过期时重新加载）"""
+        snapshot = self._snapshot
+        interval = SUBSCRIBED_POLL_INTERVAL if self._subscribed else self.poll_interval
+        if snapshot is not None and time.monotonic() - self._checked_at < interval:
+            return snapshot
+
+        version = get_version(db, self.scope)
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = self.load(db, version)
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def invalidate(self, broadcast: bool = True) -> None:
+        """丢弃快照（须在提交之后调用），并通知其它进程"""
+        with self._lock:
+            self._snapshot = None
+        if not broadcast:
+            return
+        client = get_cache().redis_client
+        if client is not None:
+            try:
+                client.publish(self.channel, b"1")
+            except Exception as e:
+                logger.warning("%s 失效通知发送失败: %s", self.scope, e)
+
+    def start_listener(self) -> None:
+        """Redis可用时启动订阅线程"""
+        if not settings.CACHE_REDIS_ENABLED or self._listener is not None:
+            return
+        self._stop.clear()
+        self._listener = threading.Thread(target=self._listen, name=f"invalidate-{self.scope}", daemon=True)
+        self._listener.start()
+
+    def stop_listener(self) -> None:
+        self._stop.set()
+        self._listener = None
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            client = get_cache().redis_client
+            if client is None:
+                self._stop.wait(SUBSCRIBED_POLL_INTERVAL)
+                continue
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                self._subscribed = True
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self.invalidate(broadcast=False)
+            except Exception as e:
+                logger.warning("%s 失效订阅中断，改为轮询版本号: %s", self.scope, e)
+                self._stop.wait(self.poll_interval)
+            finally:
+                self._subscribed = False
+                pubsub.close()
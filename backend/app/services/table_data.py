@@ -0,0 +1,406 @@
+"""数据表数据查询服务"""
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import (
+    Integer, Numeric, Text, and_, asc, bindparam, case, cast, column, delete, desc, false, func, insert, literal,
+    not_, or_, select, update
+)
+from sqlalchemy.dialects.postgresql import JSON, JSONB, aggregate_order_by
+from sqlalchemy.orm import Session
+from app.models import DataTable, TableData
+
+
+_COMPARE_OPERATORS = {
+    "lt": lambda left, right: left < right,
+    "lte": lambda left, right: left <= right,
+    "gt": lambda left, right: left > right,
+    "gte": lambda left, right: left >= right,
+}
+
+
+def _equals(text_value, json_value, value):
+    """
+    等值条件：字符串按文本比较（"5" 也匹配数字 5，兼容前端输入框传入的文本）；
+    其它值按JSONB比较（true 匹配布尔值，5 匹配 5.0，None 匹配JSON null）
+    """
+    if isinstance(value, str):
+        return text_value == value
+    return json_value == bindparam(None, value, type_=JSONB)
+
+
+def _field_condition(field: str, spec: Any) -> list:
+    """
+    单个字段的筛选条件
+
+    - 标量：等值匹配（见 _equals）
+    - 字典：{"eq"/"ne": 值, "lt"/"lte"/"gt"/"gte": 值, "in": [值], "contains": 文本, "is_null": bool}
+      大小比较只匹配JSON类型相同的值（数字与数字按数值比较，字符串与字符串按文本比较），
+      空值（JSON null）与类型不同的值不会被当作更小或更大而匹配
+    """
+    text_value = TableData.data[field].as_string()
+    json_value = cast(TableData.data, JSONB)[field]
+    if not isinstance(spec, dict):
+        return [_equals(text_value, json_value, spec)]
+    if not spec:
+        raise ValueError(f"筛选条件 '{field}' 未指定操作")
+
+    conditions = []
+    for operator, value in spec.items():
+        if operator == "eq":
+            conditions.append(_equals(text_value, json_value, value))
+        elif operator == "ne":
+            conditions.append(not_(func.coalesce(_equals(text_value, json_value, value), False)))
+        elif operator in _COMPARE_OPERATORS:
+            bound = bindparam(None, value, type_=JSONB)
+            conditions.append(and_(
+                func.jsonb_typeof(json_value) == func.jsonb_typeof(bound),
+                _COMPARE_OPERATORS[operator](json_value, bound),
+            ))
+        elif operator == "in":
+            if not isinstance(value, list):
+                raise ValueError(f"筛选条件 '{field}.in' 必须是列表")
+            texts = [item for item in value if isinstance(item, str)]
+            others = [item for item in value if not isinstance(item, str)]
+            alternatives = []
+            if texts:
+                alternatives.append(text_value.in_(texts))
+            if others:
+                alternatives.append(json_value.in_([bindparam(None, item, type_=JSONB) for item in others]))
+            conditions.append(or_(*alternatives) if alternatives else false())
+        elif operator == "contains":
+            conditions.append(text_value.contains(str(value), autoescape=True))
+        elif operator == "is_null":
+            conditions.append(text_value.is_(None) if value else text_value.is_not(None))
+        else:
+            raise ValueError(f"不支持的筛选操作: {operator}")
+    return conditions
+
+
+def filter_conditions(filters: Optional[Dict[str, Any]]) -> list:
+    """
+    将筛选条件转换为SQL条件列表（查询、批量更新共用同一语法）
+
+    Raises:
+        ValueError: 筛选语法错误（含空的操作字典）
+    """
+    conditions = []
+    for field, spec in (filters or {}).items():
+        if spec is None:
+            continue
+        conditions.extend(_field_condition(field, spec))
+    return conditions
+
+
+def apply_filters(stmt, filters: Optional[Dict[str, Any]]):
+    """应用字段筛选"""
+    conditions = filter_conditions(filters)
+    return stmt.where(*conditions) if conditions else stmt
+
+
+def _order_by(data_col, id_col, sort_by: Optional[str], sort_order: Optional[str]) -> list:
+    """构造排序表达式（内外层查询共用）"""
+    if not sort_by:
+        return [id_col.desc()]
+    sort_expression = data_col[sort_by].as_string()
+    direction = asc if (sort_order or "").lower() == "asc" else desc
+    return [direction(sort_expression), id_col.desc()]
+
+
+def fetch_rows_json(
+    db: Session,
+    data_table_id: int,
+    filters: Optional[Dict[str, Any]] = None,
+    sort_by: Optional[str] = None,
+    sort_order: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    id_overrides_data: bool = True,
+) -> str:
+    """
+    由PostgreSQL直接生成分页数据的JSON数组文本，避免逐行构造Python字典
+
+    Args:
+        id_overrides_data: True时 id/_id 覆盖数据中的同名键，False时数据优先
+    """
+    page = apply_filters(
+        select(TableData.id, TableData.data).where(TableData.data_table_id == data_table_id),
+        filters,
+    )
+    page = (
+        page.order_by(*_order_by(TableData.data, TableData.id, sort_by, sort_order))
+        .offset(skip)
+        .limit(limit)
+        .subquery()
+    )
+
+    id_object = func.jsonb_build_object(literal("id"), page.c.id, literal("_id"), page.c.id)
+    data_object = cast(page.c.data, JSONB)
+    row = data_object.op("||")(id_object) if id_overrides_data else id_object.op("||")(data_object)
+
+    items = func.json_agg(
+        aggregate_order_by(row, *_order_by(page.c.data, page.c.id, sort_by, sort_order))
+    )
+    return db.execute(select(cast(items, Text))).scalar()
+
+
+def count_rows(db: Session, data_table_id: int, filters: Optional[Dict[str, Any]] = None) -> int:
+    """统计筛选后的数据行数"""
+    stmt = apply_filters(
+        select(func.count()).select_from(TableData).where(TableData.data_table_id == data_table_id),
+        filters,
+    )
+    return db.execute(stmt).scalar()
+
+
+def data_table_brief(data_table) -> Dict[str, Any]:
+    """查询结果中附带的数据表简要信息"""
+    return {
+        "id": data_table.id,
+        "name": data_table.name,
+        "table_type": data_table.table_type,
+        "shop_id": data_table.shop_id,
+    }
+
+
+# 字符串日期可识别的格式（ISO 8601 之外）
+_DATE_FORMATS = ("%Y/%m/%d", "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M", "%Y.%m.%d", "%Y%m%d")
+_TRUE_STRINGS = ("true", "1", "yes", "是")
+
+
+def _coerce_date(value: Any) -> str:
+    """日期统一保存为 ISO 8601 日期时间文本"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, date):
+        return datetime.combine(value, time()).isoformat()
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text).isoformat()
+    except ValueError:
+        pass
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).isoformat()
+        except ValueError:
+            continue
+    raise ValueError
+
+
+def coerce_value(field_name: str, field_type: str, value: Any) -> Any:
+    """
+    按字段类型转换单个非空值（写接口与文件导入共用）
+
+    Raises:
+        ValueError: 类型不匹配
+    """
+    if field_type == "number":
+        if isinstance(value, bool):
+            raise ValueError(f"字段 '{field_name}' 应为数字类型")
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            raise ValueError(f"字段 '{field_name}' 应为数字类型")
+    if field_type == "boolean":
+        if isinstance(value, str):
+            return value.strip().lower() in _TRUE_STRINGS
+        return bool(value)
+    if field_type == "date":
+        try:
+            return _coerce_date(value)
+        except (ValueError, TypeError, OverflowError):
+            raise ValueError(f"字段 '{field_name}' 日期格式错误")
+    if field_type == "text":
+        return str(value)
+    return value
+
+
+def coerce_record(fields: List[dict], record: Dict[str, Any], partial: bool = False) -> Dict[str, Any]:
+    """
+    按字段配置校验并转换一条数据
+
+    Args:
+        fields: 数据表字段配置
+        record: 数据内容
+        partial: 局部更新时只校验出现的字段
+
+    Raises:
+        ValueError: 缺少必填字段或类型不匹配
+    """
+    result = dict(record)
+    for field in fields:
+        field_name = field["name"]
+        field_type = field.get("type", "text")
+        is_required = field.get("required", False)
+
+        if field_name not in record:
+            if is_required and not partial:
+                raise ValueError(f"缺少必填字段: {field_name}")
+            continue
+
+        value = record[field_name]
+        if value is None or (value == "" and field_type != "text"):
+            if is_required:
+                raise ValueError(f"必填字段 '{field_name}' 不能为空")
+            result[field_name] = None
+            continue
+
+        result[field_name] = coerce_value(field_name, field_type, value)
+    return result
+
+
+def batch_write(
+    db: Session,
+    data_table_id: int,
+    creates: List[Dict[str, Any]],
+    patches: List[Dict[str, Any]],
+    delete_ids: List[int],
+) -> Dict[str, Any]:
+    """
+    集合式批量写入（不提交事务）：局部更新 -> 删除 -> 新增，每类操作一条SQL
+
+    Args:
+        patches: [{"id": 数据ID, "data": 需合并的字段}]
+    """
+    updated_ids: List[int] = []
+    if patches:
+        patch_rows = func.jsonb_to_recordset(
+            bindparam("patches", value=patches, type_=JSONB)
+        ).table_valued(column("id", Integer), column("data", JSONB)).render_derived(with_types=True)
+        stmt = (
+            update(TableData)
+            .where(TableData.id == patch_rows.c.id, TableData.data_table_id == data_table_id)
+            .values(
+                data=cast(cast(TableData.data, JSONB).op("||")(patch_rows.c.data), JSON),
+                updated_at=func.now(),
+            )
+            .returning(TableData.id)
+        )
+        updated_ids = list(db.execute(stmt).scalars())
+
+    deleted_ids: List[int] = []
+    if delete_ids:
+        stmt = (
+            delete(TableData)
+            .where(TableData.data_table_id == data_table_id, TableData.id.in_(delete_ids))
+            .returning(TableData.id)
+        )
+        deleted_ids = list(db.execute(stmt).scalars())
+
+    created_ids: List[int] = []
+    if creates:
+        stmt = insert(TableData).returning(TableData.id, sort_by_parameter_order=True)
+        created_ids = list(db.execute(
+            stmt, [{"data_table_id": data_table_id, "data": record} for record in creates]
+        ).scalars())
+
+    requested = {patch["id"] for patch in patches} | set(delete_ids)
+    missing_ids = sorted(requested - set(updated_ids) - set(deleted_ids))
+
+    return {
+        "created": len(created_ids),
+        "updated": len(updated_ids),
+        "deleted": len(deleted_ids),
+        "created_ids": created_ids,
+        "missing_ids": missing_ids,
+    }
+
+
+def update_by_filter(
+    db: Session,
+    data_table_id: int,
+    filters: Dict[str, Any],
+    assignments: Dict[str, Any],
+) -> int:
+    """
+    将字段赋值合并到所有匹配的数据（单条 UPDATE，不提交事务），返回影响行数
+
+    Raises:
+        ValueError: 筛选条件为空（不允许无条件更新整张表）或语法错误
+    """
+    conditions = filter_conditions(filters)
+    if not conditions:
+        raise ValueError("请至少指定一个筛选条件")
+    stmt = (
+        update(TableData)
+        .where(TableData.data_table_id == data_table_id, *conditions)
+        .values(
+            data=cast(
+                cast(TableData.data, JSONB).op("||")(bindparam("assignments", value=assignments, type_=JSONB)),
+                JSON,
+            ),
+            updated_at=func.now(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).rowcount
+
+
+def bump_data_version(db: Session, data_table_id: int) -> None:
+    """递增数据表版本号（须与数据写入在同一事务内），使相关查询缓存失效"""
+    db.execute(
+        update(DataTable)
+        .where(DataTable.id == data_table_id)
+        .values(data_version=DataTable.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+AGGREGATE_FUNCS = ("count", "sum", "avg", "min", "max")
+
+
+def aggregate_rows(
+    db: Session,
+    data_table_id: int,
+    filters: Optional[Dict[str, Any]],
+    group_by: List[str],
+    metrics: List[Dict[str, Any]],
+    limit: int = 1000,
+) -> List[Dict[str, Any]]:
+    """
+    分组聚合：分组字段按文本取值，sum/avg/min/max 只统计数值类型的值
+
+    Args:
+        metrics: [{"func": 聚合函数, "field": 字段名}]，count 可不指定字段
+
+    Returns:
+        每组一行：{分组字段: 值, ..., "count" / "{func}_{field}": 聚合值}
+    """
+    group_columns = [TableData.data[field].as_string().label(f"g{i}") for i, field in enumerate(group_by)]
+
+    metric_columns = []
+    metric_names = []
+    for i, metric in enumerate(metrics):
+        func_name, field = metric["func"], metric.get("field")
+        if func_name not in AGGREGATE_FUNCS:
+            raise ValueError(f"不支持的聚合函数: {func_name}")
+        if func_name == "count":
+            target = TableData.data[field].as_string() if field else None
+            expression = func.count(target) if target is not None else func.count()
+            metric_names.append(f"count_{field}" if field else "count")
+        else:
+            if not field:
+                raise ValueError(f"聚合函数 {func_name} 需要指定字段")
+            json_value = cast(TableData.data, JSONB)[field]
+            numeric_value = case(
+                (func.jsonb_typeof(json_value) == "number", cast(TableData.data[field].as_string(), Numeric))
+            )
+            expression = getattr(func, func_name)(numeric_value)
+            metric_names.append(f"{func_name}_{field}")
+        metric_columns.append(expression.label(f"m{i}"))
+
+    stmt = apply_filters(
+        select(*group_columns, *metric_columns).where(TableData.data_table_id == data_table_id),
+        filters,
+    )
+    if group_columns:
+        stmt = stmt.group_by(*group_columns).order_by(*group_columns)
+    stmt = stmt.limit(limit)
+
+    rows = []
+    for row in db.execute(stmt):
+        item = {field: row[i] for i, field in enumerate(group_by)}
+        offset = len(group_by)
+        for i, name in enumerate(metric_names):
+            item[name] = row[offset + i]
+        rows.append(item)
+    return rows
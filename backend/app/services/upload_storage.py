@@ -0,0 +1,217 @@
+"""
+上传文件存储
+
+文件按内容 SHA-256 寻址存放在 {UPLOAD_DIR}/objects/<前两位>/<sha256><扩展名>，
+相同内容只存一份，URL 随内容变化，可长期缓存。
+- 上传在线程中按块写入临时文件并计算哈希，不阻塞事件循环，也不把整个文件读入内存；
+- 图片缩略图由后台线程池生成，存放在 {UPLOAD_DIR}/thumbs/<边长>/<前两位>/ 下，
+  生成完成前请求缩略图时返回原图；缩略图缺失（生成失败、进程退出前未执行、被删除）时请求会重新提交生成。
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Optional, Set, Tuple
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.utils.exceptions import BusinessException
+
+logger = logging.getLogger(__name__)
+
+# 允许的图片类型及保存时使用的扩展名
+IMAGE_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/gif": ".gif",
+    "image/svg+xml": ".svg",
+}
+# 矢量图不生成缩略图
+_VECTOR_EXTENSIONS = {".svg"}
+_PIL_FORMATS = {".png": "PNG", ".jpg": "JPEG", ".gif": "GIF"}
+
+FILES_URL_PREFIX = "/api/files/"
+FILE_NAME_PATTERN = re.compile(r"^([0-9a-f]{64})(\.[a-z0-9]{1,8})$")
+
+
+@dataclass
+class StoredFile:
+    digest: str
+    ext: str
+    size: int
+    created: bool  # 本次是否新写入（False 表示内容已存在）
+
+    @property
+    def name(self) -> str:
+        return f"{self.digest}{self.ext}"
+
+    @property
+    def url(self) -> str:
+        return f"{FILES_URL_PREFIX}{self.name}"
+
+    def thumbnail_url(self, size: int) -> str:
+        """缩略图URL；矢量图返回原图URL"""
+        if self.ext in _VECTOR_EXTENSIONS:
+            return self.url
+        return f"{self.url}?size={size}"
+
+
+def object_path(name: str) -> str:
+    """原文件路径（name 为 <sha256><扩展名>）"""
+    return os.path.join(settings.UPLOAD_DIR, "objects", name[:2], name)
+
+
+def thumbnail_path(name: str, size: int) -> str:
+    return os.path.join(settings.UPLOAD_DIR, "thumbs", str(size), name[:2], name)
+
+
+def _save_stream(source: BinaryIO, ext: str, max_size: int) -> StoredFile:
+    """按块复制到临时文件，同时计算哈希；内容已存在时丢弃临时文件"""
+    tmp_dir = os.path.join(settings.UPLOAD_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as target:
+            while True:
+                chunk = source.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise BusinessException(f"文件过大，最大 {max_size // (1024 * 1024)}MB", code=413)
+                hasher.update(chunk)
+                target.write(chunk)
+
+        stored = StoredFile(digest=hasher.hexdigest(), ext=ext, size=size, created=False)
+        path = object_path(stored.name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            stored.created = True
+        return stored
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def _make_thumbnail(name: str, size: int) -> None:
+    """等比缩放到不超过 size×size，保持原格式；GIF 只取第一帧"""
+    target = thumbnail_path(name, size)
+    if os.path.exists(target):
+        return
+    from PIL import Image
+
+    with Image.open(object_path(name)) as image:
+        image.thumbnail((size, size))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # 先写临时文件再改名，避免读到写了一半的缩略图
+        tmp_path = f"{target}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, format=_PIL_FORMATS[name[-4:]])
+        os.replace(tmp_path, target)
+
+
+class ThumbnailPool:
+    """
+    后台生成缩略图的线程池（Pillow 缩放时释放GIL）
+
+    同一缩略图同时只有一个任务；生成失败后 retry_interval 秒内不再重试（如图片已损坏）。
+    """
+
+    def __init__(self, workers: int, sizes, retry_interval: float = 300):
+        self.workers = workers
+        self.sizes = tuple(sizes)
+        self.retry_interval = retry_interval
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending: Set[Tuple[str, int]] = set()
+        self._failed: Dict[Tuple[str, int], float] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="thumbnail")
+        return self._executor
+
+    def stop(self) -> None:
+        """关闭时等待进行中的任务完成"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def submit(self, stored: StoredFile) -> None:
+        if stored.ext in _VECTOR_EXTENSIONS:
+            return
+        for size in self.sizes:
+            self.schedule(stored.name, size)
+
+    def schedule(self, name: str, size: int) -> None:
+        """缩略图不存在且没有进行中的任务时提交生成"""
+        if os.path.exists(thumbnail_path(name, size)):
+            return
+        key = (name, size)
+        with self._lock:
+            if key in self._pending or time.monotonic() < self._failed.get(key, 0):
+                return
+            self._pending.add(key)
+        try:
+            future = self._get_executor().submit(_make_thumbnail, name, size)
+        except Exception:
+            with self._lock:
+                self._pending.discard(key)
+            raise
+        future.add_done_callback(lambda done: self._finish(key, done))
+
+    def _finish(self, key: Tuple[str, int], future) -> None:
+        error = future.exception()
+        with self._lock:
+            self._pending.discard(key)
+            if error is not None:
+                self._failed[key] = time.monotonic() + self.retry_interval
+            else:
+                self._failed.pop(key, None)
+        if error is not None:
+            logger.warning("缩略图生成失败 %s (%d): %s", key[0], key[1], error)
+
+
+thumbnail_pool = ThumbnailPool(settings.THUMBNAIL_WORKERS, settings.THUMBNAIL_SIZES)
+
+
+async def save_image(file: UploadFile) -> StoredFile:
+    """保存上传的图片（类型须在 IMAGE_EXTENSIONS 中）并提交缩略图任务"""
+    stored = await run_in_threadpool(
+        _save_stream, file.file, IMAGE_EXTENSIONS[file.content_type], settings.MAX_IMAGE_UPLOAD_SIZE
+    )
+    thumbnail_pool.submit(stored)
+    return stored
+
+
+def resolve(name: str, size: Optional[int] = None) -> Optional[Tuple[str, bool]]:
+    """
+    查找要发送的文件：返回 (相对 UPLOAD_DIR 的路径, 是否为请求的最终版本)
+
+    请求的缩略图尚未生成时返回原图，第二项为 False（不应长期缓存），并提交生成任务；
+    不支持的尺寸或矢量图直接返回原图。
+    名称不合法或文件不存在时返回 None。
+    """
+    if not FILE_NAME_PATTERN.match(name):
+        return None
+    original = object_path(name)
+    if not os.path.exists(original):
+        return None
+    if size in thumbnail_pool.sizes and name[-4:] in _PIL_FORMATS:
+        thumb = thumbnail_path(name, size)
+        if os.path.exists(thumb):
+            return os.path.relpath(thumb, settings.UPLOAD_DIR), True
+        thumbnail_pool.schedule(name, size)
+        return os.path.relpath(original, settings.UPLOAD_DIR), False
+    return os.path.relpath(original, settings.UPLOAD_DIR), True
@@ -0,0 +1,71 @@
+"""已认证用户缓存"""
+from datetime import datetime
+from typing import Optional
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.core.cache import get_cache, make_key
+from app.core.config import settings
+from app.models.users import User
+
+# 缓存的字段（不含密码哈希）
+_CACHED_FIELDS = ("id", "username", "name", "role", "avatar", "email", "phone", "permissions", "created_at", "updated_at")
+_DATETIME_FIELDS = ("created_at", "updated_at")
+
+
+def _cache_key(user_id: int) -> str:
+    return make_key("auth-user", user_id)
+
+
+def _dump(user: User) -> bytes:
+    return orjson.dumps({field: getattr(user, field) for field in _CACHED_FIELDS})
+
+
+def _load(raw: bytes) -> User:
+    values = orjson.loads(raw)
+    for field in _DATETIME_FIELDS:
+        if values.get(field):
+            values[field] = datetime.fromisoformat(values[field])
+    user = User(**values)
+    # 标记为已持久化但不属于任何会话的对象，避免被误加入当前会话
+    make_transient_to_detached(user)
+    return user
+
+
+def get_user(db: Session, user_id: int) -> Optional[User]:
+    """
+    按ID获取用户，优先读缓存
+
+    缓存命中时返回的是脱离会话的 User 对象（只含上面缓存的字段），
+    只用于身份与权限判断；需要修改用户时应重新查询。
+    """
+    cache = get_cache()
+    key = _cache_key(user_id)
+    raw = cache.get(key)
+    if raw is not None:
+        return _load(raw)
+
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is not None:
+        cache.set(key, _dump(user), settings.AUTH_USER_CACHE_TTL_SECONDS)
+    return user
+
+
+async def get_user_async(db: AsyncSession, user_id: int) -> Optional[User]:
+    """get_user 的异步版本（异步路由使用，缓存与数据库都不阻塞事件循环）"""
+    cache = get_cache()
+    key = _cache_key(user_id)
+    raw = await cache.aget(key)
+    if raw is not None:
+        return _load(raw)
+
+    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    if user is not None:
+        await cache.aset(key, _dump(user), settings.AUTH_USER_CACHE_TTL_SECONDS)
+    return user
+
+
+def invalidate_users(*user_ids: int) -> None:
+    """用户信息、角色、密码变更或删除后清除缓存（须在提交之后调用）"""
+    get_cache().delete(*(_cache_key(user_id) for user_id in user_ids))
@@ -0,0 +1,48 @@
+"""缓存版本号服务"""
+from typing import Dict, Iterable, Optional
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models import CacheVersion
+
+# 作用域
+TREE_SCOPE = "data_table_tree"  # 平台/店铺/数据表树
+MENU_SCOPE = "menus"  # 菜单
+SETTINGS_SCOPE = "settings"  # 全部系统设置
+LOGS_SCOPE = "operation_logs"  # 操作日志（新日志写入）
+LOG_ARCHIVE_SCOPE = "operation_logs_archive"  # 操作日志分区归档/恢复
+
+
+def settings_scope(group_name: Optional[str] = None) -> str:
+    """系统设置作用域：不指定分组时为全部设置"""
+    return f"{SETTINGS_SCOPE}:{group_name}" if group_name else SETTINGS_SCOPE
+
+
+def get_version(db: Session, scope: str) -> int:
+    """读取作用域版本号（未记录时为0）"""
+    version = db.execute(
+        select(CacheVersion.version).where(CacheVersion.scope == scope)
+    ).scalar()
+    return version or 0
+
+
+def get_versions(db: Session, scopes: Iterable[str]) -> Dict[str, int]:
+    """一次读取多个作用域的版本号"""
+    scopes = list(scopes)
+    rows = db.execute(
+        select(CacheVersion.scope, CacheVersion.version).where(CacheVersion.scope.in_(scopes))
+    ).all()
+    versions = dict.fromkeys(scopes, 0)
+    versions.update({scope: version for scope, version in rows})
+    return versions
+
+
+def bump_version(db: Session, *scopes: str) -> None:
+    """递增作用域版本号（须与数据变更在同一事务内提交）"""
+    for scope in sorted(set(scopes)):
+        stmt = insert(CacheVersion).values(scope=scope, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CacheVersion.scope],
+            set_={"version": CacheVersion.version + 1, "updated_at": func.now()},
+        )
+        db.execute(stmt)
@@ -7,6 +7,7 @@ from app.utils.exceptions import (
     ValidationException,
     AuthenticationException,
     PermissionException,
+    ServiceBusyException,
 )
 
 __all__ = [
@@ -17,5 +18,6 @@ __all__ = [
     "ValidationException",
     "AuthenticationException",
     "PermissionException",
+    "ServiceBusyException",
 ]
 
@@ -0,0 +1,61 @@
+"""请求级批量加载器"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Set, Union
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+class BatchLoader:
+    """
+    请求级批量加载器（dataloader风格）
+
+    先用 prime 登记需要的主键，首次 get 时按实体类型各执行一次 IN 查询，
+    结果保存在身份缓存中，同一请求内不会重复查询。
+    使用异步会话时须在 get 之前 await load_async()。
+    """
+
+    def __init__(self, db: Union[Session, AsyncSession]):
+        self.db = db
+        self._pending: Dict[type, Set[Any]] = defaultdict(set)
+        self._loaded: Dict[type, Dict[Any, Any]] = defaultdict(dict)
+
+    def prime(self, model: type, ids: Iterable[Any]) -> "BatchLoader":
+        """登记待加载的主键（忽略空值与已加载的主键）"""
+        loaded = self._loaded[model]
+        self._pending[model].update(i for i in ids if i is not None and i not in loaded)
+        return self
+
+    def _pending_queries(self):
+        for model, ids in list(self._pending.items()):
+            if ids:
+                yield model, select(model).where(model.id.in_(ids))
+
+    def _store(self, model: type, objs: Iterable[Any]) -> None:
+        ids = self._pending[model]
+        loaded = self._loaded[model]
+        for obj in objs:
+            loaded[obj.id] = obj
+        for missing in ids - loaded.keys():
+            loaded[missing] = None
+        ids.clear()
+
+    def load(self) -> None:
+        """执行所有待加载的查询（每种实体一次 IN 查询）"""
+        for model, stmt in self._pending_queries():
+            self._store(model, self.db.execute(stmt).scalars())
+
+    async def load_async(self) -> None:
+        """异步会话（AsyncSession）使用：加载登记的主键，之后 get 不再查询"""
+        for model, stmt in self._pending_queries():
+            self._store(model, (await self.db.execute(stmt)).scalars())
+
+    def get(self, model: type, id: Any) -> Optional[Any]:
+        """获取实体（不存在时为 None）"""
+        if id is None:
+            return None
+        loaded = self._loaded[model]
+        if id not in loaded:
+            self._pending[model].add(id)
+            self.load()
+        return loaded.get(id)
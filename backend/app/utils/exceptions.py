@@ -38,3 +38,9 @@ class PermissionException(BusinessException):
     def __init__(self, message: str = "权限不足"):
         super().__init__(message, code=403)
 
+
+
+class ServiceBusyException(BusinessException):
+    """服务繁忙异常"""
+    def __init__(self, message: str = "服务繁忙，请稍后重试"):
+        super().__init__(message, code=503)
@@ -1,74 +1,33 @@
 """操作日志装饰器"""
+import asyncio
+from datetime import datetime, timezone
 from functools import wraps
-from typing import Callable, Any
+from typing import Callable
 from sqlalchemy.orm import Session
-from app.models.logs import OperationLog
+from app.core.audit import set_audit_user
+from app.core.log_writer import log_writer
 from app.models.users import User
-import json
+from app.utils.log_values import to_log_value
 
 
-def log_operation(action_type: str, table_name: str):
+def log_operation(func: Callable) -> Callable:
     """
     操作日志装饰器
     
-    Args:
-        action_type: 操作类型 (create/update/delete)
-        table_name: 表名
+    数据变更日志已由会话 flush 事件自动捕获（见 app/core/audit.py，只记录变化的字段），
+    装饰器只负责把 current_user 设为会话的操作人，适用于未通过 get_current_user 获取用户的场景。
+    操作类型与表名由捕获的变更决定，不再需要传入。
     """
-    def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            # 获取参数
-            db: Session = kwargs.get('db')
-            current_user: User = kwargs.get('current_user')
-            
-            # 执行原函数
-            result = await func(*args, **kwargs) if hasattr(func, '__await__') else func(*args, **kwargs)
-            
-            # 记录日志
-            if db and current_user:
-                try:
-                    # 获取记录ID
-                    record_id = None
-                    new_value = None
-                    
-                    if action_type == 'create' and hasattr(result, 'id'):
-                        record_id = result.id
-                        # 将结果转换为字典
-                        if hasattr(result, '__dict__'):
-                            new_value = {k: v for k, v in result.__dict__.items() if not k.startswith('_')}
-                            # 转换不可序列化的对象
-                            new_value = json.loads(json.dumps(new_value, default=str))
-                    
-                    elif action_type == 'update':
-                        # 对于更新操作，可以从kwargs中获取ID
-                        record_id = kwargs.get('shop_id') or kwargs.get('product_id') or kwargs.get('id')
-                        if hasattr(result, '__dict__'):
-                            new_value = {k: v for k, v in result.__dict__.items() if not k.startswith('_')}
-                            new_value = json.loads(json.dumps(new_value, default=str))
-                    
-                    elif action_type == 'delete':
-                        record_id = kwargs.get('shop_id') or kwargs.get('product_id') or kwargs.get('id')
-                    
-                    # 创建日志记录
-                    log = OperationLog(
-                        user_id=current_user.id,
-                        action_type=action_type,
-                        table_name=table_name,
-                        record_id=record_id,
-                        old_value=None,  # 可以在需要时添加旧值记录
-                        new_value=new_value
-                    )
-                    db.add(log)
-                    db.commit()
-                except Exception as e:
-                    # 日志记录失败不影响主业务
-                    print(f"Failed to log operation: {e}")
-                    db.rollback()
-            
-            return result
-        return wrapper
-    return decorator
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        db: Session = kwargs.get('db')
+        current_user: User = kwargs.get('current_user')
+        if db and current_user:
+            set_audit_user(db, current_user.id)
+        
+        # 执行原函数
+        return await func(*args, **kwargs) if asyncio.iscoroutinefunction(func) else func(*args, **kwargs)
+    return wrapper
 
 
 def create_operation_log(
@@ -83,8 +42,11 @@ def create_operation_log(
     """
     手动创建操作日志
     
+    日志交给异步写入器批量写入，不再占用业务会话额外提交一次事务；
+    写入器未启动时（如脚本中调用）同步写入。
+    
     Args:
-        db: 数据库会话
+        db: 数据库会话（保留参数，日志使用独立会话写入）
         user_id: 用户ID
         action_type: 操作类型
         table_name: 表名
@@ -93,17 +55,14 @@ def create_operation_log(
         new_value: 新值
     """
     try:
-        log = OperationLog(
-            user_id=user_id,
-            action_type=action_type,
-            table_name=table_name,
-            record_id=record_id,
-            old_value=old_value,
-            new_value=new_value
-        )
-        db.add(log)
-        db.commit()
+        log_writer.submit({
+            "user_id": user_id,
+            "action_type": action_type,
+            "table_name": table_name,
+            "record_id": record_id,
+            "old_value": to_log_value(old_value),
+            "new_value": to_log_value(new_value),
+            "created_at": datetime.now(timezone.utc),
+        })
     except Exception as e:
         print(f"Failed to create operation log: {e}")
-        db.rollback()
-
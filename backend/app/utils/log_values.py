@@ -0,0 +1,19 @@
+"""操作日志的值转换（审计捕获与手动记录共用）"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+
+def to_log_value(value: Any) -> Any:
+    """转换为可存入JSON列的值（只转换不可序列化的部分，不做整体序列化往返）"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): to_log_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_log_value(v) for v in value]
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
@@ -0,0 +1 @@
+"""性能基准测试（合成数据集 + 进程内接口计时），用法见 benchmarks/run.py"""
@@ -0,0 +1,63 @@
+"""
+对比两次基准结果
+
+    python -m benchmarks.compare 基线.json 本次.json [--metric p50_ms] [--threshold 0.1]
+
+逐个场景列出指标变化；任一场景变慢超过 threshold（比例）时以退出码 1 结束，便于在CI中使用。
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(base: Dict[str, Any], current: Dict[str, Any], metric: str, threshold: float) -> List[Dict[str, Any]]:
+    rows = []
+    for name in sorted(set(base["results"]) | set(current["results"])):
+        before = base["results"].get(name, {}).get(metric)
+        after = current["results"].get(name, {}).get(metric)
+        change: Optional[float] = None
+        if before and after is not None:
+            change = (after - before) / before
+        rows.append({
+            "name": name,
+            "before": before,
+            "after": after,
+            "change": change,
+            "regressed": change is not None and change > threshold,
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="对比两次基准结果")
+    parser.add_argument("base")
+    parser.add_argument("current")
+    parser.add_argument("--metric", default="p50_ms", help="对比的指标（p50_ms/p95_ms/mean_ms 等）")
+    parser.add_argument("--threshold", type=float, default=0.1, help="变慢超过该比例视为退化")
+    args = parser.parse_args(argv)
+
+    base, current = _load(args.base), _load(args.current)
+    if base["meta"].get("spec") != current["meta"].get("spec"):
+        print("注意：两次结果的数据集规模不同，对比仅供参考")
+    print(f"基线 {str(base['meta'].get('commit'))[:8]}  →  本次 {str(current['meta'].get('commit'))[:8]}  ({args.metric})")
+
+    rows = compare(base, current, args.metric, args.threshold)
+    for row in rows:
+        before = "-" if row["before"] is None else f"{row['before']:.2f}"
+        after = "-" if row["after"] is None else f"{row['after']:.2f}"
+        change = "" if row["change"] is None else f"{row['change'] * 100:+.1f}%"
+        flag = "  退化" if row["regressed"] else ""
+        print(f"{row['name']:<36} {before:>10} {after:>10} {change:>9}{flag}")
+
+    if any(row["regressed"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
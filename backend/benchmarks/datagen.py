@@ -0,0 +1,232 @@
+"""
+合成数据集生成
+
+按 REQ.md 的规模生成：30 家店铺（分布在 4 个平台），每家店铺一张商品表（约 3000 个商品）
+和一张销售表（销售流水），30 名运营人员，以及最近半年的操作日志。
+相同的 DatasetSpec（含 seed）与锚定日期生成完全相同的数据；时间均相对锚定日期（默认当天）计算，
+使日志落在当前的月度分区中。
+"""
+import csv
+import io
+import random
+from dataclasses import asdict, dataclass, replace
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Connection
+from app.core.security import get_password_hash
+from app.models import DataTable, OperationLog, Platform, Shop, TableData, User
+from app.services.log_partitions import create_partition, month_start
+
+# 每条多行 INSERT 的行数
+INSERT_CHUNK_SIZE = 5000
+# 运营账号 op01..opNN 的密码（负载测试用这些账号登录）
+OPERATOR_PASSWORD = "bench123"
+
+PLATFORMS = [
+    ("淘宝", "taobao"),
+    ("京东", "jd"),
+    ("拼多多", "pdd"),
+    ("抖音", "douyin"),
+]
+CATEGORIES = ["女装", "男装", "童装", "鞋靴", "箱包", "配饰", "家居", "美妆", "数码", "食品", "母婴", "运动"]
+PRODUCT_STATUSES = ["在售", "在售", "在售", "下架", "缺货"]
+SALES_CHANNELS = ["自然流量", "直通车", "直播", "活动", "老客复购"]
+LOG_TABLES = ["table_data", "data_tables", "shops", "users", "system_settings", "menu_items"]
+LOG_ACTIONS = ["update", "update", "update", "create", "create", "delete"]
+
+PRODUCT_FIELDS = [
+    {"name": "sku", "type": "text", "required": True, "description": "商品编码"},
+    {"name": "title", "type": "text", "required": True, "description": "商品标题"},
+    {"name": "category", "type": "text", "description": "类目"},
+    {"name": "price", "type": "number", "required": True, "description": "售价"},
+    {"name": "cost", "type": "number", "description": "成本"},
+    {"name": "stock", "type": "number", "description": "库存"},
+    {"name": "status", "type": "text", "description": "状态"},
+    {"name": "listed_at", "type": "date", "description": "上架日期"},
+]
+SALES_FIELDS = [
+    {"name": "order_date", "type": "date", "required": True, "description": "日期"},
+    {"name": "sku", "type": "text", "required": True, "description": "商品编码"},
+    {"name": "channel", "type": "text", "description": "渠道"},
+    {"name": "quantity", "type": "number", "required": True, "description": "销量"},
+    {"name": "amount", "type": "number", "required": True, "description": "销售额"},
+]
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """数据集规模（默认值即 REQ.md 中的实际规模）"""
+    shops: int = 30
+    products_per_shop: int = 3000
+    sales_per_shop: int = 3000
+    operators: int = 30
+    logs: int = 100000
+    log_days: int = 180
+    seed: int = 20240101
+
+    def scaled(self, factor: float) -> "DatasetSpec":
+        """按比例缩小/放大行数（店铺数、人数不变），用于快速试跑"""
+        if factor == 1:
+            return self
+        return replace(
+            self,
+            products_per_shop=max(1, int(self.products_per_shop * factor)),
+            sales_per_shop=max(1, int(self.sales_per_shop * factor)),
+            logs=max(1, int(self.logs * factor)),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int = INSERT_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert(conn: Connection, model, rows: Iterable[Dict[str, Any]]) -> int:
+    count = 0
+    for chunk in _chunks(rows):
+        conn.execute(insert(model), chunk)
+        count += len(chunk)
+    return count
+
+
+def product_rows(rng: random.Random, shop_index: int, count: int, anchor: date) -> Iterator[Dict[str, Any]]:
+    """一家店铺的商品数据（也用于导入基准生成CSV）"""
+    for index in range(count):
+        category = rng.choice(CATEGORIES)
+        price = round(rng.lognormvariate(4.3, 0.8), 2)
+        yield {
+            "sku": f"S{shop_index:02d}-{index:05d}",
+            "title": f"{category}商品{shop_index:02d}{index:05d}",
+            "category": category,
+            "price": price,
+            "cost": round(price * rng.uniform(0.35, 0.75), 2),
+            "stock": rng.randint(0, 2000),
+            "status": rng.choice(PRODUCT_STATUSES),
+            "listed_at": (anchor - timedelta(days=rng.randint(0, 720))).isoformat(),
+        }
+
+
+def products_csv(seed: int, rows: int, shop_index: int = 99) -> bytes:
+    """导入场景使用的商品 CSV（UTF-8）"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=[field["name"] for field in PRODUCT_FIELDS])
+    writer.writeheader()
+    writer.writerows(product_rows(random.Random(seed), shop_index, rows, date.today()))
+    return buffer.getvalue().encode("utf-8")
+
+
+def _sales_rows(rng: random.Random, shop_index: int, count: int, products: int, anchor: date) -> Iterator[Dict[str, Any]]:
+    for _ in range(count):
+        quantity = rng.randint(1, 50)
+        yield {
+            "order_date": (anchor - timedelta(days=rng.randint(0, 364))).isoformat(),
+            "sku": f"S{shop_index:02d}-{rng.randrange(products):05d}",
+            "channel": rng.choice(SALES_CHANNELS),
+            "quantity": quantity,
+            "amount": round(quantity * rng.lognormvariate(4.3, 0.8), 2),
+        }
+
+
+def _log_rows(
+    rng: random.Random, count: int, user_ids: List[int], days: int, anchor: datetime
+) -> Iterator[Dict[str, Any]]:
+    for _ in range(count):
+        action = rng.choice(LOG_ACTIONS)
+        record_id = rng.randint(1, 5000)
+        yield {
+            "user_id": rng.choice(user_ids),
+            "action_type": action,
+            "table_name": rng.choice(LOG_TABLES),
+            "record_id": record_id,
+            "old_value": {"id": record_id, "stock": rng.randint(0, 2000)} if action != "create" else None,
+            "new_value": {"id": record_id, "stock": rng.randint(0, 2000)} if action != "delete" else None,
+            "created_at": anchor - timedelta(seconds=rng.randint(0, days * 86400)),
+        }
+
+
+def _ensure_log_partitions(conn: Connection, anchor: date, days: int) -> None:
+    """为数据覆盖的月份建好分区（默认只预建当前及之后的月份）"""
+    month = month_start(anchor - timedelta(days=days))
+    while month <= anchor:
+        create_partition(conn, month)
+        month = month_start(month + timedelta(days=32))
+
+
+def generate(conn: Connection, spec: DatasetSpec, anchor: Optional[date] = None) -> Dict[str, int]:
+    """
+    在空库（已由 init_db 建表并创建管理员）中写入数据集，返回各表行数
+
+    所有随机数来自以 spec.seed 初始化的独立 Random，生成顺序固定。
+    """
+    anchor = anchor or date.today()
+    anchor_time = datetime.combine(anchor, time(12, 0), tzinfo=timezone.utc)
+    rng = random.Random(spec.seed)
+
+    platform_ids = [
+        conn.execute(insert(Platform).values(name=name, code=code, sort_order=index).returning(Platform.id)).scalar_one()
+        for index, (name, code) in enumerate(PLATFORMS)
+    ]
+
+    # 所有运营人员共用一个密码哈希，避免生成数据时做上百次 bcrypt
+    password_hash = get_password_hash(OPERATOR_PASSWORD)
+    _insert(conn, User, (
+        {"username": f"op{index:02d}", "password_hash": password_hash, "name": f"运营{index:02d}", "role": "operator"}
+        for index in range(1, spec.operators + 1)
+    ))
+    user_ids = list(conn.execute(select(User.id).order_by(User.id)).scalars())
+    operator_ids = user_ids[1:] or user_ids
+
+    products = sales = 0
+    for shop_index in range(1, spec.shops + 1):
+        platform_index = (shop_index - 1) % len(PLATFORMS)
+        shop_id = conn.execute(insert(Shop).values(
+            name=f"{PLATFORMS[platform_index][0]}店铺{shop_index:02d}",
+            platform=PLATFORMS[platform_index][0],
+            platform_id=platform_ids[platform_index],
+            account=f"shop{shop_index:02d}",
+            manager_id=operator_ids[(shop_index - 1) % len(operator_ids)],
+            status="active",
+        ).returning(Shop.id)).scalar_one()
+
+        product_table_id, sales_table_id = (
+            conn.execute(insert(DataTable).values(
+                shop_id=shop_id, name=name, table_type=table_type, fields=fields, sort_order=sort_order,
+            ).returning(DataTable.id)).scalar_one()
+            for name, table_type, fields, sort_order in (
+                ("商品", "product", PRODUCT_FIELDS, 0),
+                ("销售", "sales", SALES_FIELDS, 1),
+            )
+        )
+        products += _insert(conn, TableData, (
+            {"data_table_id": product_table_id, "data": row}
+            for row in product_rows(rng, shop_index, spec.products_per_shop, anchor)
+        ))
+        sales += _insert(conn, TableData, (
+            {"data_table_id": sales_table_id, "data": row}
+            for row in _sales_rows(rng, shop_index, spec.sales_per_shop, spec.products_per_shop, anchor)
+        ))
+
+    _ensure_log_partitions(conn, anchor, spec.log_days)
+    logs = _insert(conn, OperationLog, _log_rows(rng, spec.logs, user_ids, spec.log_days, anchor_time))
+    conn.exec_driver_sql("ANALYZE")
+
+    return {
+        "platforms": len(platform_ids),
+        "shops": spec.shops,
+        "users": len(user_ids),
+        "data_tables": spec.shops * 2,
+        "products": products,
+        "sales": sales,
+        "operation_logs": logs,
+        "table_data_total": conn.execute(select(func.count()).select_from(TableData)).scalar_one(),
+    }
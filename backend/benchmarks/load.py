@@ -0,0 +1,425 @@
+"""
+并发负载测试
+
+模拟多名运营人员同时使用系统：每个虚拟用户先登录，然后按权重随机选择会话场景
+（浏览菜单与数据表树、翻页浏览表格、条件查询、聚合、查看日志、修改数据、导入文件），
+场景之间随机停顿（思考时间）。按用户数逐级加压，每级统计各接口的 p50/p95/p99、错误数与吞吐量，
+并给出饱和点（人均吞吐明显下降或错误率升高的第一级）。
+
+数据来自 benchmarks/datagen.py（运营账号 op01..op30；--generate 时按最大用户数生成，至少 30 个）。
+最大用户数超过库中已有的运营账号时，开始加压前即退出，而不是把登录失败当作饱和。两种运行方式：
+
+    cd backend
+    # 进程内（httpx ASGITransport，不经过网络；会写入数据，库名需包含 bench）
+    POSTGRES_DB=ecommerce_ops_bench python -m benchmarks.load --generate --scale 0.1
+    POSTGRES_DB=ecommerce_ops_bench python -m benchmarks.load --users 5,10,20,30 --duration 30
+    # 对已启动的服务（uvicorn/nginx），默认只读；--allow-writes 时包含修改与导入场景
+    python -m benchmarks.load --base-url http://localhost:8000 --users 10,20,30
+    # 超过 30 个用户：先在服务使用的库上进程内生成足够的运营账号
+    POSTGRES_DB=ecommerce_ops_bench python -m benchmarks.load --generate --users 60 --duration 1
+    python -m benchmarks.load --base-url http://localhost:8000 --users 10,30,60
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import httpx
+from benchmarks.datagen import CATEGORIES, OPERATOR_PASSWORD, PRODUCT_FIELDS, DatasetSpec, products_csv
+from benchmarks.run import RESULTS_DIR, git_revision, summarize
+
+# 人均吞吐低于第一级的该比例时视为饱和（请求开始排队，耗时超过了思考时间）
+SATURATION_EFFICIENCY = 0.8
+# 错误率超过该值时视为饱和
+SATURATION_ERROR_RATE = 0.01
+# 导入场景每次上传的行数
+IMPORT_ROWS = 300
+PAGE_SIZE = 50
+
+
+@dataclass
+class Workspace:
+    """各场景使用的数据：商品表、销售表，以及每个虚拟用户专用的导入表"""
+    product_tables: List[Dict[str, Any]]
+    sales_tables: List[Dict[str, Any]]
+    import_tables: Dict[str, int] = field(default_factory=dict)
+    import_file: bytes = b""
+
+
+class Recorder:
+    """按接口（方法 + 路由模板）收集耗时与错误"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        # 登录之后的请求数与会话时长（用于计算人均吞吐，不受登录排队影响）
+        self.session_requests = 0
+        self.session_seconds = 0.0
+
+    def record(self, label: str, elapsed: float, ok: bool) -> None:
+        if ok:
+            self.samples.setdefault(label, []).append(elapsed)
+        else:
+            self.errors[label] = self.errors.get(label, 0) + 1
+
+    @property
+    def total(self) -> int:
+        return sum(len(samples) for samples in self.samples.values()) + sum(self.errors.values())
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        endpoints = {}
+        for label in sorted(set(self.samples) | set(self.errors)):
+            samples = self.samples.get(label, [])
+            endpoints[label] = {**(summarize(samples) if samples else {"n": 0}), "errors": self.errors.get(label, 0)}
+        return endpoints
+
+
+class VirtualUser:
+    """一名运营人员的会话"""
+
+    def __init__(
+        self, client: httpx.AsyncClient, username: str, workspace: Workspace,
+        recorder: Recorder, rng: random.Random, think: tuple, allow_writes: bool
+    ):
+        self.client = client
+        self.username = username
+        self.workspace = workspace
+        self.recorder = recorder
+        self.rng = rng
+        self.think = think
+        self.headers: Dict[str, str] = {}
+        self.requests = 0
+        self.scenarios: List[tuple] = [
+            (3, self.browse_tree),
+            (5, self.page_grid),
+            (3, self.filter_query),
+            (1, self.aggregate),
+            (1, self.view_logs),
+        ]
+        if allow_writes:
+            self.scenarios += [(2, self.edit_row), (0.2, self.import_file)]
+
+    async def request(self, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.recorder.record(label, time.perf_counter() - started, ok)
+        self.requests += 1
+        return response if ok else None
+
+    async def login(self) -> bool:
+        response = await self.request(
+            "POST /api/auth/login", "POST", "/api/auth/login",
+            json={"username": self.username, "password": OPERATOR_PASSWORD},
+        )
+        if response is None:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    def _product_table(self) -> Dict[str, Any]:
+        return self.rng.choice(self.workspace.product_tables)
+
+    async def browse_tree(self) -> None:
+        await self.request("GET /api/menus/tree", "GET", "/api/menus/tree")
+        await self.request("GET /api/data-tables/tree", "GET", "/api/data-tables/tree")
+
+    async def page_grid(self) -> Optional[tuple]:
+        """打开一张表并向后翻几页，返回 (数据表ID, 最后一页的数据)"""
+        table = self._product_table()
+        url = f"/api/data-table-data/{table['id']}/data"
+        response = await self.request(
+            "GET /api/data-table-data/{data_table_id}/data", "GET", url, params={"skip": 0, "limit": PAGE_SIZE}
+        )
+        if response is None:
+            return None
+        total = response.json()["total"]
+        items = response.json()["items"]
+        skip = self.rng.randrange(0, max(1, total - PAGE_SIZE))
+        for _ in range(self.rng.randint(1, 3)):
+            response = await self.request(
+                "GET /api/data-table-data/{data_table_id}/data", "GET", url, params={"skip": skip, "limit": PAGE_SIZE}
+            )
+            if response is None:
+                return None
+            items = response.json()["items"]
+            skip += PAGE_SIZE
+        return table["id"], items
+
+    async def filter_query(self) -> None:
+        table = self._product_table()
+        await self.request("POST /api/data-table-data/query", "POST", "/api/data-table-data/query", json={
+            "table_type": "product", "shop_id": table["shop_id"],
+            "filters": {"category": self.rng.choice(CATEGORIES), "stock": {"gt": self.rng.randint(0, 1000)}},
+            "sort_by": self.rng.choice(["price", "stock", "listed_at"]),
+            "sort_order": self.rng.choice(["asc", "desc"]),
+            "skip": self.rng.choice([0, 0, 20, 40]), "limit": 20,
+        })
+
+    async def aggregate(self) -> None:
+        table = self.rng.choice(self.workspace.sales_tables)
+        await self.request("POST /api/data-table-data/aggregate", "POST", "/api/data-table-data/aggregate", json={
+            "data_table_id": table["id"], "group_by": [self.rng.choice(["channel", "sku"])],
+            "metrics": [{"func": "sum", "field": "quantity"}, {"func": "sum", "field": "amount"}],
+        })
+
+    async def view_logs(self) -> None:
+        await self.request("GET /api/logs", "GET", "/api/logs", params={"page": self.rng.randint(1, 5), "page_size": 50})
+        await self.request("GET /api/logs/stats/summary", "GET", "/api/logs/stats/summary")
+
+    async def edit_row(self) -> None:
+        """翻到某一页后修改其中一行的库存"""
+        page = await self.page_grid()
+        if not page or not page[1]:
+            return
+        table_id, items = page
+        row = self.rng.choice(items)
+        await self.request(
+            "POST /api/data-table-data/{data_table_id}/data/batch", "POST",
+            f"/api/data-table-data/{table_id}/data/batch",
+            json={"update": [{"id": row["id"], "data": {"stock": self.rng.randint(0, 2000)}}]},
+        )
+
+    async def import_file(self) -> None:
+        table_id = self.workspace.import_tables.get(self.username)
+        if table_id is None:
+            return
+        await self.request(
+            "POST /api/data-tables/import-data", "POST", "/api/data-tables/import-data",
+            data={"data_table_id": str(table_id), "import_mode": "overwrite"},
+            files={"file": ("products.csv", self.workspace.import_file, "text/csv")},
+        )
+
+    async def run(self, deadline: float) -> None:
+        if not await self.login():
+            return
+        weights = [weight for weight, _ in self.scenarios]
+        actions = [action for _, action in self.scenarios]
+        started, requests = time.monotonic(), self.requests
+        while time.monotonic() < deadline:
+            await self.rng.choices(actions, weights)[0]()
+            await asyncio.sleep(self.rng.uniform(*self.think))
+        self.recorder.session_seconds += time.monotonic() - started
+        self.recorder.session_requests += self.requests - requests
+
+
+async def _admin_headers(client: httpx.AsyncClient, username: str, password: str) -> Dict[str, str]:
+    response = await client.post("/api/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def check_operators(client: httpx.AsyncClient, usernames: List[str]) -> None:
+    """确认编号最大的运营账号能登录（账号按 op01.. 连续生成），否则退出"""
+    response = await client.post("/api/auth/login", json={"username": usernames[-1], "password": OPERATOR_PASSWORD})
+    if response.status_code != 200:
+        sys.exit(
+            f"运营账号 {usernames[-1]} 无法登录（HTTP {response.status_code}），库中的运营账号不足 {len(usernames)} 个；"
+            f"请减少 --users，或用 --generate --users {len(usernames)} 生成足够的账号"
+        )
+
+
+async def prepare_workspace(
+    client: httpx.AsyncClient, admin: Dict[str, str], usernames: List[str], allow_writes: bool
+) -> Workspace:
+    response = await client.get("/api/data-tables", headers=admin, params={"limit": 100})
+    response.raise_for_status()
+    tables = response.json()
+    workspace = Workspace(
+        product_tables=[t for t in tables if t["table_type"] == "product"],
+        sales_tables=[t for t in tables if t["table_type"] == "sales"],
+    )
+    if not workspace.product_tables or not workspace.sales_tables:
+        sys.exit("库中没有商品表/销售表，请先用 --generate 或 benchmarks.run 生成数据集")
+    if allow_writes:
+        workspace.import_file = products_csv(DatasetSpec.seed, IMPORT_ROWS)
+        shop_id = workspace.product_tables[0]["shop_id"]
+        for username in usernames:
+            response = await client.post("/api/data-tables", headers=admin, json={
+                "shop_id": shop_id, "name": f"负载导入-{username}", "table_type": "load-import", "fields": PRODUCT_FIELDS,
+            })
+            response.raise_for_status()
+            workspace.import_tables[username] = response.json()["id"]
+    return workspace
+
+
+async def cleanup_workspace(client: httpx.AsyncClient, admin: Dict[str, str], workspace: Workspace) -> None:
+    for table_id in workspace.import_tables.values():
+        await client.delete(f"/api/data-tables/{table_id}", headers=admin)
+
+
+async def run_stage(
+    client: httpx.AsyncClient, workspace: Workspace, usernames: List[str],
+    duration: float, ramp: float, think: tuple, seed: int, allow_writes: bool
+) -> Dict[str, Any]:
+    """一级负载：len(usernames) 个用户在 ramp 秒内陆续开始，持续 duration 秒"""
+    recorder = Recorder()
+    started = time.monotonic()
+    deadline = started + duration
+
+    async def start(index: int, username: str) -> None:
+        if ramp > 0:
+            await asyncio.sleep(ramp * index / len(usernames))
+        user = VirtualUser(client, username, workspace, recorder, random.Random(seed + index), think, allow_writes)
+        await user.run(deadline)
+
+    await asyncio.gather(*(start(index, username) for index, username in enumerate(usernames)))
+    elapsed = time.monotonic() - started
+    errors = sum(recorder.errors.values())
+    all_samples = sorted(sample for samples in recorder.samples.values() for sample in samples)
+    return {
+        "users": len(usernames),
+        "seconds": round(elapsed, 2),
+        "requests": recorder.total,
+        "errors": errors,
+        "error_rate": round(errors / recorder.total, 4) if recorder.total else 0,
+        "throughput_rps": round(recorder.total / elapsed, 2),
+        "per_user_rps": round(recorder.session_requests / recorder.session_seconds, 3) if recorder.session_seconds else 0,
+        "overall": summarize(all_samples) if all_samples else {"n": 0},
+        "endpoints": recorder.report(),
+    }
+
+
+def find_saturation(stages: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """第一级出现错误率过高或人均吞吐低于第一级 SATURATION_EFFICIENCY 的负载"""
+    if not stages:
+        return None
+    base_per_user = stages[0]["per_user_rps"]
+    for stage in stages:
+        stage["efficiency"] = round(stage["per_user_rps"] / base_per_user, 3) if base_per_user else None
+    for stage in stages:
+        if stage["error_rate"] > SATURATION_ERROR_RATE:
+            return {"users": stage["users"], "reason": f"错误率 {stage['error_rate']:.1%}"}
+        if stage["efficiency"] is not None and stage["efficiency"] < SATURATION_EFFICIENCY:
+            return {"users": stage["users"], "reason": f"人均吞吐降至第一级的 {stage['efficiency']:.0%}"}
+    return None
+
+
+def print_stage(stage: Dict[str, Any]) -> None:
+    overall = stage["overall"]
+    print(
+        f"\n== {stage['users']} 用户：{stage['requests']} 请求，{stage['throughput_rps']} req/s"
+        f"（人均 {stage['per_user_rps']}），"
+        f"错误 {stage['errors']}，p50 {overall.get('p50_ms', 0):.1f}ms p95 {overall.get('p95_ms', 0):.1f}ms"
+    )
+    for label, item in stage["endpoints"].items():
+        if item["n"]:
+            print(
+                f"  {label:<56} n={item['n']:<6} p50 {item['p50_ms']:>8.1f}  p95 {item['p95_ms']:>8.1f}"
+                f"  p99 {item['p99_ms']:>8.1f}  err {item['errors']}"
+            )
+        else:
+            print(f"  {label:<56} 全部失败 err {item['errors']}")
+
+
+@asynccontextmanager
+async def open_client(base_url: Optional[str], max_users: int) -> AsyncIterator[httpx.AsyncClient]:
+    timeout = httpx.Timeout(120.0)
+    if base_url:
+        limits = httpx.Limits(max_connections=max_users * 2, max_keepalive_connections=max_users * 2)
+        async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+            yield client
+        return
+
+    from app.main import app
+
+    # ASGITransport 不触发 lifespan，需手动启动后台任务（密码哈希进程池、日志写入等）
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+            yield client
+
+
+async def run_load(args, user_counts: List[int], allow_writes: bool, progress: Callable = print_stage) -> Dict[str, Any]:
+    usernames = [f"op{index:02d}" for index in range(1, max(user_counts) + 1)]
+    stages = []
+    async with open_client(args.base_url, max(user_counts)) as client:
+        admin = await _admin_headers(client, args.admin_user, args.admin_password)
+        await check_operators(client, usernames)
+        workspace = await prepare_workspace(client, admin, usernames, allow_writes)
+        try:
+            for users in user_counts:
+                stage = await run_stage(
+                    client, workspace, usernames[:users], args.duration, args.ramp,
+                    tuple(args.think), args.seed, allow_writes,
+                )
+                stages.append(stage)
+                progress(stage)
+        finally:
+            await cleanup_workspace(client, admin, workspace)
+    return {"stages": stages, "saturation": find_saturation(stages)}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="并发负载测试")
+    parser.add_argument("--users", default="5,10,20,30", help="逐级的并发用户数，逗号分隔")
+    parser.add_argument("--duration", type=float, default=30, help="每级持续时间（秒）")
+    parser.add_argument("--ramp", type=float, default=2, help="每级内用户陆续开始的时间（秒）")
+    parser.add_argument("--think", type=float, nargs=2, default=[0.2, 1.0], metavar=("MIN", "MAX"), help="思考时间范围（秒）")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--base-url", help="对已启动的服务发请求；不指定时进程内运行")
+    parser.add_argument("--allow-writes", action="store_true", help="指定 --base-url 时也执行修改与导入场景")
+    parser.add_argument("--admin-user", default="admin")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--generate", action="store_true", help="（进程内）先重建数据集")
+    parser.add_argument("--scale", type=float, default=1.0, help="与 --generate 一起使用的数据量比例")
+    parser.add_argument("--output", help="结果文件路径，默认 benchmarks/results/load_<时间>_<提交>.json")
+    parser.add_argument("--force", action="store_true", help="（进程内）允许在名称不含 bench 的数据库上运行")
+    args = parser.parse_args(argv)
+
+    user_counts = sorted({int(value) for value in args.users.split(",") if value.strip()})
+    allow_writes = args.allow_writes or not args.base_url
+
+    if not args.base_url:
+        from app.core.config import settings
+        from app.core.database import engine
+        from benchmarks.datagen import generate
+        from benchmarks.run import reset_database
+
+        if "bench" not in settings.POSTGRES_DB and not args.force:
+            sys.exit(f"数据库 {settings.POSTGRES_DB} 名称不含 bench，负载测试会写入数据，请使用专用库或加 --force")
+        if args.generate:
+            reset_database()
+            with engine.begin() as conn:
+                print("数据集：", generate(conn, DatasetSpec(operators=max(30, max(user_counts))).scaled(args.scale)))
+
+    result = asyncio.run(run_load(args, user_counts, allow_writes))
+    saturation = result["saturation"]
+    print("\n饱和点：" + (f"{saturation['users']} 用户（{saturation['reason']}）" if saturation else "未出现"))
+
+    now = datetime.now(timezone.utc)
+    revision = git_revision()
+    report = {
+        "meta": {
+            **revision,
+            "timestamp": now.isoformat(timespec="seconds"),
+            "mode": "http" if args.base_url else "in-process",
+            "base_url": args.base_url,
+            "users": user_counts,
+            "duration": args.duration,
+            "ramp": args.ramp,
+            "think": args.think,
+            "allow_writes": allow_writes,
+        },
+        **result,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load_{now:%Y%m%d-%H%M%S}_{(revision['commit'] or 'unknown')[:8]}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}")
+
+
+if __name__ == "__main__":
+    main()
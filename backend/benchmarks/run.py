@@ -0,0 +1,244 @@
+"""
+性能基准测试
+
+在专用数据库中生成合成数据集，进程内（TestClient，包含中间件与依赖注入的完整请求路径）
+依次计时各接口，结果写入 JSON 文件，可用 benchmarks/compare.py 对比两次结果。
+
+生成数据会清空整个数据库，因此要求数据库名包含 "bench"（或显式传 --force）：
+
+    cd backend
+    POSTGRES_DB=ecommerce_ops_bench python -m benchmarks.run                 # 完整规模
+    POSTGRES_DB=ecommerce_ops_bench python -m benchmarks.run --scale 0.1     # 快速试跑
+    POSTGRES_DB=ecommerce_ops_bench python -m benchmarks.run --skip-generate # 复用已有数据
+    python -m benchmarks.compare results/基线.json results/本次.json
+
+默认关闭结果缓存，测量的是实际查询路径；--with-cache 时测量缓存命中后的耗时。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import engine
+from benchmarks.datagen import PRODUCT_FIELDS, DatasetSpec, generate, products_csv
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """耗时样本（秒）汇总为毫秒统计"""
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def git_revision() -> Dict[str, Any]:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=root, capture_output=True, text=True
+        ).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def reset_database() -> None:
+    """清空 public schema 并由 init_db 重新建表、创建管理员"""
+    import init_db
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public;"))
+    init_db.init_db()
+
+
+class BenchmarkRunner:
+    """对同一个 TestClient 依次执行各场景并记录耗时"""
+
+    def __init__(self, client, headers: Dict[str, str], spec: DatasetSpec, repeat: int, warmup: int):
+        self.client = client
+        self.headers = headers
+        self.spec = spec
+        self.repeat = repeat
+        self.warmup = warmup
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def _request(self, method: str, url: str, **kwargs):
+        response = self.client.request(method, url, headers=self.headers, **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {url} 返回 {response.status_code}: {response.text[:500]}")
+        return response
+
+    def measure(self, name: str, call: Callable[[], Any], repeat: Optional[int] = None, **extra) -> None:
+        for _ in range(self.warmup):
+            call()
+        samples = []
+        for _ in range(repeat or self.repeat):
+            started = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - started)
+        self.results[name] = {**summarize(samples), **extra}
+        print(f"{name:<36} p50 {self.results[name]['p50_ms']:>9.2f}ms  p95 {self.results[name]['p95_ms']:>9.2f}ms")
+
+    def get(self, name: str, url: str, **extra) -> None:
+        self.measure(name, lambda: self._request("GET", url), **extra)
+
+    def post(self, name: str, url: str, body: Dict[str, Any], **extra) -> None:
+        self.measure(name, lambda: self._request("POST", url, json=body), **extra)
+
+    def run_all(self) -> Dict[str, Dict[str, Any]]:
+        tables = self._request("GET", "/api/data-tables").json()
+        product_table = next(t for t in tables if t["table_type"] == "product")
+        sales_table = next(t for t in tables if t["table_type"] == "sales")
+
+        self.get("tree", "/api/data-tables/tree")
+        self.get("data_tables_list", "/api/data-tables")
+
+        # 单表分页：首页、中间、末页
+        per_shop = self.spec.products_per_shop
+        page = 50
+        for label, skip in (("first", 0), ("middle", per_shop // 2), ("last", max(0, per_shop - page))):
+            self.get(
+                f"table_page_{label}", f"/api/data-table-data/{product_table['id']}/data?skip={skip}&limit={page}",
+                skip=skip,
+            )
+
+        # 按条件查询 + 排序的分页
+        for label, skip in (("first", 0), ("deep", max(0, per_shop // 12 - 20))):
+            self.post(f"query_filtered_{label}", "/api/data-table-data/query", {
+                "table_type": "product", "shop_id": product_table["shop_id"],
+                "filters": {"category": "女装", "stock": {"gt": 100}},
+                "sort_by": "price", "sort_order": "desc", "skip": skip, "limit": 20,
+            }, skip=skip)
+
+        self.post("aggregate_products_by_category", "/api/data-table-data/aggregate", {
+            "data_table_id": product_table["id"], "group_by": ["category"],
+            "metrics": [{"func": "count"}, {"func": "sum", "field": "stock"}, {"func": "avg", "field": "price"}],
+        })
+        self.post("aggregate_sales_by_channel", "/api/data-table-data/aggregate", {
+            "data_table_id": sales_table["id"], "group_by": ["channel"],
+            "metrics": [{"func": "sum", "field": "quantity"}, {"func": "sum", "field": "amount"}],
+        })
+
+        # 操作日志：列表分页、统计
+        pages = max(1, self.spec.logs // 50)
+        for label, page_number in (("first", 1), ("middle", max(1, pages // 2)), ("last", pages)):
+            self.get(f"logs_page_{label}", f"/api/logs?page={page_number}&page_size=50", page=page_number)
+        self.get("log_count", "/api/logs/count")
+        self.get("log_stats_summary", "/api/logs/stats/summary")
+        self.get("log_daily_activity", "/api/logs/activity")
+
+        self._measure_import(product_table["shop_id"])
+        return self.results
+
+    def _measure_import(self, shop_id: int) -> None:
+        """导入一张店铺规模的商品 CSV（覆盖模式），记录耗时与行/秒"""
+        table = self._request("POST", "/api/data-tables", json={
+            "shop_id": shop_id, "name": "导入基准", "table_type": "import-bench", "fields": PRODUCT_FIELDS,
+        }).json()
+        content = products_csv(self.spec.seed, self.spec.products_per_shop)
+
+        def call():
+            response = self._request("POST", "/api/data-tables/import-data", data={
+                "data_table_id": str(table["id"]), "import_mode": "overwrite",
+            }, files={"file": ("products.csv", content, "text/csv")})
+            assert response.json()["imported_rows"] == self.spec.products_per_shop
+
+        repeat = max(3, self.repeat // 5)
+        self.measure("import_products_csv", call, repeat=repeat, rows=self.spec.products_per_shop)
+        result = self.results["import_products_csv"]
+        result["rows_per_second"] = round(self.spec.products_per_shop / (result["p50_ms"] / 1000), 1)
+        self._request("DELETE", f"/api/data-tables/{table['id']}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="性能基准测试")
+    parser.add_argument("--scale", type=float, default=1.0, help="数据量比例（1 为 REQ.md 中的实际规模）")
+    parser.add_argument("--seed", type=int, default=DatasetSpec.seed)
+    parser.add_argument("--repeat", type=int, default=20, help="每个场景计时次数")
+    parser.add_argument("--warmup", type=int, default=2, help="每个场景预热次数（不计时）")
+    parser.add_argument("--skip-generate", action="store_true", help="复用库中已有的数据集")
+    parser.add_argument("--with-cache", action="store_true", help="保持结果缓存开启")
+    parser.add_argument("--output", help="结果文件路径，默认 benchmarks/results/<时间>_<提交>.json")
+    parser.add_argument("--force", action="store_true", help="允许在名称不含 bench 的数据库上运行")
+    args = parser.parse_args(argv)
+
+    if "bench" not in settings.POSTGRES_DB and not args.force:
+        sys.exit(f"数据库 {settings.POSTGRES_DB} 名称不含 bench，基准测试会清空数据库，请使用专用库或加 --force")
+
+    spec = DatasetSpec(seed=args.seed).scaled(args.scale)
+    settings.CACHE_ENABLED = args.with_cache
+
+    dataset: Optional[Dict[str, int]] = None
+    if not args.skip_generate:
+        reset_database()
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            dataset = generate(conn, spec)
+        print(f"数据集生成完成（{time.perf_counter() - started:.1f}s）：{dataset}")
+
+    # 数据集生成之后再导入应用（启动时会读取系统设置、菜单等）
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        token = client.post(
+            "/api/auth/login", json={"username": "admin", "password": "admin123"}
+        ).json()["access_token"]
+        runner = BenchmarkRunner(client, {"Authorization": f"Bearer {token}"}, spec, args.repeat, args.warmup)
+        results = runner.run_all()
+
+    with engine.connect() as conn:
+        server_version = conn.exec_driver_sql("SHOW server_version").scalar()
+
+    now = datetime.now(timezone.utc)
+    revision = git_revision()
+    report = {
+        "meta": {
+            **revision,
+            "timestamp": now.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "postgres": server_version,
+            "spec": spec.to_dict(),
+            "scale": args.scale,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "cache_enabled": args.with_cache,
+        },
+        "dataset": dataset,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{now:%Y%m%d-%H%M%S}_{(revision['commit'] or 'unknown')[:8]}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}")
+
+
+if __name__ == "__main__":
+    main()
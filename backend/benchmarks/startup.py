@@ -0,0 +1,155 @@
+"""
+启动耗时报告
+
+在独立的子进程中以 `python -X importtime` 导入应用（与 uvicorn worker 冷启动时的导入相同），
+多次运行取中位数，列出总耗时、累计/自身耗时最多的模块、按顶层包汇总的耗时，
+并检查只在导入/解析文件时才需要的重型依赖没有在启动时被加载：
+
+    cd backend
+    python -m benchmarks.startup                   # 默认运行 5 次
+    python -m benchmarks.startup --runs 10 --top 30
+    python -m benchmarks.startup --budget-ms 1500  # 中位数超过预算时退出码为 1
+
+启动时加载了延迟依赖，或超过 --budget-ms 时以退出码 1 结束，便于在CI中使用。
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from benchmarks.run import RESULTS_DIR, git_revision
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 只在文件导入/解析路径中使用、不应在启动时加载的依赖
+LAZY_MODULES = ("pandas", "numpy", "openpyxl", "xlrd", "PIL", "passlib")
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """解析 -X importtime 的输出（耗时单位为微秒），按出现顺序返回各模块"""
+    modules = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            modules.append({
+                "module": match.group(4),
+                "self_us": int(match.group(1)),
+                "cumulative_us": int(match.group(2)),
+                # 缩进每层两个空格，顶层（直接由 -c 导入的模块）缩进为 1
+                "depth": (len(match.group(3)) - 1) // 2,
+            })
+    return modules
+
+
+def measure_once(target: str) -> List[Dict[str, Any]]:
+    """在新进程中导入 target 一次"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"导入 {target} 失败：\n{completed.stderr[-2000:]}")
+    return parse_importtime(completed.stderr)
+
+
+def _median_by_module(runs: List[List[Dict[str, Any]]], key: str) -> Dict[str, float]:
+    values: Dict[str, List[int]] = defaultdict(list)
+    for modules in runs:
+        for module in modules:
+            values[module["module"]].append(module[key])
+    return {name: statistics.median(samples) for name, samples in values.items()}
+
+
+def build_report(target: str, runs: List[List[Dict[str, Any]]], top: int) -> Dict[str, Any]:
+    totals = [
+        next((m["cumulative_us"] for m in modules if m["module"] == target), sum(m["self_us"] for m in modules))
+        for modules in runs
+    ]
+    self_us = _median_by_module(runs, "self_us")
+    cumulative_us = _median_by_module(runs, "cumulative_us")
+
+    packages: Dict[str, float] = defaultdict(float)
+    for name, value in self_us.items():
+        packages[name.split(".")[0]] += value
+
+    def ranked(values: Dict[str, float]) -> List[Dict[str, Any]]:
+        ordered = sorted(values.items(), key=lambda item: item[1], reverse=True)[:top]
+        return [{"module": name, "ms": round(value / 1000, 2)} for name, value in ordered]
+
+    loaded = set(self_us)
+    return {
+        "target": target,
+        "runs": len(runs),
+        "total_ms": {
+            "median": round(statistics.median(totals) / 1000, 1),
+            "min": round(min(totals) / 1000, 1),
+            "max": round(max(totals) / 1000, 1),
+        },
+        "modules_loaded": len(loaded),
+        "top_cumulative": ranked(cumulative_us),
+        "top_self": ranked(self_us),
+        "packages": ranked(packages),
+        "lazy_loaded": [name for name in LAZY_MODULES if name in loaded],
+    }
+
+
+def _print_table(title: str, rows: List[Dict[str, Any]]) -> None:
+    print(f"\n{title}")
+    for row in rows:
+        print(f"  {row['module']:<56} {row['ms']:>9.1f}ms")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="启动耗时报告")
+    parser.add_argument("--target", default="app.main", help="要导入的模块")
+    parser.add_argument("--runs", type=int, default=5, help="运行次数（取中位数）")
+    parser.add_argument("--top", type=int, default=20, help="列出耗时最多的模块数")
+    parser.add_argument("--budget-ms", type=float, help="总导入耗时中位数的上限（毫秒）")
+    parser.add_argument("--output", help="结果文件路径，默认 benchmarks/results/startup_<时间>_<提交>.json")
+    args = parser.parse_args(argv)
+
+    # 首次运行会编译 .pyc，不计入
+    measure_once(args.target)
+    runs = [measure_once(args.target) for _ in range(args.runs)]
+    report = build_report(args.target, runs, args.top)
+
+    total = report["total_ms"]
+    print(f"导入 {args.target}：中位数 {total['median']}ms（{total['min']}–{total['max']}ms，{args.runs} 次），"
+          f"共加载 {report['modules_loaded']} 个模块")
+    _print_table("按顶层包汇总（自身耗时）", report["packages"])
+    _print_table("累计耗时最多的模块", report["top_cumulative"])
+    _print_table("自身耗时最多的模块", report["top_self"])
+
+    failures = []
+    if report["lazy_loaded"]:
+        failures.append(f"启动时加载了应延迟导入的依赖：{', '.join(report['lazy_loaded'])}")
+    if args.budget_ms is not None and total["median"] > args.budget_ms:
+        failures.append(f"导入耗时 {total['median']}ms 超过预算 {args.budget_ms}ms")
+
+    now = datetime.now(timezone.utc)
+    revision = git_revision()
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"startup_{now:%Y%m%d-%H%M%S}_{(revision['commit'] or 'unknown')[:8]}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {**revision, "timestamp": now.isoformat(timespec="seconds"), "python": sys.version.split()[0]},
+            **report,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {output}")
+
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 """初始化数据库脚本"""
 import asyncio
+from app.core.config import settings
 from app.core.database import Base, engine
 from app.core.security import get_password_hash
 from app.models import User
+from app.services.log_partitions import ensure_partitions
 from sqlalchemy.orm import Session
 
 
@@ -10,6 +12,8 @@ def init_db():
     """初始化数据库表和默认数据"""
     print("开始创建数据库表...")
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        ensure_partitions(conn, settings.LOG_PARTITION_MONTHS_AHEAD)
     print("数据库表创建完成！")
     
     # 创建默认管理员账户
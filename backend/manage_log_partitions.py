@@ -0,0 +1,80 @@
+"""
+操作日志分区管理脚本
+
+用法:
+    python manage_log_partitions.py list                      # 查看分区
+    python manage_log_partitions.py ensure [--months-ahead 3] # 预建分区
+    python manage_log_partitions.py archive [--retention-months 12] [--partition NAME]
+    python manage_log_partitions.py restore FILE              # 归档文件恢复为分区
+    python manage_log_partitions.py query FILE [--user-id 1] [--table-name shops] [--record-id 5]
+"""
+import argparse
+import json
+from app.core.config import settings
+from app.core.database import engine
+from app.services import log_partitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="操作日志分区管理")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("list", help="查看分区")
+
+    ensure_parser = subparsers.add_parser("ensure", help="预建分区")
+    ensure_parser.add_argument("--months-ahead", type=int, default=settings.LOG_PARTITION_MONTHS_AHEAD)
+
+    archive_parser = subparsers.add_parser("archive", help="归档过期分区或指定分区")
+    archive_parser.add_argument("--retention-months", type=int, default=settings.LOG_RETENTION_MONTHS)
+    archive_parser.add_argument("--partition", help="只归档指定分区")
+    archive_parser.add_argument("--archive-dir", default=settings.LOG_ARCHIVE_DIR)
+
+    restore_parser = subparsers.add_parser("restore", help="将归档文件恢复为分区")
+    restore_parser.add_argument("file")
+
+    query_parser = subparsers.add_parser("query", help="直接查询归档文件")
+    query_parser.add_argument("file")
+    query_parser.add_argument("--user-id", type=int)
+    query_parser.add_argument("--action-type")
+    query_parser.add_argument("--table-name")
+    query_parser.add_argument("--record-id", type=int)
+
+    args = parser.parse_args()
+
+    if args.command == "query":
+        rows = log_partitions.read_archive(
+            args.file, user_id=args.user_id, action_type=args.action_type,
+            table_name=args.table_name, record_id=args.record_id,
+        )
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+        return
+
+    if args.command == "archive":
+        # 归档按分区分步提交事务（见 archive_partition），各步等待与应用内定时维护的互斥锁
+        if args.partition:
+            paths = [log_partitions.archive_partition(engine, args.partition, args.archive_dir, wait=True)]
+        elif args.retention_months > 0:
+            paths = log_partitions.archive_expired(engine, args.retention_months, args.archive_dir, wait=True)
+        else:
+            parser.error("请指定 --partition 或大于0的 --retention-months")
+        for path in paths:
+            print(f"已归档: {path}")
+        return
+
+    with engine.begin() as conn:
+        if args.command in ("ensure", "restore"):
+            # 与应用内的定时维护互斥
+            log_partitions.lock_maintenance(conn, wait=True)
+        if args.command == "list":
+            for name in log_partitions.list_partitions(conn):
+                print(name)
+        elif args.command == "ensure":
+            created = log_partitions.ensure_partitions(conn, args.months_ahead)
+            print(f"新建分区: {', '.join(created) or '无'}")
+        elif args.command == "restore":
+            print(f"已恢复分区: {log_partitions.restore_archive(conn, args.file)}")
+
+
+if __name__ == "__main__":
+    main()
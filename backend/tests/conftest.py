@@ -0,0 +1,95 @@
+"""
+测试公共夹具
+
+需要数据库的测试使用单独的测试库（库名须包含 test，默认 ecommerce_ops_test），
+会话开始时清空并由 init_db 重建；数据库不可用时这些测试跳过。默认只使用进程内缓存。
+"""
+import os
+
+os.environ.setdefault("POSTGRES_DB", "ecommerce_ops_test")
+os.environ.setdefault("CACHE_REDIS_ENABLED", "false")
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.core.cache import MemoryCache, ResultCache, set_cache
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def database():
+    """重建测试库（整个测试会话一次）"""
+    if "test" not in settings.POSTGRES_DB:
+        pytest.skip(f"数据库 {settings.POSTGRES_DB} 名称不含 test，不在其上运行会清空数据的测试")
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public;"))
+    except OperationalError as e:
+        pytest.skip(f"测试数据库不可用: {e.orig}")
+    import init_db
+
+    init_db.init_db()
+    yield engine
+
+
+@pytest.fixture
+def db_session(database):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture(autouse=True)
+def memory_cache():
+    """每个测试使用独立的进程内结果缓存"""
+    cache = ResultCache(MemoryCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_MAX_BYTES))
+    set_cache(cache)
+    yield cache
+    set_cache(None)
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    response = client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def product_table(client, admin_headers):
+    """新建 平台 -> 店铺 -> 商品表，返回数据表"""
+    suffix = os.urandom(4).hex()
+    platform = client.post(
+        "/api/platforms", json={"name": f"平台{suffix}", "code": f"p{suffix}"}, headers=admin_headers
+    ).json()
+    shop = client.post(
+        "/api/shops", json={"name": f"店铺{suffix}", "platform_id": platform["id"]}, headers=admin_headers
+    ).json()
+    response = client.post("/api/data-tables", json={
+        "shop_id": shop["id"], "name": "商品", "table_type": "product",
+        "fields": [
+            {"name": "sku", "type": "text", "required": True},
+            {"name": "stock", "type": "number"},
+            {"name": "category", "type": "text"},
+        ],
+    }, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    return response.json()
@@ -0,0 +1,206 @@
+"""结果缓存：进程内LRU、Redis故障退化、版本号失效"""
+import pytest
+from app.core import cache as cache_module
+from app.core.cache import MemoryCache, RedisCache, ResultCache, make_key
+from app.core.config import settings
+from app.models import DataTable
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", fake)
+    return fake
+
+
+class StubRedisCache(RedisCache):
+    """不连接Redis的替身：用字典存取，broken 时所有操作抛出连接错误"""
+
+    def __init__(self, retry_interval: int = 30):
+        self.client = None
+        self.retry_interval = retry_interval
+        self._down_until = 0.0
+        self.data = {}
+        self.broken = False
+        self.calls = 0
+
+    def _check(self):
+        self.calls += 1
+        if self.broken:
+            raise ConnectionError("redis down")
+
+    def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    def set(self, key, value, ttl):
+        self._check()
+        self.data[key] = value
+
+    def delete(self, *keys):
+        self._check()
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value, ttl):
+        self.set(key, value, ttl)
+
+    async def adelete(self, *keys):
+        self.delete(*keys)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    memory = MemoryCache(max_entries=2)
+    memory.set("a", b"1", 60)
+    memory.set("b", b"2", 60)
+    assert memory.get("a") == b"1"  # a 变为最近使用
+    memory.set("c", b"3", 60)
+
+    assert memory.get("b") is None
+    assert memory.get("a") == b"1"
+    assert memory.get("c") == b"3"
+    assert len(memory) == 2
+
+
+def test_memory_cache_evicts_by_total_bytes():
+    memory = MemoryCache(max_entries=100, max_bytes=10)
+    memory.set("a", b"1234", 60)
+    memory.set("b", b"5678", 60)
+    memory.set("a", b"12", 60)  # 覆盖时按新值计数
+    assert memory.bytes == 6
+    memory.set("c", b"abcdef", 60)
+
+    assert memory.get("b") is None
+    assert memory.get("a") == b"12"
+    assert memory.get("c") == b"abcdef"
+    assert memory.bytes == 8
+
+    memory.set("huge", b"x" * 11, 60)  # 超过总上限的值不缓存，也不挤掉其它条目
+    assert memory.get("huge") is None
+    assert len(memory) == 2
+    memory.delete("a")
+    assert memory.bytes == 6
+
+
+def test_memory_cache_expires_entries(clock):
+    memory = MemoryCache(max_entries=10)
+    memory.set("short", b"1", 5)
+    memory.set("long", b"2", 60)
+
+    clock.now += 10
+    assert memory.get("short") is None
+    assert memory.get("long") == b"2"
+    assert len(memory) == 1
+
+
+def test_result_cache_skips_oversized_values(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_MAX_ITEM_BYTES", 8)
+    cache = ResultCache(MemoryCache(10))
+    cache.set("small", b"12345678")
+    cache.set("large", b"123456789")
+
+    assert cache.get("small") == b"12345678"
+    assert cache.get("large") is None
+
+
+def test_result_cache_disabled(monkeypatch):
+    cache = ResultCache(MemoryCache(10))
+    cache.set("key", b"value")
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+    assert cache.get("key") is None
+
+
+def test_result_cache_falls_back_to_memory_when_redis_fails(clock):
+    redis_cache = StubRedisCache(retry_interval=30)
+    cache = ResultCache(MemoryCache(10), redis_cache)
+
+    cache.set("key", b"redis")
+    assert redis_cache.data == {"key": b"redis"}
+    assert cache.get("key") == b"redis"
+
+    redis_cache.broken = True
+    # 出错的这次调用改由进程内缓存完成，并在重试间隔内不再访问Redis
+    cache.set("key", b"memory")
+    assert not redis_cache.available
+    calls = redis_cache.calls
+    assert cache.get("key") == b"memory"
+    assert redis_cache.calls == calls
+    assert cache.redis_client is None
+
+    # 重试间隔过后重新使用Redis
+    redis_cache.broken = False
+    clock.now += 31
+    assert redis_cache.available
+    assert cache.get("key") == b"redis"
+
+
+@pytest.mark.anyio
+async def test_async_access_falls_back_to_memory_when_redis_fails(clock):
+    redis_cache = StubRedisCache(retry_interval=30)
+    key = make_key("test", 1)
+    cache = ResultCache(MemoryCache(10), redis_cache)
+
+    async def build() -> bytes:
+        return b"built"
+
+    assert await cache.get_or_set_async(key, build) == b"built"
+    assert redis_cache.data == {key: b"built"}
+    assert cache.namespace_stats["test"] == [0, 1]
+
+    redis_cache.broken = True
+    assert await cache.aget(key) is None
+    assert not redis_cache.available
+    await cache.aset(key, b"memory")
+    assert await cache.aget(key) == b"memory"
+    assert cache.namespace_stats["test"] == [1, 2]
+
+
+def test_make_key_normalizes_payload():
+    first = make_key("table-query", 1, 3, payload={"b": 2, "a": 1})
+    second = make_key("table-query", 1, 3, payload={"a": 1, "b": 2})
+    assert first == second
+    assert first.startswith(f"{settings.CACHE_KEY_PREFIX}:table-query:1:3:")
+    assert make_key("table-query", 1, 4, payload={"a": 1, "b": 2}) != first
+
+
+def _data_version(db_session, table_id: int) -> int:
+    db_session.expire_all()
+    return db_session.get(DataTable, table_id).data_version
+
+
+def test_data_write_bumps_version_and_invalidates_cached_pages(
+    client, admin_headers, product_table, memory_cache, db_session
+):
+    table_id = product_table["id"]
+    version = _data_version(db_session, table_id)
+    url = f"/api/data-table-data/{table_id}/data?limit=10"
+
+    first = client.get(url, headers=admin_headers)
+    assert first.status_code == 200
+    assert first.json()["total"] == 0
+    hits = memory_cache.namespace_stats["table-data"][0]
+    assert client.get(url, headers=admin_headers).json()["total"] == 0
+    assert memory_cache.namespace_stats["table-data"][0] == hits + 1
+
+    response = client.post(
+        f"/api/data-table-data/{table_id}/data/batch",
+        json={"create": [{"sku": "A1", "stock": 3}, {"sku": "A2", "stock": 8}]},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200, response.text
+
+    assert _data_version(db_session, table_id) == version + 1
+    second = client.get(url, headers=admin_headers)
+    assert second.json()["total"] == 2
+    assert second.headers["etag"] != first.headers["etag"]
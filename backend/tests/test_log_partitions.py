@@ -0,0 +1,123 @@
+"""操作日志分区：归档校验、恢复、维护互斥、归档期间不阻塞日志写入"""
+import json
+from datetime import date, datetime, timezone
+import pytest
+from sqlalchemy import insert, select, text
+from app.models import OperationLog, User
+from app.services import log_partitions
+from app.services.versions import LOG_ARCHIVE_SCOPE, get_version
+
+MONTH = date(2001, 1, 1)
+NAME = log_partitions.partition_name(MONTH)
+
+
+@pytest.fixture
+def old_partition(database):
+    """2001年1月的分区，含3条日志"""
+    with database.begin() as conn:
+        log_partitions.create_partition(conn, MONTH)
+        user_id = conn.execute(select(User.id).where(User.username == "admin")).scalar_one()
+        conn.execute(insert(OperationLog), [
+            {
+                "user_id": user_id, "action_type": "update", "table_name": "shops", "record_id": i,
+                "new_value": {"note": f"第{i}行\n换行"},
+                "created_at": datetime(2001, 1, 10 + i, tzinfo=timezone.utc),
+            }
+            for i in range(3)
+        ])
+    yield NAME
+    with database.begin() as conn:
+        conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{NAME}"')
+
+
+def _partition_rows(database) -> int:
+    with database.connect() as conn:
+        if NAME not in log_partitions.list_partitions(conn):
+            return -1
+        return conn.exec_driver_sql(f'SELECT count(*) FROM "{NAME}"').scalar()
+
+
+def test_archive_requires_absolute_directory(database, old_partition):
+    with pytest.raises(ValueError):
+        log_partitions.archive_partition(database, old_partition, "relative/archives")
+    assert _partition_rows(database) == 3
+
+
+def test_archive_and_restore_round_trip(database, old_partition, tmp_path):
+    path = log_partitions.archive_partition(database, old_partition, str(tmp_path))
+    assert _partition_rows(database) == -1
+    assert not (tmp_path / f"{NAME}.csv.gz.tmp").exists()
+    rows = list(log_partitions.read_archive(path, table_name="shops"))
+    assert [json.loads(row["new_value"])["note"] for row in rows] == ["第0行\n换行", "第1行\n换行", "第2行\n换行"]
+
+    with database.begin() as conn:
+        log_partitions.restore_archive(conn, path)
+    assert _partition_rows(database) == 3
+
+
+def test_archive_keeps_partition_when_verification_fails(database, old_partition, tmp_path, monkeypatch):
+    monkeypatch.setattr(log_partitions, "_count_archive_rows", lambda path: 0)
+    with pytest.raises(RuntimeError):
+        log_partitions.archive_partition(database, old_partition, str(tmp_path))
+    assert _partition_rows(database) == 3
+    assert list(tmp_path.iterdir()) == []
+
+
+def _insert_log(conn, created_at: datetime) -> None:
+    user_id = conn.execute(select(User.id).where(User.username == "admin")).scalar_one()
+    conn.execute(insert(OperationLog).values(
+        user_id=user_id, action_type="create", table_name="shops", created_at=created_at,
+    ))
+
+
+def test_export_does_not_block_log_writes(database, old_partition, tmp_path, monkeypatch):
+    count_rows = log_partitions._count_archive_rows
+
+    def count_while_writing(path):
+        # 导出事务进行中，其它连接仍能立即写入日志（父表未被排他锁定）
+        with database.begin() as conn:
+            conn.execute(text("SET LOCAL lock_timeout = '1s'"))
+            _insert_log(conn, datetime.now(timezone.utc))
+        return count_rows(path)
+
+    monkeypatch.setattr(log_partitions, "_count_archive_rows", count_while_writing)
+    log_partitions.archive_partition(database, old_partition, str(tmp_path))
+    assert _partition_rows(database) == -1
+
+
+def test_archive_keeps_partition_written_after_export(database, old_partition, tmp_path, monkeypatch):
+    export = log_partitions._export_partition
+
+    def export_then_write(conn, name, path):
+        result = export(conn, name, path)
+        with database.begin() as other:
+            _insert_log(other, datetime(2001, 1, 20, tzinfo=timezone.utc))
+        return result
+
+    monkeypatch.setattr(log_partitions, "_export_partition", export_then_write)
+    with pytest.raises(RuntimeError):
+        log_partitions.archive_partition(database, old_partition, str(tmp_path))
+    assert _partition_rows(database) == 4
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_maintenance_lock_is_exclusive(database):
+    with database.begin() as first:
+        assert log_partitions.lock_maintenance(first)
+        with database.begin() as second:
+            assert not log_partitions.lock_maintenance(second)
+    with database.begin() as conn:
+        assert log_partitions.lock_maintenance(conn)
+
+
+def test_archive_and_restore_invalidate_closed_window_stats(database, old_partition, tmp_path):
+    def archive_version() -> int:
+        with database.connect() as conn:
+            return get_version(conn, LOG_ARCHIVE_SCOPE)
+
+    before = archive_version()
+    path = log_partitions.archive_partition(database, old_partition, str(tmp_path))
+    assert archive_version() == before + 1
+    with database.begin() as conn:
+        log_partitions.restore_archive(conn, path)
+    assert archive_version() == before + 2
@@ -0,0 +1,153 @@
+"""操作日志：统计缓存失效、记录历史翻页、删除数据表的汇总日志、写入器"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+import pytest
+from sqlalchemy import insert, select
+from app.core.config import settings
+from app.core.log_writer import OperationLogWriter
+from app.models import OperationLog, User
+from app.services.log_stats import stats_cache_scope
+from app.services.versions import LOG_ARCHIVE_SCOPE, LOGS_SCOPE
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        result = condition()
+        if result or time.monotonic() > deadline:
+            return result
+        time.sleep(0.1)
+
+
+def test_stats_cache_scope_separates_closed_windows():
+    now = datetime.now(timezone.utc)
+    assert stats_cache_scope(None) == (LOGS_SCOPE, settings.LOG_STATS_CACHE_TTL_SECONDS)
+    assert stats_cache_scope(now) == (LOGS_SCOPE, settings.LOG_STATS_CACHE_TTL_SECONDS)
+    assert stats_cache_scope(now - timedelta(days=30)) == (LOG_ARCHIVE_SCOPE, None)
+
+
+def test_log_stats_refresh_after_audited_write(client, admin_headers):
+    def total() -> int:
+        response = client.get("/api/logs/stats/summary", headers=admin_headers)
+        assert response.status_code == 200, response.text
+        return response.json()["total"]
+
+    before = total()
+    assert total() == before  # 第二次命中缓存
+    response = client.post("/api/platforms", json={"name": "统计平台", "code": "stats"}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+    # 审计日志随业务事务提交，写入器随后递增日志版本号
+    assert _wait_for(lambda: total() > before)
+
+
+def test_record_history_pages_through_rows_with_equal_timestamps(client, admin_headers, db_session):
+    created_at = datetime(2026, 1, 5, 9, 30, tzinfo=timezone.utc)
+    admin_id = db_session.execute(select(User.id).where(User.username == "admin")).scalar_one()
+    db_session.execute(insert(OperationLog), [
+        {"user_id": admin_id, "action_type": "update", "table_name": "history_test", "record_id": 1,
+         "new_value": {"step": step}, "created_at": created_at}
+        for step in range(5)
+    ])
+    db_session.commit()
+
+    url = "/api/logs/history/history_test/1?limit=2"
+    seen = []
+    params = ""
+    while True:
+        page = client.get(url + params, headers=admin_headers).json()
+        if not page:
+            break
+        seen.extend(log["id"] for log in page)
+        last = page[-1]
+        params = f"&before={quote(last['created_at'])}&before_id={last['id']}"
+
+    assert len(seen) == 5
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_delete_data_table_writes_one_summary_log(client, admin_headers, product_table, db_session):
+    table_id = product_table["id"]
+    response = client.post(
+        f"/api/data-table-data/{table_id}/data/batch",
+        json={"create": [{"sku": f"D{i}", "stock": i} for i in range(30)]},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200, response.text
+
+    def delete_logs(table_name: str) -> list:
+        db_session.expire_all()
+        return db_session.execute(
+            select(OperationLog.record_id, OperationLog.old_value).where(
+                OperationLog.action_type == "delete", OperationLog.table_name == table_name
+            )
+        ).all()
+
+    row_deletes = len(delete_logs("table_data"))
+    assert client.delete(f"/api/data-tables/{table_id}", headers=admin_headers).status_code == 204
+
+    # 汇总日志经写入器异步写入
+    assert _wait_for(lambda: any(log.record_id == table_id for log in delete_logs("data_tables")))
+    summaries = [log for log in delete_logs("data_tables") if log.record_id == table_id]
+    assert len(summaries) == 1
+    assert summaries[0].old_value["deleted_rows"] == 30
+    assert len(delete_logs("table_data")) == row_deletes
+
+
+@pytest.mark.anyio
+async def test_log_writer_does_not_block_event_loop(monkeypatch):
+    writer = OperationLogWriter(max_queue_size=1)
+    written = []
+    monkeypatch.setattr(writer, "write", lambda records, retries=0: written.append(threading.get_ident()))
+
+    # 后台线程未启动：写入交给线程池
+    writer.submit({"action_type": "create"})
+    await asyncio.gather(*writer._pending)
+    assert written and written[0] != threading.get_ident()
+
+    # 队列已满：不等待空位，同样交给线程池
+    monkeypatch.setattr(OperationLogWriter, "running", property(lambda self: True))
+    writer.submit({"action_type": "create"})
+    writer.submit({"action_type": "update"})
+    assert writer.queue_size == 1
+    await asyncio.gather(*writer._pending)
+    assert len(written) == 2
+
+
+def test_log_writer_keeps_submission_time(monkeypatch):
+    writer = OperationLogWriter()
+    batches = []
+    monkeypatch.setattr(writer, "_insert", batches.append)
+    monkeypatch.setattr(OperationLogWriter, "running", property(lambda self: True))
+
+    before = datetime.now(timezone.utc)
+    writer.submit({"action_type": "create"})
+    writer.submit({"action_type": "update", "created_at": before})
+    # 写入时（刷新间隔之后）的时间不影响记录的时间
+    time.sleep(0.05)
+    writer.write(writer._take_batch(0))
+
+    first, second = batches[0]
+    assert before < first["created_at"] < datetime.now(timezone.utc) - timedelta(milliseconds=40)
+    assert second["created_at"] == before
+
+
+def test_failed_batch_keeps_pending_version_bump(monkeypatch):
+    writer = OperationLogWriter(retry_backoff=0)
+    writer._changed.set()
+
+    def fail(records):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(writer, "_insert", fail)
+    assert not writer.write([{"action_type": "create"}], retries=1)
+    assert writer._changed.is_set()
+
+    bumped = []
+    monkeypatch.setattr(writer, "_insert", bumped.append)
+    assert writer.write([])
+    assert bumped == [[]]
+    assert not writer._changed.is_set()
@@ -0,0 +1,54 @@
+"""接口SQL条数上限（防止 N+1 回归），以及关闭指标时仍统计请求SQL"""
+import pytest
+from sqlalchemy import text
+from app.core.query_inspector import QueryStatsMiddleware, assert_max_queries, current_db_stats
+
+
+@pytest.fixture
+def shops(client, admin_headers, product_table):
+    """再建几个店铺，店铺列表的SQL条数不应随店铺数增长"""
+    platform_id = client.get("/api/shops", headers=admin_headers).json()[0]["platform_id"]
+    for index in range(3):
+        response = client.post(
+            "/api/shops", json={"name": f"预算店铺{index}{product_table['id']}", "platform_id": platform_id},
+            headers=admin_headers,
+        )
+        assert response.status_code == 201, response.text
+
+
+def _get(client, headers, url: str, limit: int) -> None:
+    with assert_max_queries(limit, f"GET {url}") as recorder:
+        assert client.get(url, headers=headers).status_code == 200
+    # 上限断言只有在SQL确实被统计时才有意义
+    assert recorder.queries > 0
+
+
+def test_data_table_tree_budget(client, admin_headers, product_table):
+    # 未命中缓存：版本号 + 一条树查询；命中缓存：只查版本号
+    _get(client, admin_headers, "/api/data-tables/tree", 2)
+    _get(client, admin_headers, "/api/data-tables/tree", 1)
+
+
+def test_list_shops_budget(client, admin_headers, shops):
+    # 店铺一页 + 批量加载平台
+    _get(client, admin_headers, "/api/shops", 2)
+
+
+def test_log_stats_budget(client, admin_headers, product_table):
+    _get(client, admin_headers, "/api/logs/stats/summary", 2)
+    _get(client, admin_headers, "/api/logs/stats/summary", 1)
+
+
+@pytest.mark.anyio
+async def test_query_stats_middleware_counts_request_queries(database):
+    seen = []
+
+    async def app(scope, receive, send):
+        with database.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        seen.append(current_db_stats())
+
+    assert current_db_stats() is None
+    await QueryStatsMiddleware(app)({"type": "http", "method": "GET", "path": "/"}, None, None)
+    assert seen[0] is not None and seen[0].queries == 1
+    assert current_db_stats() is None
@@ -0,0 +1,75 @@
+"""只读副本路由：写后读走主库、延迟窗口过后读副本、启动检查"""
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from app.core import database as database_module
+from app.core.config import settings
+from app.core.database import Base
+from app.core.read_routing import check_write_tracking
+import app.models  # noqa: F401  注册全部模型
+
+
+@pytest.fixture(scope="module")
+def replica_url(database):
+    """
+    第二个 PostgreSQL 库充当只读副本
+
+    只建表不复制数据，相当于一个始终落后于主库的副本：从它读到的数据表列表为空。
+    """
+    name = f"{settings.POSTGRES_DB}_replica"
+    admin = create_engine(make_url(settings.DATABASE_URL).set(database="postgres"), isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    url = make_url(settings.DATABASE_URL).set(database=name)
+    replica = create_engine(url)
+    Base.metadata.create_all(replica)
+    replica.dispose()
+    yield url
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+    admin.dispose()
+
+
+@pytest.fixture
+def with_replica(replica_url, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", [replica_url.render_as_string(hide_password=False)])
+    monkeypatch.setattr(settings, "REPLICA_LAG_WINDOW_SECONDS", 1)
+    # 连接属于 TestClient 的事件循环，不使用连接池
+    replica = create_async_engine(replica_url.set(drivername="postgresql+asyncpg"), poolclass=NullPool)
+    monkeypatch.setattr(database_module, "replica_engines", [replica])
+    return replica
+
+
+def test_reads_follow_own_writes_then_replica(client, admin_headers, with_replica, product_table):
+    def table_names():
+        response = client.get("/api/data-tables", headers=admin_headers)
+        assert response.status_code == 200, response.text
+        return [table["name"] for table in response.json()]
+
+    # 延迟窗口过后读副本（落后于主库，读不到数据表）
+    time.sleep(1.1)
+    assert table_names() == []
+
+    # 异步路由提交写入后，窗口内读主库，能读到自己的修改
+    response = client.put(
+        f"/api/data-tables/{product_table['id']}", json={"name": "商品（改名）"}, headers=admin_headers
+    )
+    assert response.status_code == 200, response.text
+    assert "商品（改名）" in table_names()
+
+    time.sleep(1.1)
+    assert table_names() == []
+
+
+def test_replicas_require_shared_write_markers(monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", ["postgresql://replica/db"])
+    monkeypatch.setattr(settings, "CACHE_REDIS_ENABLED", False)
+    with pytest.raises(RuntimeError, match="CACHE_REDIS_ENABLED"):
+        check_write_tracking()
+
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", [])
+    check_write_tracking()
@@ -0,0 +1,55 @@
+"""数据表数据筛选：JSON类型不同的值（空值、字符串、布尔、整数/小数）"""
+import pytest
+from sqlalchemy import select
+from app.models import TableData
+from app.services.table_data import filter_conditions, update_by_filter
+
+ROWS = {
+    "null": {"sku": "N", "stock": None, "active": None},
+    "text": {"sku": "T", "stock": "缺货", "active": "true"},
+    "low": {"sku": "L", "stock": 5, "active": True},
+    "low-float": {"sku": "F", "stock": 5.0, "active": False},
+    "high": {"sku": "H", "stock": 12, "active": True},
+    "missing": {"sku": "M"},
+}
+
+
+@pytest.fixture
+def rows(db_session, product_table):
+    """各种类型的值各一行（随 db_session 回滚）"""
+    ids = {}
+    for key, data in ROWS.items():
+        row = TableData(data_table_id=product_table["id"], data=data)
+        db_session.add(row)
+        db_session.flush()
+        ids[row.id] = key
+    return ids
+
+
+def _matching(db_session, product_table, rows, filters) -> set:
+    stmt = select(TableData.id).where(TableData.data_table_id == product_table["id"], *filter_conditions(filters))
+    return {rows[row_id] for row_id in db_session.execute(stmt).scalars()}
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"stock": {"lt": 10}}, {"low", "low-float"}),
+    ({"stock": {"gte": 5}}, {"low", "low-float", "high"}),
+    ({"stock": {"gt": 5, "lte": 12}}, {"high"}),
+    ({"stock": 5}, {"low", "low-float"}),
+    ({"stock": {"eq": 5.0}}, {"low", "low-float"}),
+    ({"stock": "5"}, {"low"}),
+    ({"stock": {"in": [5, "缺货"]}}, {"low", "low-float", "text"}),
+    ({"active": True}, {"low", "high"}),
+    ({"active": {"in": [False]}}, {"low-float"}),
+    ({"active": "true"}, {"text", "low", "high"}),
+    ({"active": {"ne": True}}, {"null", "text", "low-float", "missing"}),
+    ({"stock": {"is_null": True}}, {"null", "missing"}),
+])
+def test_filters_respect_json_types(db_session, product_table, rows, filters, expected):
+    assert _matching(db_session, product_table, rows, filters) == expected
+
+
+def test_bulk_update_skips_null_and_text_rows(db_session, product_table, rows):
+    affected = update_by_filter(db_session, product_table["id"], {"stock": {"lt": 10}}, {"category": "补货"})
+    assert affected == 2
+    assert _matching(db_session, product_table, rows, {"category": "补货"}) == {"low", "low-float"}
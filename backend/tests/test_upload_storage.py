@@ -0,0 +1,115 @@
+"""上传文件存储：按内容去重、大小上限、文件名校验、缩略图生成前后的 resolve（不需要数据库）"""
+import io
+import threading
+import pytest
+from PIL import Image
+from starlette.datastructures import Headers, UploadFile
+from app.core.config import settings
+from app.services import upload_storage
+from app.services.upload_storage import ThumbnailPool, resolve
+from app.utils.exceptions import BusinessException
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = ThumbnailPool(workers=1, sizes=[64])
+    monkeypatch.setattr(upload_storage, "thumbnail_pool", pool)
+    yield pool
+    pool.stop()
+
+
+def _png(color: str = "red") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (200, 100), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _upload(content: bytes, content_type: str = "image/png") -> UploadFile:
+    return UploadFile(io.BytesIO(content), filename="a.png", headers=Headers({"content-type": content_type}))
+
+
+@pytest.mark.anyio
+async def test_identical_uploads_are_stored_once(upload_dir, pool):
+    first = await upload_storage.save_image(_upload(_png()))
+    second = await upload_storage.save_image(_upload(_png()))
+
+    assert first.created and not second.created
+    assert first.url == second.url
+    assert len(list((upload_dir / "objects").rglob("*.png"))) == 1
+    assert list((upload_dir / "tmp").iterdir()) == []
+
+
+@pytest.mark.anyio
+async def test_oversized_image_is_rejected(upload_dir, pool, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_IMAGE_UPLOAD_SIZE", 1024)
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 256)
+
+    with pytest.raises(BusinessException) as raised:
+        await upload_storage.save_image(_upload(b"x" * 1025))
+    assert raised.value.code == 413
+    assert not (upload_dir / "objects").exists()
+    assert list((upload_dir / "tmp").iterdir()) == []
+
+
+@pytest.mark.parametrize("name", [
+    "../../etc/passwd",
+    "a" * 64 + ".png/../x",
+    "A" * 64 + ".png",
+    "a" * 63 + ".png",
+    "a" * 64,
+    "a" * 64 + ".PNG",
+])
+def test_invalid_names_are_not_resolved(upload_dir, name):
+    assert resolve(name) is None
+
+
+def test_resolve_falls_back_to_original_until_thumbnail_exists(upload_dir, pool):
+    stored = upload_storage._save_stream(io.BytesIO(_png()), ".png", settings.MAX_IMAGE_UPLOAD_SIZE)
+    original = f"objects/{stored.name[:2]}/{stored.name}"
+    thumb = f"thumbs/64/{stored.name[:2]}/{stored.name}"
+
+    # 缩略图从未提交（如进程在任务执行前退出）：返回原图，并提交生成
+    assert resolve(stored.name, 64) == (original, False)
+    pool.stop()
+    assert resolve(stored.name, 64) == (thumb, True)
+    with Image.open(upload_dir / thumb) as image:
+        assert image.size == (64, 32)
+
+    # 不支持的尺寸、无尺寸直接返回原图
+    assert resolve(stored.name, 100) == (original, True)
+    assert resolve(stored.name) == (original, True)
+
+
+def test_thumbnail_tasks_are_deduplicated(upload_dir, pool, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def slow_thumbnail(name, size):
+        calls.append((name, size))
+        release.wait(5)
+        raise OSError("cannot identify image file")
+
+    monkeypatch.setattr(upload_storage, "_make_thumbnail", slow_thumbnail)
+    name = "a" * 64 + ".png"
+    pool.schedule(name, 64)
+    pool.schedule(name, 64)
+    release.set()
+    pool.stop()
+    assert calls == [(name, 64)]
+
+    # 失败后 retry_interval 内不重试，之后再次提交
+    now = upload_storage.time.monotonic()
+    monkeypatch.setattr(upload_storage.time, "monotonic", lambda: now + 10)
+    pool.schedule(name, 64)
+    pool.stop()
+    assert len(calls) == 1
+    monkeypatch.setattr(upload_storage.time, "monotonic", lambda: now + pool.retry_interval + 1)
+    pool.schedule(name, 64)
+    pool.stop()
+    assert len(calls) == 2
@@ -45,3 +45,36 @@ export const getLogStats = (params: { start_date?: string; end_date?: string })
   return request.get('/logs/stats/summary', { params })
 }
 
+
+export interface DailyActivity {
+  user_id: number
+  user_name?: string
+  day: string
+  count: number
+}
+
+export interface RecordHistoryQuery {
+  before?: string
+  before_id?: number
+  limit?: number
+}
+
+// 获取单条记录的变更历史；翻页时传 after 为上一页最后一条，按 (created_at, id) 游标取下一页
+export const getRecordHistory = (
+  tableName: string,
+  recordId: number,
+  params?: { limit?: number; after?: OperationLog }
+) => {
+  const query: RecordHistoryQuery = { limit: params?.limit }
+  if (params?.after) {
+    // 同一事务写入的日志 created_at 相同，需同时传 id，否则会漏掉记录
+    query.before = params.after.created_at
+    query.before_id = params.after.id
+  }
+  return request.get<OperationLog[]>(`/logs/history/${tableName}/${recordId}`, { params: query })
+}
+
+// 按用户、按天统计操作数
+export const getDailyActivity = (params: { start_date?: string; end_date?: string; user_id?: number }) => {
+  return request.get<DailyActivity[]>('/logs/activity', { params })
+}